@@ -0,0 +1,407 @@
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, url_for
+from sqlalchemy.exc import SQLAlchemyError
+from data.database import User, Movie
+from data.rows import UserRow, MovieRow
+from data.pagination import encode_cursor, encode_id_cursor, decode_id_cursor, SORT_COLUMNS, DIRECTIONS
+from catalog import lookup_movie, user_movie_fields
+from fragment_cache import invalidate_user_fragments
+from exporter import json_default
+
+DEFAULT_API_PAGE_SIZE = 100
+MOVIE_FIELDS = {"name": str, "director": str, "year": int, "rating": float}
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+class ApiError(Exception):
+    """
+    An error that is answered with a JSON body and the given HTTP status.
+    """
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api.errorhandler(ApiError)
+def handle_api_error(error):
+    """
+    Turns an ApiError into a JSON response.
+
+    Args:
+        error (ApiError): The error.
+
+    Returns:
+        tuple: The JSON body and status code.
+    """
+    return jsonify(error=error.message), error.status
+
+
+@api.errorhandler(SQLAlchemyError)
+def handle_database_error(error):
+    """
+    Answers database errors with a JSON 500 response instead of the HTML error page.
+
+    Args:
+        error (SQLAlchemyError): The error.
+
+    Returns:
+        tuple: The JSON body and status code.
+    """
+    current_app.logger.error(f"API database error: {error}")
+    return jsonify(error="Database error."), 500
+
+
+def data_manager():
+    """
+    Returns the DataManagerInterface implementation the API works on.
+
+    Returns:
+        DataManagerInterface: The data manager registered as `app.extensions['data_manager']`.
+    """
+    return current_app.extensions["data_manager"]
+
+
+def _dumps(item):
+    return json.dumps(item, default=json_default, separators=(",", ":"))
+
+
+def _selected_fields(row_type):
+    """
+    Reads the `fields` query parameter, a comma-separated list of the columns the client wants.
+
+    Args:
+        row_type (type): The row tuple type whose fields may be selected.
+
+    Returns:
+        tuple: The selected field names, all fields if the parameter is missing.
+
+    Raises:
+        ApiError: If an unknown field is requested.
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return row_type._fields
+    selected = tuple(field.strip() for field in fields.split(",") if field.strip())
+    unknown = [field for field in selected if field not in row_type._fields]
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(row_type._fields)}.")
+    return selected
+
+
+def _page_size():
+    """
+    Reads the `limit` query parameter.
+
+    Pages are streamed row by row, so their size is not capped: `limit=all` streams the whole
+    collection in one response, any other value is a page size of at least 1.
+
+    Returns:
+        int or None: The page size; None for `limit=all`.
+
+    Raises:
+        ApiError: If the limit is neither a number nor "all".
+    """
+    limit = request.args.get("limit")
+    if limit is None:
+        return DEFAULT_API_PAGE_SIZE
+    if limit == "all":
+        return None
+    try:
+        return max(int(limit), 1)
+    except ValueError:
+        raise ApiError(f"limit must be a number or 'all', not {limit!r}.")
+
+
+def _wants_ndjson():
+    """
+    Tells whether the client asked for newline-delimited JSON, by `?format=ndjson` or the Accept header.
+    """
+    if request.args.get("format") == "ndjson":
+        return True
+    return request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson"
+
+
+def stream_rows(rows, fields, limit, cursor_of):
+    """
+    Streams at most `limit` rows, or all of them if `limit` is None, as JSON without building
+    the list in memory.
+
+    With JSON, the response is `{"items": [...], "next_cursor": ...}`, written item by item.
+    With NDJSON, every item is one line and, if another page follows, a last line
+    `{"next_cursor": ...}` carries the cursor.
+
+    Args:
+        rows (Iterator): Row tuples; one more than `limit` if another page follows.
+        fields (tuple): The fields of each row to include.
+        limit (int or None): The page size; None streams every row.
+        cursor_of (callable): Builds the cursor of the next page from the last row on this page.
+
+    Returns:
+        Response: A streamed response.
+    """
+    ndjson = _wants_ndjson()
+
+    def generate():
+        count = 0
+        last = None
+        next_cursor = None
+        try:
+            for row in rows:
+                if count == limit:
+                    next_cursor = cursor_of(last)
+                    break
+                item = _dumps({field: getattr(row, field) for field in fields})
+                if ndjson:
+                    yield item + "\n"
+                else:
+                    yield ("," if count else '{"items":[') + item
+                last = row
+                count += 1
+        finally:
+            close = getattr(rows, "close", None)
+            if close:
+                close()
+
+        if ndjson:
+            if next_cursor:
+                yield _dumps({"next_cursor": next_cursor}) + "\n"
+        else:
+            yield ("" if count else '{"items":[') + "]," + _dumps({"next_cursor": next_cursor})[1:]
+
+    return Response(generate(), mimetype="application/x-ndjson" if ndjson else "application/json")
+
+
+def _user_json(user):
+    return {field: getattr(user, field) for field in UserRow._fields}
+
+
+def _movie_json(movie):
+    return {field: getattr(movie, field) for field in MovieRow._fields}
+
+
+def _owned_movie(user_id, movie_id):
+    """
+    Loads a movie and checks that it belongs to the user in the URL.
+
+    Raises:
+        ApiError: 404 if the movie does not exist or belongs to another user.
+    """
+    try:
+        movie = data_manager().get_movie(movie_id)
+    except ValueError as error:
+        raise ApiError(str(error), 404)
+    if movie.user_id != user_id:
+        raise ApiError(f"Movie with ID {movie_id} not found.", 404)
+    return movie
+
+
+def _movie_changes(payload):
+    """
+    Validates the editable movie fields of a request body.
+
+    Args:
+        payload (dict): The JSON body.
+
+    Returns:
+        dict: The changed fields converted to their types.
+
+    Raises:
+        ApiError: If a field has the wrong type or the body contains unknown fields.
+    """
+    unknown = set(payload) - set(MOVIE_FIELDS)
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+    changes = {}
+    for field, value in payload.items():
+        try:
+            changes[field] = MOVIE_FIELDS[field](value) if value is not None else None
+        except (TypeError, ValueError):
+            raise ApiError(f"Invalid value for {field}: {value!r}.")
+    if "name" in changes and not changes["name"]:
+        raise ApiError("name must not be empty.")
+    if "director" in changes and not changes["director"]:
+        changes["director"] = "Unknown"
+    return changes
+
+
+def _json_body():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        raise ApiError("Expected a JSON object.")
+    return payload
+
+
+@api.get("/users")
+def list_users():
+    """
+    Lists users in ID order.
+
+    Query parameters: `limit` (page size, or `all`), `cursor` (from the previous page), `fields`
+    (comma-separated subset of id, name, movie_count, avg_rating, latest_added) and
+    `format=ndjson` for newline-delimited JSON.
+
+    Returns:
+        Response: The streamed page of users.
+    """
+    fields = _selected_fields(UserRow)
+    limit = _page_size()
+    after_id = None
+    if request.args.get("cursor"):
+        try:
+            after_id = decode_id_cursor(request.args["cursor"])
+        except ValueError as error:
+            raise ApiError(str(error))
+
+    rows = data_manager().iter_user_rows(after_id=after_id, limit=limit + 1 if limit else None)
+    return stream_rows(rows, fields, limit, lambda row: encode_id_cursor(row.id))
+
+
+@api.get("/users/<int:user_id>")
+def get_user(user_id):
+    """
+    Returns a user with its movie statistics.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Response: The user as JSON.
+    """
+    try:
+        user = data_manager().get_user(user_id)
+    except ValueError as error:
+        raise ApiError(str(error), 404)
+    return Response(_dumps(_user_json(user)), mimetype="application/json")
+
+
+@api.post("/users")
+def create_user():
+    """
+    Creates a user from `{"name": ...}`.
+
+    Returns:
+        tuple: The new user as JSON with status 201 and its Location.
+    """
+    name = _json_body().get("name")
+    if not isinstance(name, str) or not name.strip():
+        raise ApiError("name is required.")
+
+    user = User(name=name.strip())
+    data_manager().add_user(user)
+    return (Response(_dumps(_user_json(user)), mimetype="application/json"), 201,
+            {"Location": url_for("api.get_user", user_id=user.id)})
+
+
+@api.get("/users/<int:user_id>/movies")
+def list_user_movies(user_id):
+    """
+    Lists the movies of a user.
+
+    Query parameters: `sort` (name, year or rating), `dir` (asc or desc), `limit` (page size,
+    or `all`), `cursor`,
+    `fields` (comma-separated subset of id, name, director, year, rating, poster_url) and
+    `format=ndjson` for newline-delimited JSON.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        Response: The streamed page of movies.
+    """
+    fields = _selected_fields(MovieRow)
+    limit = _page_size()
+    sort = request.args.get("sort", "name")
+    direction = request.args.get("dir", "asc")
+    if sort not in SORT_COLUMNS or direction not in DIRECTIONS:
+        raise ApiError(f"sort must be one of {', '.join(SORT_COLUMNS)} and dir one of {', '.join(DIRECTIONS)}.")
+
+    try:
+        rows = data_manager().iter_movie_rows(user_id, sort=sort, direction=direction,
+                                              cursor=request.args.get("cursor"), limit=limit)
+    except ValueError as error:
+        raise ApiError(str(error), 404 if "not found" in str(error) else 400)
+    return stream_rows(rows, fields, limit, lambda row: encode_cursor(getattr(row, sort), row.id))
+
+
+@api.post("/users/<int:user_id>/movies")
+def create_movie(user_id):
+    """
+    Adds a movie to a user's collection.
+
+    The body is either `{"title": ...}`, which is looked up in the catalog and OMDb,
+    or the fields name, director, year and rating of a movie entered by hand. A catalog entry
+    fetched from OMDb is stored in the same unit of work as the movie.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        tuple: The new movie as JSON with status 201.
+    """
+    payload = _json_body()
+    try:
+        data_manager().get_user(user_id)
+    except ValueError as error:
+        raise ApiError(str(error), 404)
+
+    if "title" in payload:
+        title = payload["title"]
+        if not isinstance(title, str) or not title.strip():
+            raise ApiError("title must be a non-empty string.")
+        with data_manager().unit_of_work() as session:
+            movie_data = lookup_movie(title, session=session)
+            if not movie_data:
+                raise ApiError(f"Movie '{title}' not found in OMDb.", 404)
+            movie = Movie(**user_movie_fields(user_id, movie_data))
+            data_manager().add_movie(movie)
+    else:
+        changes = _movie_changes(payload)
+        if "name" not in changes:
+            raise ApiError("Either title or name is required.")
+        changes.setdefault("director", "Unknown")
+        movie = Movie(user_id=user_id, **changes)
+        data_manager().add_movie(movie)
+    invalidate_user_fragments(user_id)
+    return jsonify(_movie_json(data_manager().get_movie(movie.id))), 201
+
+
+@api.patch("/users/<int:user_id>/movies/<int:movie_id>")
+def patch_movie(user_id, movie_id):
+    """
+    Changes some of the fields name, director, year and rating of a movie.
+
+    Args:
+        user_id (int): The ID of the user who owns the movie.
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        Response: The updated movie as JSON.
+    """
+    changes = _movie_changes(_json_body())
+    movie = _owned_movie(user_id, movie_id)
+    for field, value in changes.items():
+        setattr(movie, field, value)
+
+    data_manager().update_movie(movie)
+    invalidate_user_fragments(user_id)
+    return jsonify(_movie_json(data_manager().get_movie(movie_id)))
+
+
+@api.delete("/users/<int:user_id>/movies/<int:movie_id>")
+def delete_movie(user_id, movie_id):
+    """
+    Deletes a movie from a user's collection.
+
+    Args:
+        user_id (int): The ID of the user who owns the movie.
+        movie_id (int): The ID of the movie.
+
+    Returns:
+        tuple: An empty response with status 204.
+    """
+    _owned_movie(user_id, movie_id)
+    data_manager().delete_movie(movie_id)
+    invalidate_user_fragments(user_id)
+    return "", 204
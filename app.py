@@ -1,235 +1,255 @@
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash
-from sqlalchemy.exc import SQLAlchemyError
-from data.database import init_database, User, db, Movie
-from omdb_api import fetch_movie_data
+import click
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, func
+from data.database import init_database, init_migrations, User, db, Movie, CatalogMovie
+from data.sqlite_tuning import run_maintenance
+from data.user_stats import rebuild_user_stats
+from movie_import import parse_titles, import_movies
+from jobs import JobRunner
+from http_cache import templates_version, make_etag
+from fragment_cache import create_fragment_cache
+from data_manager import SQLiteDataManager
+from api import api
+from views import views, resolve_movie_job, import_movies_job
+from exporter import EXPORT_FORMATS, export_statement, iter_export
+from compression import Compression
+from metrics import init_metrics
+from profiling import init_profiling
+from assets import build_assets, load_manifest, missing_bundles
+from posters import PosterStore, POSTER_WIDTHS
+
+
+def _flag(name, default=""):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def config_from_env():
+    """
+    Reads the application settings from the environment, after loading a `.env` file if there is one.
 
-app = Flask(__name__)
-
-init_database(app)
-app.secret_key = os.getenv("SECRET_KEY")
-
-@app.route('/')
-def home():
-    """
-    Route to render the homepage of the application.
+    Returns:
+        dict: The config values, overridable by the mapping passed to `create_app`.
+    """
+    # Imported here so that importing the app stays cheap; only the factory needs it.
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    return {
+        'SECRET_KEY': os.getenv("SECRET_KEY"),
+        'MIGRATIONS': _flag("MIGRATIONS", "true"),
+        'ASYNC_ADD_MOVIE': _flag("ASYNC_ADD_MOVIE"),
+        'JOB_WORKERS': int(os.getenv("JOB_WORKERS", 4)),
+        'JOB_STALE_AFTER': int(os.getenv("JOB_STALE_AFTER", 600)),
+        'COMPRESS_MIN_SIZE': int(os.getenv("COMPRESS_MIN_SIZE", 1024)),
+        'COMPRESS_LEVEL': int(os.getenv("COMPRESS_LEVEL", 6)),
+        'COMPRESS_CACHE_SIZE': int(os.getenv("COMPRESS_CACHE_SIZE", 128)),
+        'METRICS_ENABLED': _flag("METRICS_ENABLED"),
+        'METRICS_TOKEN': os.getenv("METRICS_TOKEN"),
+        'METRICS_N_PLUS_ONE_THRESHOLD': int(os.getenv("METRICS_N_PLUS_ONE_THRESHOLD", 5)),
+        'METRICS_SLOW_REQUEST_MS': int(os.getenv("METRICS_SLOW_REQUEST_MS", 500)),
+        'PROFILE_TOKEN': os.getenv("PROFILE_TOKEN"),
+        'PROFILE_DIR': os.getenv("PROFILE_DIR"),
+        'PROFILE_RETENTION': int(os.getenv("PROFILE_RETENTION", 50)),
+        'PROFILE_SAMPLE_INTERVAL_MS': float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", 5)),
+        'FRAGMENT_CACHE': os.getenv("FRAGMENT_CACHE", "memory"),
+        'FRAGMENT_CACHE_SIZE': int(os.getenv("FRAGMENT_CACHE_SIZE", 256)),
+        'POSTER_DIR': os.getenv("POSTER_DIR"),
+        'POSTER_CACHE_MB': int(os.getenv("POSTER_CACHE_MB", 200)),
+    }
+
+
+def create_app(config=None):
+    """
+    Creates and configures the application.
+
+    Settings are read from the environment (see `config_from_env`) and then overridden by `config`,
+    e.g. `create_app({"SQLALCHEMY_DATABASE_URI": "sqlite:///test.db"})` in tests.
+
+    Creating the app does not touch the database schema: new databases are created, and existing
+    ones upgraded, with `flask db upgrade`, which the `flask` command finds through this factory.
+    The migrations are wired up unless MIGRATIONS is false, which spares processes that never
+    migrate, e.g. workers started with `gunicorn "app:create_app()"`, the import of Alembic.
 
-    This is the landing page users will see when they visit the root URL.
+    Args:
+        config (dict, optional): Config values that take precedence over the environment.
 
     Returns:
-        str: Rendered HTML template of the home page (home.html).
-    """
-    return render_template('home.html')
+        Flask: The application.
+    """
+    app = Flask(__name__)
+    app.config.update(config_from_env())
+    app.config.update(config or {})
+    app.config['PROFILE_DIR'] = app.config['PROFILE_DIR'] or os.path.join(app.root_path, "data", "profiles")
+    app.config['POSTER_DIR'] = app.config['POSTER_DIR'] or os.path.join(app.root_path, "data", "posters")
+
+    init_database(app)
+    if app.config['MIGRATIONS']:
+        init_migrations(app)
+    Compression(app, min_size=app.config['COMPRESS_MIN_SIZE'], level=app.config['COMPRESS_LEVEL'],
+                cache_size=app.config['COMPRESS_CACHE_SIZE'])
+    app.config.setdefault('ASSET_MANIFEST', load_manifest(app.static_folder))
+    unbuilt = missing_bundles(app.config['ASSET_MANIFEST'])
+    if unbuilt:
+        app.logger.error(f"Asset bundles not built: {', '.join(unbuilt)}. "
+                         f"Pages fail to render until `flask build-assets` has run.")
+    app.config['TEMPLATES_VERSION'] = make_etag(templates_version(os.path.join(app.root_path, app.template_folder)),
+                                                sorted(app.config['ASSET_MANIFEST'].items()))[:12]
+
+    app.extensions['fragment_cache'] = create_fragment_cache(app.config['FRAGMENT_CACHE'],
+                                                             max_size=app.config['FRAGMENT_CACHE_SIZE'])
+    app.extensions['poster_store'] = PosterStore(app.config['POSTER_DIR'],
+                                                 max_bytes=app.config['POSTER_CACHE_MB'] * 2 ** 20)
+    app.extensions['job_runner'] = JobRunner(app, {"add_movie": resolve_movie_job,
+                                                   "import_movies": import_movies_job},
+                                             max_workers=app.config['JOB_WORKERS'],
+                                             stale_after=app.config['JOB_STALE_AFTER'])
+    # Resumed by the first request rather than here, so CLI commands never touch the jobs table.
+    app.before_request(app.extensions['job_runner'].resume_once)
+
+    app.register_blueprint(views)
+    app.register_blueprint(api)
+    for command in COMMANDS:
+        app.cli.add_command(command)
+
+    with app.app_context():
+        app.extensions['data_manager'] = SQLiteDataManager(db.engine.url.database, app.config['SQLITE_PROFILE'])
+        engines = (db.engine, app.extensions['data_manager'].engine)
+        init_metrics(app, engines=engines)
+        init_profiling(app, engines=engines)
+    return app
+
+
+@click.command("import-movies")
+@with_appcontext
+@click.argument("user_id", type=int)
+@click.argument("file", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--format", "fmt", type=click.Choice(["csv", "lines"]), default=None,
+              help="Input format. Detected from the header row if omitted.")
+@click.option("--chunk-size", default=500, show_default=True, help="Titles inserted per transaction.")
+@click.option("--concurrency", default=10, show_default=True, help="Parallel OMDb lookups.")
+def import_movies_command(user_id, file, fmt, chunk_size, concurrency):
+    """
+    Imports a CSV or newline-delimited list of movie titles for a user.
 
-@app.route("/users")
-def list_users():
+    Args:
+        user_id (int): The ID of the user who the movies will be imported for.
+        file (file): The CSV or text file with the titles ("-" for stdin).
     """
-    Route to list all users in the database.
+    user = db.session.get(User, user_id)
+    if not user:
+        raise click.ClickException(f"User with ID {user_id} not found.")
 
-    It queries the database for all users and displays them on the users page.
-    If an error occurs during database interaction, an error message is shown.
+    titles = parse_titles(file.read(), fmt)
 
-    Returns:
-        str: Rendered HTML template displaying all users (users.html).
-    """
-    try:
-        users = User.query.all()
-        return render_template('users.html', users=users)
-    except SQLAlchemyError as e:
-        app.logger.error(f"Database error: {e}")
-        flash("An error occurred while loading users.", "danger")
-        return redirect(url_for("home"))
+    def report(processed, total):
+        click.echo(f"Processed {processed}/{total} titles...")
 
-@app.route("/users/<int:user_id>")
-def user_movies(user_id):
-    """
-    Route to display the movies of a specific user.
+    result = import_movies(user.id, titles, chunk_size=chunk_size, concurrency=concurrency, progress=report)
 
-    This route takes a user ID, retrieves the corresponding user from the database,
-    and renders the user's movie collection page. If an error occurs, it redirects back to the user list.
+    click.echo(f"Imported {result.added} of {result.total} movies for {user.name}.")
+    for row_error in result.errors:
+        click.echo(f"  line {row_error.line}: '{row_error.title}' - {row_error.reason}", err=True)
 
-    Args:
-        user_id (int): The ID of the user whose movies are to be displayed.
 
-    Returns:
-        str: Rendered HTML template displaying the user's movies (user_movies.html).
+@click.command("sqlite-maintenance")
+@with_appcontext
+def sqlite_maintenance_command():
     """
-    try:
-        user = User.query.get_or_404(user_id)
-        return render_template("user_movies.html", user=user)
-    except SQLAlchemyError as e:
-        app.logger.error(f"Database error: {e}")
-        flash("An error occurred while loading user's movies.", "danger")
-        return redirect(url_for("list_users"))
-
-
-@app.route('/add_user', methods=['GET', 'POST'])
-def add_user():
+    Checkpoints the SQLite write-ahead log and refreshes the query planner statistics.
+    Meant to be run periodically, e.g. from cron, if SQLITE_MAINTENANCE_INTERVAL is not set.
     """
-    Route to add a new user.
+    busy, log_pages, checkpointed = run_maintenance(db.engine)
+    click.echo(f"Checkpointed {checkpointed} of {log_pages} WAL pages{' (database busy)' if busy else ''}.")
 
-    If the request method is POST, the function attempts to add a new user to the database with the given name.
-    It redirects to the user list page after successful addition, or shows an error message if something goes wrong.
 
-    Returns:
-        str: Rendered HTML template to add a user (add_user.html).
+@click.command("export")
+@with_appcontext
+@click.option("--user-id", type=int, default=None, help="Export only this user's movies.")
+@click.option("--format", "fmt", type=click.Choice(sorted(EXPORT_FORMATS)), default="csv", show_default=True)
+@click.option("--output", type=click.File("w", encoding="utf-8"), default="-",
+              help="File to write to. Defaults to stdout.")
+@click.option("--batch-size", default=2000, show_default=True, help="Rows fetched per batch.")
+def export_command(user_id, fmt, output, batch_size):
     """
-    if request.method == 'POST':
-        user_name = request.form['name']
-        try:
-            new_user = User(name=user_name)
-            db.session.add(new_user)
-            db.session.commit()
-            flash("User added successfully.", "success")
-            return redirect(url_for('list_users'))
-        except SQLAlchemyError as e:
-            db.session.rollback()
-            app.logger.error(f"Error adding user: {e}")
-            flash("Failed to add user.", "danger")
+    Exports all users and movies, or one user's movies, as CSV or NDJSON.
+    """
+    if user_id is not None and not db.session.get(User, user_id):
+        raise click.ClickException(f"User with ID {user_id} not found.")
 
-    return render_template('add_user.html')
+    for chunk in iter_export(db.engine, export_statement(user_id), fmt, batch_size=batch_size):
+        output.write(chunk)
 
 
-@app.route("/add_movie/<int:user_id>", methods=["GET", "POST"])
-def add_movie(user_id):
+@click.command("fetch-posters")
+@with_appcontext
+@click.option("--width", "widths", type=click.Choice([str(width) for width in POSTER_WIDTHS]), multiple=True,
+              help="Thumbnail widths to prepare. Defaults to all.")
+@click.option("--concurrency", default=8, show_default=True, help="Parallel downloads.")
+def fetch_posters_command(widths, concurrency):
     """
-    Route to add a new movie to a user's collection.
-
-    If the request method is POST, it attempts to search for a movie title using the OMDb API.
-    If a valid movie is found, it is added to the user's movie collection.
-    Returns an error message if the movie cannot be found or if an API error occurs.
+    Downloads and resizes the posters of all movies ahead of time, so pages never wait for OMDb images.
+    """
+    urls = {url for url in db.session.scalars(
+        select(func.coalesce(Movie.poster, CatalogMovie.poster))
+        .outerjoin(CatalogMovie, CatalogMovie.imdb_id == Movie.imdb_id).distinct())
+        if url and url.startswith(("http://", "https://"))}
+    widths = [int(width) for width in widths] or list(POSTER_WIDTHS)
+    poster_store = current_app.extensions['poster_store']
 
-    Args:
-        user_id (int): The ID of the user who the movie will be added to.
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda job: poster_store.get(*job), [(url, w) for url in urls for w in widths]))
 
-    Returns:
-        str: Rendered HTML template to add a movie (add_movie.html).
-    """
-    user = User.query.get_or_404(user_id)
-    error = None
-
-    if request.method == "POST":
-        title = request.form.get("title")
-
-        if not title:
-            error = "Please enter a movie title."
-        else:
-            try:
-                movie_data = fetch_movie_data(title)
-                if movie_data:
-                    new_movie = Movie(
-                        name=movie_data['title'],
-                        director="Unknown",
-                        year=movie_data['year'],
-                        rating=movie_data['rating'],
-                        poster=movie_data['poster'],
-                        user_id=user.id
-                    )
-                    db.session.add(new_movie)
-                    db.session.commit()
-                    flash("Movie added successfully.", "success")
-                    return redirect(url_for('user_movies', user_id=user.id))
-                else:
-                    error = f"Movie '{title}' not found in OMDb."
-            except Exception as e:
-                app.logger.error(f"OMDb API error: {e}")
-                error = "An error occurred while searching for the movie."
-
-    return render_template("add_movie.html", user=user, error=error)
-
-
-
-@app.route("/users/<int:user_id>/update_movie/<int:movie_id>", methods=["GET", "POST"])
-def update_movie(user_id, movie_id):
-    """
-    Route to update a movie's details for a specific user.
-
-    This route takes the movie ID and allows the user to edit the movie's title, director, year, and rating.
-    The changes are committed to the database upon form submission. If an error occurs, an error message is shown.
+    stats = poster_store.stats()
+    click.echo(f"Prepared {sum(1 for result in results if result)} of {len(results)} thumbnails; "
+               f"{stats['files']} files, {stats['bytes'] / 2 ** 20:.1f} MiB stored.")
 
-    Args:
-        user_id (int): The ID of the user who owns the movie.
-        movie_id (int): The ID of the movie to be updated.
 
-    Returns:
-        str: Rendered HTML template to update the movie (update_movie.html).
+@click.command("build-assets")
+@with_appcontext
+@click.option("--source", type=click.File("r", encoding="utf-8"), default=None,
+              help="Tailwind build to purge instead of the pinned download.")
+def build_assets_command(source):
     """
-    movie = Movie.query.get_or_404(movie_id)
-
-    if request.method == "POST":
-        try:
-            movie.name = request.form["name"]
-            movie.director = request.form["director"]
-            movie.year = int(request.form["year"])
-            movie.rating = float(request.form["rating"])
-            db.session.commit()
-            flash("Movie updated successfully.", "success")
-            return redirect(url_for("user_movies", user_id=user_id))
-        except (ValueError, SQLAlchemyError) as e:
-            db.session.rollback()
-            app.logger.error(f"Error updating movie: {e}")
-            flash("Failed to update movie.", "danger")
-
-    return render_template("update_movie.html", movie=movie, user_id=user_id)
-
-@app.route("/users/<int:user_id>/delete_movie/<int:movie_id>", methods=["POST"])
-def delete_movie(user_id, movie_id):
+    Purges the stylesheet against the templates and writes fingerprinted, precompressed files to static/dist.
     """
-    Route to delete a movie from a user's collection.
-
-    This route deletes the specified movie from the user's collection in the database.
-    If the deletion is successful, a success message is displayed; otherwise, an error message is shown.
+    sources = {"tailwind.css": source.read()} if source else None
+    manifest = build_assets(current_app.static_folder,
+                            os.path.join(current_app.root_path, current_app.template_folder), sources=sources)
+    for name, path in manifest.items():
+        size = os.path.getsize(os.path.join(current_app.static_folder, path))
+        click.echo(f"{name} -> static/{path} ({size / 1024:.1f} KiB)")
 
-    Args:
-        user_id (int): The ID of the user who owns the movie.
-        movie_id (int): The ID of the movie to be deleted.
 
-    Returns:
-        Response: Redirects to the user's movie collection page after deletion.
+@click.command("rebuild-user-stats")
+@with_appcontext
+def rebuild_user_stats_command():
     """
-    movie = Movie.query.get_or_404(movie_id)
-    try:
-        db.session.delete(movie)
-        db.session.commit()
-        flash("Movie deleted successfully.", "success")
-    except SQLAlchemyError as e:
-        db.session.rollback()
-        app.logger.error(f"Error deleting movie: {e}")
-        flash("Failed to delete movie.", "danger")
-
-    return redirect(url_for("user_movies", user_id=user_id))
-
-
-@app.errorhandler(404)
-def not_found_error(error):
+    Recomputes the movie count, average rating and latest addition of every user.
+    Only needed after movies were changed outside the application.
     """
-    Error handler for 404 Not Found errors.
+    updated = rebuild_user_stats(db.session)
+    db.session.commit()
+    click.echo(f"Rebuilt stats for {updated} users.")
 
-    This handler is triggered when a requested page cannot be found. It renders a custom 404 error page.
 
-    Args:
-        error (Exception): The error that triggered this handler.
-
-    Returns:
-        tuple: The rendered 404 error page with a status code of 404.
+@click.command("resume-jobs")
+@with_appcontext
+def resume_jobs_command():
     """
-    return render_template('404.html'), 404
-
-@app.errorhandler(500)
-def internal_error(error):
+    Runs the background jobs left unfinished by a previous process and waits for them to finish.
     """
-    Error handler for 500 Internal Server errors.
+    job_runner = current_app.extensions['job_runner']
+    resumed = job_runner.resume()
+    job_runner.shutdown(wait=True)
+    click.echo(f"Ran {resumed} unfinished jobs.")
 
-    This handler is triggered when an unexpected server error occurs. It rolls back any active database session and renders a custom 500 error page.
 
-    Args:
-        error (Exception): The error that triggered this handler.
+COMMANDS = (import_movies_command, sqlite_maintenance_command, export_command, fetch_posters_command,
+            build_assets_command, rebuild_user_stats_command, resume_jobs_command)
 
-    Returns:
-        tuple: The rendered 500 error page with a status code of 500.
-    """
-    db.session.rollback()
-    return render_template('500.html'), 500
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,267 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip variants are written.
+    brotli = None
+
+ASSETS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "assets")
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+
+# Bundles built into static/dist by `flask build-assets`. `source` is read from ASSETS_DIR and downloaded
+# from `url` once if missing. Pages cannot be rendered until every bundle has been built.
+BUNDLES = {
+    "tailwind.css": {
+        "source": "vendor/tailwind-2.2.19.min.css",
+        "url": "https://cdn.jsdelivr.net/npm/tailwindcss@2.2.19/dist/tailwind.min.css",
+    },
+}
+
+CANDIDATE = re.compile(r"[^\s\"'`<>={}()]+")
+CLASS_SELECTOR = re.compile(r"\.((?:\\.|[\w-])+)")
+COMMENT = re.compile(r"/\*.*?\*/", re.S)
+
+
+def template_candidates(template_folder):
+    """
+    Collects every word of the templates that could be a CSS class name.
+
+    Class names are found anywhere in the files, not only in class attributes, so classes
+    chosen in Jinja expressions such as `{{ 'bg-blue-600' if active else 'bg-gray-700' }}` are kept.
+
+    Args:
+        template_folder (str): The folder with the Jinja templates.
+
+    Returns:
+        set: The candidate class names.
+    """
+    candidates = set()
+    for root, _, files in os.walk(template_folder):
+        for name in files:
+            with open(os.path.join(root, name), encoding="utf-8") as file:
+                candidates.update(CANDIDATE.findall(file.read()))
+    return candidates
+
+
+def _split_blocks(css):
+    """
+    Splits CSS into top-level (prelude, body) pairs, skipping over quoted strings.
+    Statements without a block, such as `@import`, have a body of None.
+    """
+    blocks = []
+    depth = 0
+    start = 0
+    prelude_end = None
+    quote = None
+    index = 0
+    while index < len(css):
+        char = css[index]
+        if quote:
+            if char == "\\":
+                index += 1
+            elif char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "{":
+            if depth == 0:
+                prelude_end = index
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                blocks.append((css[start:prelude_end].strip(), css[prelude_end + 1:index]))
+                start = index + 1
+        elif char == ";" and depth == 0:
+            blocks.append((css[start:index].strip(), None))
+            start = index + 1
+        index += 1
+    return blocks
+
+
+def _split_selectors(prelude):
+    """
+    Splits a selector list on commas that are not inside parentheses, e.g. in `:not(a, b)`.
+    """
+    selectors, depth, current = [], 0, []
+    for char in prelude:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            selectors.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    selectors.append("".join(current).strip())
+    return [selector for selector in selectors if selector]
+
+
+def _selector_used(selector, candidates):
+    """
+    Tells whether every class in a selector occurs in the templates. Selectors without
+    classes, like the element resets of Tailwind's base layer, are always kept.
+    """
+    for escaped in CLASS_SELECTOR.findall(selector):
+        if re.sub(r"\\(.)", r"\1", escaped) not in candidates:
+            return False
+    return True
+
+
+def purge_css(css, candidates):
+    """
+    Removes the rules of a stylesheet whose selectors use classes not found in the templates.
+
+    Rules inside @media and @supports are purged the same way; other at-rules such as
+    @keyframes and @font-face are kept as they are.
+
+    Args:
+        css (str): The stylesheet.
+        candidates (set): Class names used by the templates, from `template_candidates`.
+
+    Returns:
+        str: The purged, minified stylesheet.
+    """
+    output = []
+    for prelude, body in _split_blocks(COMMENT.sub("", css)):
+        if body is None:
+            output.append(f"{prelude};")
+        elif prelude.startswith(("@media", "@supports")):
+            inner = purge_css(body, candidates)
+            if inner:
+                output.append(f"{prelude}{{{inner}}}")
+        elif prelude.startswith("@"):
+            output.append(f"{prelude}{{{body.strip()}}}")
+        else:
+            selectors = [selector for selector in _split_selectors(prelude) if _selector_used(selector, candidates)]
+            if selectors:
+                output.append(f"{','.join(selectors)}{{{body.strip()}}}")
+    return "".join(output)
+
+
+def read_source(bundle):
+    """
+    Returns the source of a bundle, downloading and keeping it in ASSETS_DIR on first use.
+
+    Args:
+        bundle (dict): An entry of BUNDLES.
+
+    Returns:
+        str: The source text.
+    """
+    path = os.path.join(ASSETS_DIR, bundle["source"])
+    if not os.path.exists(path):
+        import requests  # only `flask build-assets` downloads, so the app does not import it at startup
+
+        logging.info(f"Downloading {bundle['url']}")
+        response = requests.get(bundle["url"], timeout=30)
+        response.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(response.text)
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+
+
+def write_compressed(path, data):
+    """
+    Writes the gzip and, if the brotli package is installed, brotli variants next to a file.
+
+    Args:
+        path (str): The path of the uncompressed file.
+        data (bytes): Its content.
+
+    Returns:
+        list: The paths of the written variants.
+    """
+    variants = []
+    with open(path + ".gz", "wb") as file:
+        file.write(gzip.compress(data, compresslevel=9, mtime=0))
+    variants.append(path + ".gz")
+    if brotli is not None:
+        with open(path + ".br", "wb") as file:
+            file.write(brotli.compress(data, quality=11))
+        variants.append(path + ".br")
+    return variants
+
+
+def build_assets(static_folder, template_folder, bundles=None, sources=None):
+    """
+    Builds the asset bundles into `<static_folder>/dist`.
+
+    Each bundle is purged against the templates, written under a name containing the hash of its
+    content, together with precompressed .gz/.br variants, and recorded in `dist/manifest.json`.
+    Older builds of the same bundle are removed.
+
+    Args:
+        static_folder (str): The Flask static folder.
+        template_folder (str): The folder with the Jinja templates.
+        bundles (dict, optional): The bundles to build; defaults to BUNDLES.
+        sources (dict, optional): Bundle sources by name, used instead of `read_source`.
+
+    Returns:
+        dict: The manifest, mapping bundle names to paths relative to the static folder.
+    """
+    bundles = BUNDLES if bundles is None else bundles
+    dist = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(dist, exist_ok=True)
+    candidates = template_candidates(template_folder)
+    manifest = load_manifest(static_folder)
+
+    for name, bundle in bundles.items():
+        source = sources[name] if sources and name in sources else read_source(bundle)
+        content = purge_css(source, candidates) if name.endswith(".css") else source
+        data = content.encode("utf-8")
+        stem, extension = os.path.splitext(name)
+        filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+        for old in os.listdir(dist):
+            if old.startswith(f"{stem}.") and not old.startswith(filename) and old != MANIFEST_NAME:
+                os.remove(os.path.join(dist, old))
+
+        path = os.path.join(dist, filename)
+        with open(path, "wb") as file:
+            file.write(data)
+        write_compressed(path, data)
+        manifest[name] = f"{DIST_DIR}/{filename}"
+
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """
+    Reads the manifest written by `build_assets`.
+
+    Args:
+        static_folder (str): The Flask static folder.
+
+    Returns:
+        dict: Bundle names mapped to fingerprinted paths; empty if nothing has been built.
+    """
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def missing_bundles(manifest):
+    """
+    Lists the bundles that have not been built yet.
+
+    Args:
+        manifest (dict): The manifest as returned by `load_manifest`.
+
+    Returns:
+        list: Names of BUNDLES missing from the manifest.
+    """
+    return [name for name in BUNDLES if name not in manifest]
@@ -0,0 +1,84 @@
+"""
+Time-to-first-byte, throughput and memory benchmark of the streamed export.
+
+Fills a temporary SQLite database with synthetic movies, then exports all of them as CSV
+and NDJSON to /dev/null through `exporter.iter_export`, reporting when the first chunk
+was produced, the total time and the peak memory allocated during the export.
+
+Run from the repository root:
+    python -m benchmarks.bench_export --movies 5000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from data.database import db, User, Movie
+from exporter import export_statement, iter_export
+
+
+def populate(engine, movie_count, user_count):
+    """
+    Creates the schema and inserts synthetic users and movies in batches.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        movie_count (int): Number of movies to insert.
+        user_count (int): Number of users the movies are spread over.
+    """
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{"id": i, "name": f"User {i}"} for i in range(1, user_count + 1)])
+        for start in range(0, movie_count, 50000):
+            connection.execute(Movie.__table__.insert(), [
+                {"id": i, "name": f"Movie {i}", "director": "Unknown", "year": 1950 + i % 75,
+                 "rating": (i % 100) / 10, "user_id": 1 + i % user_count}
+                for i in range(start + 1, min(start + 50000, movie_count) + 1)
+            ])
+
+
+def measure(engine, fmt, batch_size):
+    """
+    Exports everything once and returns seconds to the first chunk, total seconds and peak MiB.
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_chunk = None
+    with open(os.devnull, "w") as sink:
+        for chunk in iter_export(engine, export_statement(), fmt, batch_size=batch_size):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - started
+            sink.write(chunk)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_chunk, total, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=1000000, help="number of movies (default: 1,000,000)")
+    parser.add_argument("--users", type=int, default=1000, help="number of users (default: 1,000)")
+    parser.add_argument("--batch-size", type=int, default=2000, help="rows per chunk (default: 2,000)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        populate(engine, args.movies, args.users)
+        print(f"{args.movies:,} movies, batches of {args.batch_size:,} rows")
+        print(f"{'format':<8} {'first chunk (ms)':>17} {'total (s)':>10} {'rows/s':>10} {'peak (MiB)':>11}")
+        for fmt in ("csv", "ndjson"):
+            first_chunk, total, peak = measure(engine, fmt, args.batch_size)
+            print(f"{fmt:<8} {first_chunk * 1000:>17.1f} {total:>10.1f} {args.movies / total:>10,.0f} {peak:>11.1f}")
+    finally:
+        engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
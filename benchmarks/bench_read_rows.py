@@ -0,0 +1,102 @@
+"""
+Memory and latency benchmark of the list page read paths: full ORM objects versus
+column-only selects returning UserRow / MovieRow tuples.
+
+Fills a temporary SQLite database with synthetic users and movies, then loads all users
+and one user's complete movie collection both ways, reporting the median time and the
+peak memory allocated while building the result.
+
+Run from the repository root:
+    python -m benchmarks.bench_read_rows --rows 100000
+"""
+import argparse
+import gc
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from data.database import db, User, Movie
+from data.rows import UserRow, MovieRow, user_rows_statement, movie_rows_statement
+from data_manager import SQLiteDataManager
+
+
+def populate(engine, rows):
+    """
+    Inserts `rows` users and `rows` movies; all movies belong to user 1.
+    """
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{"id": i, "name": f"User {i}"} for i in range(1, rows + 1)])
+        connection.execute(Movie.__table__.insert(), [
+            {"id": i, "name": f"Movie {i:06d}", "director": "Unknown", "year": 1950 + i % 75,
+             "rating": (i % 100) / 10, "poster": f"https://example.com/{i}.jpg", "user_id": 1}
+            for i in range(1, rows + 1)
+        ])
+
+
+def measure(load, repeat):
+    """
+    Runs `load` several times and returns the median seconds and the peak traced memory in MiB.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        load()
+        timings.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    result = load()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return statistics.median(timings), peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="number of users and of movies (default: 100,000)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed repetitions (default: 3)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    manager = SQLiteDataManager(db_path)
+    try:
+        populate(manager.engine, args.rows)
+
+        def orm_users():
+            with Session(manager.engine) as session:
+                return session.scalars(select(User)).all()
+
+        def row_users():
+            with Session(manager.engine) as session:
+                return [UserRow._make(row) for row in session.execute(user_rows_statement())]
+
+        def orm_movies():
+            with Session(manager.engine) as session:
+                return session.scalars(select(Movie).where(Movie.user_id == 1)).all()
+
+        def row_movies():
+            with Session(manager.engine) as session:
+                return [MovieRow._make(row) for row in session.execute(movie_rows_statement(1))]
+
+        print(f"{args.rows:,} rows per query")
+        print(f"{'read path':<22} {'median (ms)':>12} {'peak (MiB)':>11}")
+        for name, load in [("users: ORM", orm_users), ("users: UserRow", row_users),
+                           ("movies: ORM", orm_movies), ("movies: MovieRow", row_movies)]:
+            seconds, peak = measure(load, args.repeat)
+            print(f"{name:<22} {seconds * 1000:>12.1f} {peak:>11.1f}")
+    finally:
+        manager.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency benchmark of the full-text movie search.
+
+Fills a temporary SQLite database with synthetic movies, whose names and directors are
+drawn from a small vocabulary so that search terms match many rows, and times searches
+of one user's movies for whole words and prefixes.
+
+Run from the repository root:
+    python -m benchmarks.bench_search --movies 1000000 --users 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy.orm import Session
+from data.database import db, User, Movie
+from data.search import search_statement
+from data_manager import SQLiteDataManager
+
+WORDS = ["star", "night", "love", "dark", "city", "blue", "war", "king", "last", "house", "river", "ghost",
+         "summer", "secret", "heart", "road", "storm", "dream", "shadow", "golden", "wild", "lost", "fire", "moon"]
+NAMES = ["Scott", "Mann", "Nolan", "Lucas", "Bigelow", "Kubrick", "Varda", "Kurosawa", "Campion", "Lynch"]
+QUERIES = ["star", "st", "dark night", "kubr", "lost riv", "moon nolan"]
+
+
+def populate(engine, movie_count, user_count, seed=42):
+    """
+    Creates the schema, including the search index, and inserts synthetic users and movies.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        movie_count (int): Number of movies to insert.
+        user_count (int): Number of users the movies are spread over.
+        seed (int): Seed for the random generator, so runs are comparable.
+    """
+    db.metadata.create_all(engine)
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{"id": i, "name": f"User {i}"} for i in range(1, user_count + 1)])
+        batch = []
+        for movie_id in range(1, movie_count + 1):
+            batch.append({
+                "id": movie_id,
+                "name": " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4))),
+                "director": f"{rng.choice(NAMES)} {rng.choice(NAMES)}",
+                "year": rng.randint(1920, 2025),
+                "rating": round(rng.uniform(1, 10), 1),
+                "user_id": rng.randint(1, user_count),
+            })
+            if len(batch) == 50000:
+                connection.execute(Movie.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Movie.__table__.insert(), batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=1000000, help="number of movies (default: 1,000,000)")
+    parser.add_argument("--users", type=int, default=1000, help="number of users (default: 1,000)")
+    parser.add_argument("--repeat", type=int, default=20, help="searches per query (default: 20)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    manager = SQLiteDataManager(db_path)
+    try:
+        started = time.perf_counter()
+        populate(manager.engine, args.movies, args.users)
+        print(f"Inserted {args.movies:,} movies for {args.users:,} users in {time.perf_counter() - started:.1f} s")
+
+        rng = random.Random(7)
+        print(f"{'query':<14} {'median (ms)':>12} {'max (ms)':>10} {'results':>8}")
+        with Session(manager.engine) as session:
+            for query in QUERIES:
+                timings = []
+                for _ in range(args.repeat):
+                    user_id = rng.randint(1, args.users)
+                    started = time.perf_counter()
+                    rows = session.execute(search_statement(user_id, query)).all()
+                    timings.append(time.perf_counter() - started)
+                print(f"{query:<14} {statistics.median(timings) * 1000:>12.2f} {max(timings) * 1000:>10.2f} {len(rows):>8}")
+    finally:
+        manager.engine.dispose()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+
+if __name__ == "__main__":
+    main()
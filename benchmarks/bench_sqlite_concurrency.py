@@ -0,0 +1,118 @@
+"""
+Concurrency benchmark of SQLite with its default settings versus the production profile.
+
+Several writer processes add movies through SQLiteDataManager (one transaction per movie,
+as the add_movie route does) while reader processes load user pages. Each configuration
+runs against a fresh temporary database and reports write throughput, read throughput
+and the number of "database is locked" errors.
+
+Run from the repository root:
+    python -m benchmarks.bench_sqlite_concurrency --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from sqlalchemy.exc import OperationalError
+from data.database import db, User, Movie
+from data.sqlite_tuning import DEFAULT_PROFILE
+from data_manager import SQLiteDataManager
+
+PROFILES = {
+    "default": {},
+    "tuned": DEFAULT_PROFILE,
+}
+
+
+def writer(db_path, profile, user_id, deadline, results):
+    """
+    Adds movies until the deadline and reports how many succeeded and how many hit a lock.
+    """
+    manager = SQLiteDataManager(db_path, sqlite_profile=profile)
+    written = locked = 0
+    while time.time() < deadline:
+        try:
+            manager.add_movie(Movie(name=f"Movie {written}", director="Unknown", year=2000,
+                                    rating=7.0, user_id=user_id))
+            written += 1
+        except OperationalError:
+            locked += 1
+        except Exception as error:
+            if "locked" in str(error):
+                locked += 1
+            else:
+                raise
+    results.put(("write", written, locked))
+
+
+def reader(db_path, profile, user_count, deadline, results):
+    """
+    Loads user pages until the deadline and reports how many succeeded and how many hit a lock.
+    """
+    manager = SQLiteDataManager(db_path, sqlite_profile=profile)
+    done = locked = 0
+    while time.time() < deadline:
+        try:
+            manager.get_user_movies(done % user_count + 1, limit=24)
+            done += 1
+        except Exception as error:
+            if "locked" in str(error):
+                locked += 1
+            else:
+                raise
+    results.put(("read", done, locked))
+
+
+def run(profile, writers, readers, seconds):
+    """
+    Runs one configuration and returns writes/s, reads/s and lock errors.
+    """
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    setup = SQLiteDataManager(db_path, sqlite_profile=profile)
+    db.metadata.create_all(setup.engine)
+    session = setup.Session()
+    session.add_all([User(id=i, name=f"User {i}") for i in range(1, writers + 2)])
+    session.commit()
+    session.close()
+    setup.engine.dispose()
+
+    results = multiprocessing.Queue()
+    deadline = time.time() + seconds
+    processes = [multiprocessing.Process(target=writer, args=(db_path, profile, i + 1, deadline, results))
+                 for i in range(writers)]
+    processes += [multiprocessing.Process(target=reader, args=(db_path, profile, writers, deadline, results))
+                  for _ in range(readers)]
+    for process in processes:
+        process.start()
+
+    totals = {"write": 0, "read": 0, "locked": 0}
+    for _ in processes:
+        kind, count, locked = results.get()
+        totals[kind] += count
+        totals["locked"] += locked
+    for process in processes:
+        process.join()
+
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    return totals["write"] / seconds, totals["read"] / seconds, totals["locked"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=4, help="writer processes (default: 4)")
+    parser.add_argument("--readers", type=int, default=4, help="reader processes (default: 4)")
+    parser.add_argument("--seconds", type=float, default=5, help="duration per configuration (default: 5)")
+    args = parser.parse_args()
+
+    print(f"{'profile':<8} {'writes/s':>10} {'reads/s':>10} {'locked':>7}")
+    for name, profile in PROFILES.items():
+        writes, reads, locked = run(profile, args.writers, args.readers, args.seconds)
+        print(f"{name:<8} {writes:>10.0f} {reads:>10.0f} {locked:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Benchmark of the user movie page query with and without the user_movies indexes.
+
+Fills a temporary SQLite database with synthetic movies, times loading a user's movies
+(unsorted and sorted by name, year and rating) without indexes, then creates the indexes
+from the model and times the same queries again.
+
+Run from the repository root:
+    python -m benchmarks.bench_user_movie_indexes --movies 1000000 --users 1000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from data.database import db, User, Movie
+
+SORTS = {
+    "unsorted": None,
+    "name": Movie.name,
+    "year": Movie.year,
+    "rating": Movie.rating,
+}
+
+
+def populate(engine, movie_count, user_count, seed=42):
+    """
+    Creates the schema without the user_movies indexes and inserts synthetic users and movies.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        movie_count (int): Number of movies to insert.
+        user_count (int): Number of users the movies are spread over.
+        seed (int): Seed for the random generator, so runs are comparable.
+    """
+    db.metadata.create_all(engine)
+    rng = random.Random(seed)
+    with engine.begin() as connection:
+        for index in Movie.__table__.indexes:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+        connection.execute(User.__table__.insert(), [{"id": i, "name": f"User {i}"} for i in range(1, user_count + 1)])
+        batch = []
+        for movie_id in range(1, movie_count + 1):
+            batch.append({
+                "id": movie_id,
+                "name": f"Movie {rng.randrange(10 ** 6):06d}",
+                "director": "Unknown",
+                "year": rng.randint(1920, 2025),
+                "rating": round(rng.uniform(1, 10), 1),
+                "poster": None,
+                "user_id": rng.randint(1, user_count),
+            })
+            if len(batch) == 50000:
+                connection.execute(Movie.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Movie.__table__.insert(), batch)
+
+
+def time_queries(engine, user_ids, repeat):
+    """
+    Times loading the movies of the given users for every sort order.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        user_ids (list): The users whose pages are loaded.
+        repeat (int): How often each user's page is loaded.
+
+    Returns:
+        dict: Median milliseconds per sort order.
+    """
+    results = {}
+    with Session(engine) as session:
+        for sort, column in SORTS.items():
+            timings = []
+            for _ in range(repeat):
+                for user_id in user_ids:
+                    statement = select(Movie.id, Movie.name, Movie.year, Movie.rating).where(Movie.user_id == user_id)
+                    if column is not None:
+                        statement = statement.order_by(column, Movie.id)
+                    started = time.perf_counter()
+                    session.execute(statement).all()
+                    timings.append((time.perf_counter() - started) * 1000)
+            results[sort] = statistics.median(timings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=1000000, help="number of movies (default: 1,000,000)")
+    parser.add_argument("--users", type=int, default=1000, help="number of users (default: 1,000)")
+    parser.add_argument("--samples", type=int, default=20, help="users whose page is timed (default: 20)")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions per user (default: 3)")
+    args = parser.parse_args()
+
+    fd, db_path = tempfile.mkstemp(suffix=".sqlite")
+    os.close(fd)
+    engine = create_engine(f"sqlite:///{db_path}")
+    try:
+        print(f"Populating {args.movies:,} movies for {args.users:,} users...")
+        populate(engine, args.movies, args.users)
+        user_ids = random.Random(7).sample(range(1, args.users + 1), min(args.samples, args.users))
+
+        before = time_queries(engine, user_ids, args.repeat)
+
+        with engine.begin() as connection:
+            for index in Movie.__table__.indexes:
+                index.create(connection)
+            connection.execute(text("ANALYZE"))
+        after = time_queries(engine, user_ids, args.repeat)
+
+        with engine.connect() as connection:
+            plan = connection.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id, sort_name FROM user_movies WHERE user_id = 1 ORDER BY sort_name, id"
+            )).all()
+        print("Query plan with indexes:", "; ".join(row[-1] for row in plan))
+
+        print(f"{'query':<10} {'no index (ms)':>14} {'indexed (ms)':>13} {'speedup':>8}")
+        for sort in SORTS:
+            print(f"{sort:<10} {before[sort]:>14.2f} {after[sort]:>13.2f} {before[sort] / after[sort]:>7.1f}x")
+    finally:
+        engine.dispose()
+        os.remove(db_path)
+
+
+if __name__ == "__main__":
+    main()
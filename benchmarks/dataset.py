@@ -0,0 +1,195 @@
+"""
+Synthetic dataset generator for the benchmarks.
+
+Creates an SQLite database with the application's schema (including the search index) and
+fills it with users and movies whose distributions resemble real collections:
+
+- collection sizes follow a Zipf law, so a few users own most of the movies;
+- titles are drawn from a catalog by Zipf popularity, so popular movies are in many collections
+  and share their catalog entry, while the long tail is owned by one user or none;
+- ratings cluster around 6.5 and release years lean towards recent decades;
+- most catalog movies have an http poster URL, hand-entered movies have none.
+
+The same arguments and seed always produce the same database.
+
+Run from the repository root:
+    python -m benchmarks.dataset --users 1000 --movies 100000 --output /tmp/movies.sqlite
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from data.database import db, User, Movie, CatalogMovie
+from data.sqlite_tuning import apply_sqlite_profile
+from data.user_stats import rebuild_user_stats
+from omdb_cache import normalize_title
+
+WORDS = ["star", "night", "love", "dark", "city", "blue", "war", "king", "last", "house", "river", "ghost",
+         "summer", "secret", "heart", "road", "storm", "dream", "shadow", "golden", "wild", "lost", "fire", "moon"]
+NAMES = ["Scott", "Mann", "Nolan", "Lucas", "Bigelow", "Kubrick", "Varda", "Kurosawa", "Campion", "Lynch"]
+BATCH_SIZE = 50000
+
+
+def zipf_weights(count, exponent):
+    """
+    Returns cumulative Zipf weights for `random.choices`, so the first items are the most likely.
+
+    Args:
+        count (int): Number of items.
+        exponent (float): The skew; 0 is uniform, larger values concentrate on the first items.
+
+    Returns:
+        list: Cumulative weights.
+    """
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def _title(rng):
+    return " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+
+
+def _rating(rng):
+    return round(min(max(rng.gauss(6.5, 1.3), 1.0), 10.0), 1)
+
+
+def _year(rng):
+    return max(2025 - int(rng.expovariate(1 / 18)), 1920)
+
+
+def generate(engine, users=1000, movies=100000, catalog_size=None, user_skew=1.1, title_skew=0.9,
+             catalog_share=0.9, personal_ratings=0.2, seed=42):
+    """
+    Creates the schema on an empty database and inserts a synthetic dataset.
+
+    Args:
+        engine (Engine): The engine of the benchmark database.
+        users (int): Number of users.
+        movies (int): Number of movies across all collections.
+        catalog_size (int, optional): Number of catalog movies; defaults to a quarter of `movies`.
+        user_skew (float): Zipf exponent of the collection sizes.
+        title_skew (float): Zipf exponent of the title popularity.
+        catalog_share (float): Share of movies linked to the catalog; the rest are entered by hand.
+        personal_ratings (float): Share of catalog movies whose user changed the rating.
+        seed (int): Seed for the random generator.
+
+    Returns:
+        dict: The parameters of the dataset, recorded with benchmark results.
+    """
+    catalog_size = catalog_size or max(movies // 4, 1)
+    rng = random.Random(seed)
+    db.metadata.create_all(engine)
+    added_start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{"id": i, "name": f"User {i}", "updated_at": added_start}
+                                                     for i in range(1, users + 1)])
+        catalog = []
+        for index in range(catalog_size):
+            title = f"{_title(rng)} {index}"
+            catalog.append({
+                "imdb_id": f"tt{index:08d}",
+                "title": title,
+                "title_key": normalize_title(title),
+                "director": f"{rng.choice(NAMES)} {rng.choice(NAMES)}",
+                "year": _year(rng),
+                "rating": _rating(rng),
+                "poster": f"https://posters.example.com/{index}.jpg" if rng.random() < 0.95 else "N/A",
+                "fetched_at": added_start,
+            })
+        for start in range(0, len(catalog), BATCH_SIZE):
+            connection.execute(CatalogMovie.__table__.insert(), catalog[start:start + BATCH_SIZE])
+
+        user_ids = range(1, users + 1)
+        user_weights = zipf_weights(users, user_skew)
+        title_weights = zipf_weights(catalog_size, title_skew)
+        batch = []
+        for movie_id in range(1, movies + 1):
+            if rng.random() < catalog_share:
+                entry = catalog[rng.choices(range(catalog_size), cum_weights=title_weights)[0]]
+                row = {"name": None, "director": None, "year": None,
+                       "rating": _rating(rng) if rng.random() < personal_ratings else None,
+                       "imdb_id": entry["imdb_id"], "poster": None}
+            else:
+                row = {"name": _title(rng), "director": "Unknown", "year": _year(rng), "rating": _rating(rng),
+                       "imdb_id": None, "poster": None}
+            row.update(id=movie_id, user_id=rng.choices(user_ids, cum_weights=user_weights)[0],
+                       added_at=added_start + timedelta(minutes=movie_id))
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                connection.execute(Movie.__table__.insert(), batch)
+                batch = []
+        if batch:
+            connection.execute(Movie.__table__.insert(), batch)
+
+    with Session(engine) as session:
+        rebuild_user_stats(session)
+        session.commit()
+
+    return {"users": users, "movies": movies, "catalog_size": catalog_size, "user_skew": user_skew,
+            "title_skew": title_skew, "catalog_share": catalog_share,
+            "personal_ratings": personal_ratings, "seed": seed}
+
+
+def create_dataset(path, **kwargs):
+    """
+    Generates a dataset into a new SQLite file, tuned with the application's default profile.
+
+    Args:
+        path (str): The file to create; it must not exist.
+        **kwargs: Passed to `generate`.
+
+    Returns:
+        dict: The parameters of the dataset.
+
+    Raises:
+        FileExistsError: If the file exists, so a real database is never filled by accident.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} exists; the generator only writes new files.")
+    engine = create_engine(f"sqlite:///{path}")
+    apply_sqlite_profile(engine)
+    try:
+        return generate(engine, **kwargs)
+    finally:
+        engine.dispose()
+
+
+def add_arguments(parser):
+    """
+    Adds the dataset options to an argument parser, shared with the benchmark suite.
+    """
+    parser.add_argument("--users", type=int, default=1000, help="number of users (default: 1,000)")
+    parser.add_argument("--movies", type=int, default=100000, help="number of movies (default: 100,000)")
+    parser.add_argument("--catalog-size", type=int, default=None, help="catalog movies (default: movies / 4)")
+    parser.add_argument("--user-skew", type=float, default=1.1, help="Zipf exponent of collection sizes")
+    parser.add_argument("--title-skew", type=float, default=0.9, help="Zipf exponent of title popularity")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (default: 42)")
+
+
+def dataset_options(args):
+    return {"users": args.users, "movies": args.movies, "catalog_size": args.catalog_size,
+            "user_skew": args.user_skew, "title_skew": args.title_skew, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.add_argument("--output", required=True, help="SQLite file to create")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    create_dataset(args.output, **dataset_options(args))
+    engine = create_engine(f"sqlite:///{args.output}")
+    with engine.connect() as connection:
+        largest = connection.exec_driver_sql("SELECT max(movie_count), avg(movie_count) FROM users").one()
+    engine.dispose()
+    print(f"Created {args.output} with {args.users:,} users and {args.movies:,} movies "
+          f"in {time.perf_counter() - started:.1f} s; largest collection {largest[0]:,}, mean {largest[1]:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+A local stand-in for the OMDb API, used by the load test.
+
+Answers `?t=<title>` like OMDb, after a configurable latency, and can fail a share of the
+requests with 503 or throttle them with 429 once more than `rate_limit` requests arrive
+per second, like OMDb's daily limit does in miniature. Every title is found, except titles
+starting with "missing".
+
+Run on its own, e.g. to point a development server at it:
+    python -m benchmarks.fake_omdb --port 8081 --latency 200 --error-rate 0.05
+    OMDB_BASE_URL=http://127.0.0.1:8081/ OMDB_API_KEY=fake flask run
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average, with bursts of up to `rate` requests.
+    """
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """
+        Takes a token if one is left.
+
+        Returns:
+            bool: True if the request is allowed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+def movie_payload(title):
+    """
+    Builds an OMDb answer for a title. The same title always gets the same data.
+
+    Args:
+        title (str): The requested title.
+
+    Returns:
+        dict: The OMDb JSON body.
+    """
+    if title.lower().startswith("missing"):
+        return {"Response": "False", "Error": "Movie not found!"}
+    seed = zlib.crc32(title.lower().encode())
+    return {
+        "Response": "True",
+        "Title": title,
+        "Year": str(1950 + seed % 75),
+        "Director": "Load Test",
+        "imdbRating": f"{1 + seed % 90 / 10:.1f}",
+        "imdbID": f"tt8{seed % 10 ** 7:07d}",
+        "Poster": f"https://posters.example.com/{seed}.jpg",
+    }
+
+
+class FakeOMDbHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        title = parse_qs(urlparse(self.path).query).get("t", [""])[0]
+        with server.lock:
+            server.stats["requests"] += 1
+
+        if server.bucket is not None and not server.bucket.take():
+            status, body = 429, {"Response": "False", "Error": "Request limit reached!"}
+        else:
+            delay = max(server.random.gauss(server.latency, server.jitter), 0) if server.latency else 0
+            time.sleep(delay)
+            if server.random.random() < server.error_rate:
+                status, body = 503, {"Response": "False", "Error": "Service unavailable"}
+            else:
+                status, body = 200, movie_payload(title)
+
+        with server.lock:
+            server.stats[str(status)] = server.stats.get(str(status), 0) + 1
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOMDb:
+    """
+    Runs the fake OMDb server on a background thread.
+    """
+    def __init__(self, host="127.0.0.1", port=0, latency=0.1, jitter=None, error_rate=0.0, rate_limit=None,
+                 seed=1):
+        """
+        Initializes the server; it starts accepting requests with `start`.
+
+        Args:
+            host (str): The interface to listen on.
+            port (int): The port; 0 picks a free one.
+            latency (float): Mean response time in seconds.
+            jitter (float, optional): Standard deviation of the response time; defaults to a quarter of `latency`.
+            error_rate (float): Share of requests answered with 503.
+            rate_limit (float, optional): Requests per second above which 429 is returned.
+            seed (int): Seed of the latency and error randomness.
+        """
+        self.server = ThreadingHTTPServer((host, port), FakeOMDbHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency
+        self.server.jitter = latency / 4 if jitter is None else jitter
+        self.server.error_rate = error_rate
+        self.server.bucket = TokenBucket(rate_limit) if rate_limit else None
+        self.server.random = random.Random(seed)
+        self.server.lock = threading.Lock()
+        self.server.stats = {"requests": 0}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def stats(self):
+        """
+        Returns the number of requests received and answered per status code.
+
+        Returns:
+            dict: "requests" and one count per status, e.g. "200", "429", "503".
+        """
+        with self.server.lock:
+            return dict(self.server.stats)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=200, help="mean latency in ms (default: 200)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of 503 answers (default: 0)")
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second before 429")
+    args = parser.parse_args()
+
+    with FakeOMDb(port=args.port, latency=args.latency / 1000, error_rate=args.error_rate,
+                  rate_limit=args.rate_limit) as fake:
+        print(f"Fake OMDb listening on {fake.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(fake.stats())
+
+
+if __name__ == "__main__":
+    main()
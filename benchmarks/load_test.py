@@ -0,0 +1,381 @@
+"""
+Load test of the application behind a real WSGI server, with OMDb replaced by a local fake.
+
+Generates a dataset, starts the fake OMDb (`benchmarks.fake_omdb`) and the app in a separate
+process, then lets `--concurrency` simulated users send a mix of requests for `--duration`
+seconds: the users list, movie pages, searches, and adding (which asks OMDb), updating and
+deleting movies. Page views favour users with large collections. Throughput and the
+p50/p95/p99 latency of every endpoint are reported, together with what the fake OMDb saw.
+
+Making OMDb slow (`--omdb-latency`), flaky (`--omdb-error-rate`) or throttled (`--omdb-rate-limit`)
+shows how add-movie requests queue and whether they hold up the read endpoints.
+
+The app runs on Werkzeug's threaded server by default, or on gunicorn with `--server gunicorn`
+(`pip install gunicorn`), which bounds the number of requests handled at once by
+`--workers` times `--threads`.
+
+The pages need the built stylesheet, so run `flask build-assets` before the first load test.
+
+Run from the repository root:
+    python -m benchmarks.load_test --concurrency 32 --duration 30 --omdb-latency 500
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+import requests
+from sqlalchemy import create_engine, text
+from benchmarks.dataset import add_arguments, create_dataset, dataset_options
+from benchmarks.fake_omdb import FakeOMDb
+
+DEFAULT_MIX = {"list_users": 15, "user_movies": 45, "search": 10, "add_movie": 10, "update_movie": 10,
+               "delete_movie": 10}
+SORTS = ("name", "year", "rating")
+SEARCH_TERMS = ("star", "night", "king", "lo", "dark city", "moon")
+
+
+def percentile(sorted_values, share):
+    """
+    Returns the nearest-rank percentile of sorted values.
+
+    Args:
+        sorted_values (list): The values in ascending order.
+        share (float): The percentile as a share, e.g. 0.95.
+
+    Returns:
+        float: The value, or 0 if there are none.
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(max(math.ceil(share * len(sorted_values)) - 1, 0), len(sorted_values) - 1)]
+
+
+def parse_mix(value):
+    """
+    Parses a scenario mix such as `user_movies=60,add_movie=20`; endpoints not named keep weight 0.
+
+    Returns:
+        dict: Weights by endpoint.
+    """
+    mix = dict.fromkeys(DEFAULT_MIX, 0)
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r}; known: {', '.join(DEFAULT_MIX)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Recorder:
+    """
+    Collects the latency and status of every request, by endpoint.
+    """
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        if not self.recording:
+            return
+        with self._lock:
+            self.latencies[endpoint].append(seconds)
+            self.statuses[endpoint][status] += 1
+
+    def summary(self, duration):
+        """
+        Summarizes the recorded requests.
+
+        Args:
+            duration (float): The measured seconds, for the throughput.
+
+        Returns:
+            dict: Per endpoint and in total: requests, requests per second, p50/p95/p99/max in
+            milliseconds, errors (5xx and failed connections) and the count of every status.
+        """
+        def summarize(latencies, statuses):
+            values = sorted(latencies)
+            errors = sum(count for status, count in statuses.items() if status == "error" or str(status)[0] == "5")
+            return {
+                "requests": len(values),
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+                "errors": errors,
+                "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+            }
+
+        with self._lock:
+            endpoints = {endpoint: summarize(self.latencies[endpoint], self.statuses[endpoint])
+                         for endpoint in sorted(self.latencies)}
+            total_statuses = defaultdict(int)
+            for statuses in self.statuses.values():
+                for status, count in statuses.items():
+                    total_statuses[status] += count
+            total = summarize([value for values in self.latencies.values() for value in values], total_statuses)
+        return {"endpoints": endpoints, "total": total}
+
+
+class Scenario:
+    """
+    The requests of one simulated user. Movies to update and to delete come from separate shared
+    pools, so no two users delete the same movie and no movie is updated after it was deleted.
+    """
+    def __init__(self, base_url, mix, users, update_pool, delete_pool, recorder, seed, timeout=30):
+        self.base_url = base_url
+        self.endpoints = list(mix)
+        self.weights = list(mix.values())
+        self.user_ids, self.user_weights = users
+        self.update_pool = update_pool
+        self.delete_pool = delete_pool
+        self.recorder = recorder
+        self.random = random.Random(seed)
+        self.seed = seed
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.added = 0
+
+    def _request(self, endpoint, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, allow_redirects=False,
+                                            timeout=self.timeout, **kwargs)
+            response.content
+            status = response.status_code
+        except requests.exceptions.RequestException:
+            status = "error"
+        self.recorder.record(endpoint, time.perf_counter() - started, status)
+
+    def _user(self):
+        return self.random.choices(self.user_ids, weights=self.user_weights)[0]
+
+    def list_users(self):
+        self._request("list_users", "GET", "/users")
+
+    def user_movies(self):
+        sort = self.random.choice(SORTS)
+        self._request("user_movies", "GET", f"/users/{self._user()}?sort={sort}")
+
+    def search(self):
+        self._request("search", "GET", f"/users/{self._user()}/search", params={"q": self.random.choice(SEARCH_TERMS)})
+
+    def add_movie(self):
+        self.added += 1
+        self._request("add_movie", "POST", f"/add_movie/{self._user()}",
+                      data={"title": f"Load Test {self.seed}-{self.added}"})
+
+    def update_movie(self):
+        if not self.update_pool:
+            return self.user_movies()
+        user_id, movie_id, name = self.random.choice(self.update_pool)
+        self._request("update_movie", "POST", f"/users/{user_id}/update_movie/{movie_id}",
+                      data={"name": name, "director": "Load Test", "year": str(self.random.randint(1950, 2025)),
+                            "rating": f"{self.random.uniform(1, 10):.1f}"})
+
+    def delete_movie(self):
+        try:
+            user_id, movie_id = self.delete_pool.pop()
+        except IndexError:
+            return self.user_movies()
+        self._request("delete_movie", "POST", f"/users/{user_id}/delete_movie/{movie_id}")
+
+    def run(self, stop, think_time):
+        while not stop.is_set():
+            getattr(self, self.random.choices(self.endpoints, weights=self.weights)[0])()
+            if think_time:
+                time.sleep(self.random.expovariate(1 / think_time))
+        self.session.close()
+
+
+def load_targets(db_path, seed, pool_size=20000):
+    """
+    Reads the users and a sample of movies to update and delete from the generated database.
+
+    Returns:
+        tuple: (user IDs, weights by collection size), update pool, delete pool.
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    with engine.connect() as connection:
+        users = connection.execute(text("SELECT id, movie_count FROM users")).all()
+        movies = connection.execute(text("SELECT m.user_id, m.id, coalesce(m.name, c.title) FROM user_movies m "
+                                         "LEFT JOIN catalog c ON c.imdb_id = m.imdb_id ORDER BY random() LIMIT :limit"),
+                                    {"limit": pool_size}).all()
+    engine.dispose()
+    random.Random(seed).shuffle(movies)
+    half = len(movies) // 2
+    return (([user_id for user_id, _ in users], [count + 1 for _, count in users]),
+            [tuple(movie) for movie in movies[:half]], [(user_id, movie_id) for user_id, movie_id, _ in movies[half:]])
+
+
+def start_server(args, env, port):
+    """
+    Starts the app in a child process and waits until it answers.
+
+    Returns:
+        Popen: The server process.
+    """
+    if args.server == "gunicorn":
+        if shutil.which("gunicorn") is None:
+            sys.exit("gunicorn is not installed; run `pip install gunicorn` or use --server werkzeug.")
+        command = ["gunicorn", "--workers", str(args.workers), "--threads", str(args.threads),
+                   "--bind", f"127.0.0.1:{port}", "--log-level", "warning", "app:create_app()"]
+    else:
+        command = [sys.executable, "-m", "benchmarks.load_test", "serve", "--port", str(port)]
+
+    log = open(args.server_log, "ab") if args.server_log else subprocess.DEVNULL
+    process = subprocess.Popen(command, env=env, cwd=os.getcwd(), stdout=log, stderr=log)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"The server exited with status {process.returncode}.")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    sys.exit("The server did not start within 60 seconds.")
+
+
+def serve(port):
+    """
+    Runs the app on Werkzeug's threaded WSGI server; started as the child process of a load test.
+    """
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    make_server("127.0.0.1", port, create_app(), threaded=True).serve_forever()
+
+
+def run(args):
+    """
+    Runs one load test as configured by the command line.
+
+    Returns:
+        dict: The configuration, the per-endpoint summary and the fake OMDb statistics.
+    """
+    from assets import ASSETS_DIR, load_manifest, missing_bundles
+    unbuilt = missing_bundles(load_manifest(os.path.join(os.path.dirname(ASSETS_DIR), "static")))
+    if unbuilt:
+        raise SystemExit(f"Asset bundles not built: {', '.join(unbuilt)}; run `flask build-assets` first.")
+
+    directory = tempfile.mkdtemp(prefix="movieweb-load-")
+    db_path = os.path.join(directory, "movies.sqlite")
+    create_dataset(db_path, **dataset_options(args))
+    users, update_pool, delete_pool = load_targets(db_path, args.seed)
+
+    fake = FakeOMDb(latency=args.omdb_latency / 1000, error_rate=args.omdb_error_rate,
+                    rate_limit=args.omdb_rate_limit).start()
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=db_path, OMDB_BASE_URL=fake.url, OMDB_API_KEY="load-test",
+               SECRET_KEY="load-test", POSTER_DIR=os.path.join(directory, "posters"),
+               OMDB_RETRIES=str(args.omdb_retries))
+    env.pop("OMDB_CACHE_DB", None)
+    server = start_server(args, env, port)
+
+    recorder = Recorder()
+    stop = threading.Event()
+    scenarios = [Scenario(f"http://127.0.0.1:{port}", args.mix, users, update_pool, delete_pool, recorder,
+                          seed=args.seed + index) for index in range(args.concurrency)]
+    threads = [threading.Thread(target=scenario.run, args=(stop, args.think_time / 1000), daemon=True)
+               for scenario in scenarios]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup)
+        recorder.recording = True
+        omdb_before = fake.stats()
+        started = time.perf_counter()
+        time.sleep(args.duration)
+        recorder.recording = False
+        measured = time.perf_counter() - started
+        omdb_after = fake.stats()
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=35)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+        fake.stop()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    return {
+        "config": {"server": args.server, "concurrency": args.concurrency, "duration": args.duration,
+                   "think_time_ms": args.think_time, "mix": args.mix, "dataset": dataset_options(args),
+                   "omdb": {"latency_ms": args.omdb_latency, "error_rate": args.omdb_error_rate,
+                            "rate_limit": args.omdb_rate_limit, "retries": args.omdb_retries}},
+        "measured_seconds": round(measured, 2),
+        **recorder.summary(measured),
+        "omdb": {key: value - omdb_before.get(key, 0) for key, value in omdb_after.items()},
+    }
+
+
+def print_report(report):
+    print(f"{'endpoint':<14} {'requests':>9} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'max (ms)':>9} {'errors':>7}  statuses")
+    rows = list(report["endpoints"].items()) + [("total", report["total"])]
+    for name, row in rows:
+        statuses = " ".join(f"{status}:{count}" for status, count in row["statuses"].items())
+        print(f"{name:<14} {row['requests']:>9} {row['rps']:>8.1f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['max_ms']:>9.1f} {row['errors']:>7}  {statuses}")
+    omdb = report["omdb"]
+    print(f"\nFake OMDb: {omdb.get('requests', 0)} requests, "
+          + ", ".join(f"{status}: {count}" for status, count in sorted(omdb.items()) if status != "requests"))
+
+
+def main():
+    if sys.argv[1:2] == ["serve"]:
+        parser = argparse.ArgumentParser(prog="benchmarks.load_test serve")
+        parser.add_argument("serve")
+        parser.add_argument("--port", type=int, required=True)
+        serve(parser.parse_args().port)
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(parser)
+    parser.set_defaults(movies=20000, users=500)
+    parser.add_argument("--concurrency", type=int, default=16, help="simulated users (default: 16)")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds (default: 30)")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds first (default: 3)")
+    parser.add_argument("--think-time", type=float, default=0, help="mean pause between requests in ms")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="request weights, e.g. user_movies=60,add_movie=20 (default: %(default)s)")
+    parser.add_argument("--server", choices=("werkzeug", "gunicorn"), default="werkzeug")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes (default: 2)")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker (default: 4)")
+    parser.add_argument("--omdb-latency", type=float, default=200, help="mean OMDb latency in ms (default: 200)")
+    parser.add_argument("--omdb-error-rate", type=float, default=0.0, help="share of OMDb 503 answers")
+    parser.add_argument("--omdb-rate-limit", type=float, default=None, help="OMDb requests per second before 429")
+    parser.add_argument("--omdb-retries", type=int, default=3, help="OMDB_RETRIES of the app (default: 3)")
+    parser.add_argument("--server-log", help="append the server's output to this file")
+    parser.add_argument("--output", help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""
+Benchmark suite: microbenchmarks of every SQLiteDataManager method, end-to-end route
+timings through the Flask test client, on a generated dataset with OMDb stubbed out, and
+the startup time of a fresh interpreter importing the app and running `create_app`.
+
+Results are written as JSON. A saved result can serve as the baseline of a later run; medians
+that got slower by more than the threshold are reported as regressions and make the command
+exit with status 1, so it can gate a CI job.
+
+Run from the repository root:
+    python -m benchmarks.suite run --movies 100000 --output baseline.json
+    python -m benchmarks.suite run --movies 100000 --output current.json --baseline baseline.json
+    python -m benchmarks.suite compare baseline.json current.json --threshold 0.15
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from unittest.mock import patch
+from benchmarks.dataset import add_arguments, create_dataset, dataset_options
+
+DEFAULT_THRESHOLD = 0.10
+# Differences below this many milliseconds are noise, whatever their ratio.
+DEFAULT_MIN_DELTA_MS = 0.05
+SUITES = ("data_manager", "routes", "startup")
+
+
+def measure(function, repeat=20, warmup=2, setup=None):
+    """
+    Times a function and summarizes the runs.
+
+    Args:
+        function (callable): The code to time, called without arguments.
+        repeat (int): Number of timed runs.
+        warmup (int): Untimed runs before, to fill caches and pools.
+        setup (callable, optional): Called untimed before every run.
+
+    Returns:
+        dict: Median, 95th percentile, minimum and mean in milliseconds, and the number of runs.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        function()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "median_ms": round(statistics.median(timings), 4),
+        "p95_ms": round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 4),
+        "min_ms": round(timings[0], 4),
+        "mean_ms": round(statistics.fmean(timings), 4),
+        "runs": repeat,
+    }
+
+
+def probe_users(engine):
+    """
+    Picks the users the benchmarks run against: the largest collection and a typical one.
+
+    Returns:
+        dict: User IDs by role, "heavy" and "typical".
+    """
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql("SELECT id FROM users ORDER BY movie_count DESC, id").all()
+    return {"heavy": rows[0][0], "typical": rows[len(rows) // 2][0]}
+
+
+def stub_movie(title):
+    """
+    Stands in for `omdb_api.fetch_movie_data`, answering every title without the network.
+    """
+    return {"imdb_id": f"tt9{zlib.crc32(title.encode()) % 10 ** 7:07d}", "title": title, "director": "Bench Director",
+            "year": 2001, "rating": 7.5, "poster": "https://posters.example.com/bench.jpg"}
+
+
+def data_manager_benchmarks(manager, users, repeat):
+    """
+    Times every SQLiteDataManager method and a unit of work of several writes. Read methods run first,
+    so the writes do not change their data.
+
+    Args:
+        manager (SQLiteDataManager): The data manager on the benchmark database.
+        users (dict): User IDs from `probe_users`.
+        repeat (int): Timed runs per benchmark.
+
+    Returns:
+        dict: Results by benchmark name.
+    """
+    from data.database import User, Movie
+
+    heavy, typical = users["heavy"], users["typical"]
+    movie_id = manager.get_user_movies(heavy, limit=1)[0].id
+    middle = manager.get_movie_rows(heavy, limit=max(len(manager.get_movie_rows(heavy)) // 2, 1)).next_cursor
+    results = {
+        "data_manager.get_all_users": measure(manager.get_all_users, max(repeat // 4, 3)),
+        "data_manager.get_user": measure(lambda: manager.get_user(heavy), repeat),
+        "data_manager.get_user_rows": measure(manager.get_user_rows, max(repeat // 4, 3)),
+        "data_manager.get_user_movies[heavy,name]": measure(lambda: manager.get_user_movies(heavy), repeat),
+        "data_manager.get_user_movies[heavy,rating desc]":
+            measure(lambda: manager.get_user_movies(heavy, sort="rating", direction="desc"), repeat),
+        "data_manager.get_user_movies[typical,name]": measure(lambda: manager.get_user_movies(typical), repeat),
+        "data_manager.get_movie_rows[heavy,name]": measure(lambda: manager.get_movie_rows(heavy), repeat),
+        "data_manager.get_movie_rows[heavy,rating desc,24]":
+            measure(lambda: manager.get_movie_rows(heavy, sort="rating", direction="desc", limit=24), repeat),
+        "data_manager.get_movie_rows[heavy,name,24 mid]":
+            measure(lambda: manager.get_movie_rows(heavy, cursor=middle, limit=24), repeat),
+        "data_manager.iter_user_rows[100]": measure(lambda: list(manager.iter_user_rows(limit=100)), repeat),
+        "data_manager.iter_movie_rows[heavy,all]": measure(lambda: sum(1 for _ in manager.iter_movie_rows(heavy)),
+                                                           max(repeat // 4, 3)),
+        "data_manager.get_movie": measure(lambda: manager.get_movie(movie_id), repeat),
+        "data_manager.search_movies[heavy,star]": measure(lambda: manager.search_movies(heavy, "star"), repeat),
+        "data_manager.search_movies[heavy,prefix]": measure(lambda: manager.search_movies(heavy, "ki"), repeat),
+    }
+
+    added = []
+
+    def add_movie():
+        movie = Movie(name="Bench Movie", director="Bench Director", year=2001, rating=5.0, user_id=typical)
+        manager.add_movie(movie)
+        added.append(movie.id)
+
+    results["data_manager.add_user"] = measure(lambda: manager.add_user(User(name="Bench User")), repeat)
+    results["data_manager.add_movie"] = measure(add_movie, repeat)
+    movie = manager.get_movie(added[0])
+    results["data_manager.update_movie"] = measure(lambda: manager.update_movie(movie), repeat)
+    results["data_manager.delete_movie"] = measure(lambda: manager.delete_movie(added.pop()), repeat, warmup=0)
+
+    def add_movies_in_unit_of_work():
+        with manager.unit_of_work():
+            for _ in range(10):
+                add_movie()
+
+    def delete_added_in_unit_of_work():
+        with manager.unit_of_work():
+            while added:
+                manager.delete_movie(added.pop())
+
+    # Ten add_movie calls committed together, to compare with ten times data_manager.add_movie.
+    results["data_manager.unit_of_work[add_movie x10]"] = measure(add_movies_in_unit_of_work, repeat,
+                                                                   setup=delete_added_in_unit_of_work)
+    delete_added_in_unit_of_work()
+    return results
+
+
+def route_benchmarks(users, repeat):
+    """
+    Times requests through the Flask test client, with OMDb lookups answered by `stub_movie`.
+
+    The app is created here, after DATABASE_PATH points at the benchmark database.
+
+    Args:
+        users (dict): User IDs from `probe_users`.
+        repeat (int): Timed runs per benchmark.
+
+    Returns:
+        dict: Results by benchmark name.
+    """
+    from app import create_app
+    from assets import missing_bundles
+    from data.database import db, Movie
+
+    heavy, typical = users["heavy"], users["typical"]
+    app = create_app()
+    if missing_bundles(app.config['ASSET_MANIFEST']):
+        raise SystemExit("The route benchmarks render pages, which needs the stylesheet; run `flask build-assets` first.")
+    fragment_cache = app.extensions['fragment_cache']
+    client = app.test_client()
+    clear_fragments = fragment_cache.clear if fragment_cache is not None else None
+
+    def get(path, **kwargs):
+        def request():
+            response = client.get(path, **kwargs)
+            response.get_data()
+            assert response.status_code in (200, 304), f"{path}: {response.status_code}"
+            response.close()
+        return request
+
+    etag = client.get(f"/users/{heavy}").headers["ETag"]
+    results = {
+        "route.home": measure(get("/"), repeat),
+        "route.list_users": measure(get("/users"), repeat),
+        "route.user_movies[heavy]": measure(get(f"/users/{heavy}"), repeat, setup=clear_fragments),
+        "route.user_movies[heavy,fragment cached]": measure(get(f"/users/{heavy}"), repeat),
+        "route.user_movies[heavy,304]": measure(get(f"/users/{heavy}", headers={"If-None-Match": etag}), repeat),
+        "route.user_movies[heavy,rating desc]": measure(get(f"/users/{heavy}?sort=rating&dir=desc"), repeat,
+                                                        setup=clear_fragments),
+        "route.user_movies[typical]": measure(get(f"/users/{typical}"), repeat, setup=clear_fragments),
+        "route.search[heavy]": measure(get(f"/users/{heavy}/search?q=star"), repeat),
+        "route.api_movies[heavy,100]": measure(get(f"/api/v1/users/{heavy}/movies?limit=100"), repeat),
+        "route.export_csv[heavy]": measure(get(f"/users/{heavy}/export.csv"), max(repeat // 4, 3)),
+    }
+
+    titles = iter(range(10 ** 9))
+    with patch("catalog.fetch_movie_data", side_effect=stub_movie):
+        results["route.add_movie[stubbed OMDb]"] = measure(
+            lambda: client.post(f"/add_movie/{typical}", data={"title": f"Bench Title {next(titles)}"}), repeat)
+
+    with app.app_context():
+        added = db.session.scalars(db.select(Movie.id).where(Movie.user_id == typical,
+                                                             Movie.director == "Bench Director")).all()
+    results["route.delete_movie"] = measure(
+        lambda: client.post(f"/users/{typical}/delete_movie/{added.pop()}"), min(repeat, len(added)), warmup=0)
+    return results
+
+
+def startup_benchmarks(path, repeat):
+    """
+    Times how long a new process takes to import the app and to create it, as every worker,
+    test run and CLI invocation does. Each run starts a fresh interpreter, so nothing is cached.
+
+    Args:
+        path (str): The benchmark database.
+        repeat (int): Timed runs per benchmark.
+
+    Returns:
+        dict: Results by benchmark name; "startup.python" is the interpreter alone, for reference.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DATABASE_PATH=path, POSTER_DIR=os.path.join(os.path.dirname(path), "posters"))
+
+    def python(code, **extra_env):
+        return lambda: subprocess.run([sys.executable, "-c", code], cwd=root, env=dict(env, **extra_env), check=True)
+
+    runs = max(repeat // 4, 3)
+    return {
+        "startup.python": measure(python("pass"), runs, warmup=1),
+        "startup.import_app": measure(python("import app"), runs, warmup=1),
+        "startup.create_app": measure(python("from app import create_app; create_app()"), runs, warmup=1),
+        "startup.create_app_without_migrations": measure(
+            python("from app import create_app; create_app()", MIGRATIONS="false"), runs, warmup=1),
+    }
+
+
+def git_commit():
+    """
+    Returns the current commit of the working tree, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options, repeat=20, suites=SUITES):
+    """
+    Generates a dataset in a temporary file and runs the benchmark suites against it.
+
+    Args:
+        options (dict): Dataset parameters for `benchmarks.dataset.generate`.
+        repeat (int): Timed runs per benchmark.
+        suites (tuple): Which suites to run: "data_manager", "routes" and/or "startup".
+
+    Returns:
+        dict: The results document with its metadata.
+    """
+    from data_manager import SQLiteDataManager
+
+    directory = tempfile.mkdtemp(prefix="movieweb-bench-")
+    path = os.path.join(directory, "movies.sqlite")
+    started = time.perf_counter()
+    dataset = create_dataset(path, **options)
+    generation_seconds = time.perf_counter() - started
+
+    manager = SQLiteDataManager(path)
+    users = probe_users(manager.engine)
+    results = {}
+    if "data_manager" in suites:
+        results.update(data_manager_benchmarks(manager, users, repeat))
+    manager.engine.dispose()
+    if "routes" in suites:
+        os.environ["DATABASE_PATH"] = path
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+        os.environ.setdefault("POSTER_DIR", os.path.join(directory, "posters"))
+        results.update(route_benchmarks(users, repeat))
+    if "startup" in suites:
+        results.update(startup_benchmarks(path, repeat))
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "dataset": dataset,
+            "dataset_seconds": round(generation_seconds, 2),
+            "users": users,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD, min_delta_ms=DEFAULT_MIN_DELTA_MS):
+    """
+    Compares the medians of two result documents.
+
+    Args:
+        baseline (dict): The saved results.
+        current (dict): The new results.
+        threshold (float): Relative slowdown above which a benchmark counts as a regression, e.g. 0.1 for 10%.
+        min_delta_ms (float): Absolute difference below which a change is ignored.
+
+    Returns:
+        list: One (name, baseline ms, current ms, ratio, status) tuple per benchmark, where status is
+        "regression", "improvement", "ok", "new" or "missing".
+    """
+    rows = []
+    before, after = baseline["results"], current["results"]
+    for name in sorted(set(before) | set(after)):
+        if name not in before:
+            rows.append((name, None, after[name]["median_ms"], None, "new"))
+            continue
+        if name not in after:
+            rows.append((name, before[name]["median_ms"], None, None, "missing"))
+            continue
+        old, new = before[name]["median_ms"], after[name]["median_ms"]
+        ratio = new / old if old else float("inf")
+        if abs(new - old) < min_delta_ms:
+            status = "ok"
+        elif ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append((name, old, new, ratio, status))
+    return rows
+
+
+def print_results(document):
+    print(f"{'benchmark':<48} {'median (ms)':>12} {'p95 (ms)':>10} {'min (ms)':>10}")
+    for name, result in document["results"].items():
+        print(f"{name:<48} {result['median_ms']:>12.3f} {result['p95_ms']:>10.3f} {result['min_ms']:>10.3f}")
+
+
+def print_comparison(rows):
+    print(f"{'benchmark':<48} {'baseline':>10} {'current':>10} {'change':>8}  status")
+    for name, old, new, ratio, status in rows:
+        change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else ""
+        print(f"{name:<48} {old if old is not None else '':>10} {new if new is not None else '':>10} "
+              f"{change:>8}  {status}")
+
+
+def _load(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="generate a dataset and run the benchmarks")
+    add_arguments(run_parser)
+    run_parser.add_argument("--repeat", type=int, default=20, help="timed runs per benchmark (default: 20)")
+    run_parser.add_argument("--suite", choices=SUITES, action="append",
+                            help="run only this suite; may be repeated")
+    run_parser.add_argument("--output", help="write the results as JSON to this file")
+    run_parser.add_argument("--baseline", help="compare with the results in this file")
+    run_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="relative slowdown reported as a regression (default: 0.10)")
+
+    compare_parser = commands.add_parser("compare", help="compare two saved results")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="relative slowdown reported as a regression (default: 0.10)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        document = run(dataset_options(args), repeat=args.repeat, suites=tuple(args.suite or SUITES))
+        print_results(document)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(document, file, indent=2)
+        baseline = _load(args.baseline) if args.baseline else None
+    else:
+        baseline, document = _load(args.baseline), _load(args.current)
+
+    if baseline is not None:
+        if baseline["meta"].get("dataset") != document["meta"].get("dataset"):
+            print("Warning: the results were measured on different datasets.", file=sys.stderr)
+        rows = compare(baseline, document, threshold=args.threshold)
+        print()
+        print_comparison(rows)
+        regressions = [row[0] for row in rows if row[4] == "regression"]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}.", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+from data.database import db, CatalogMovie
+from data.user_stats import refresh_catalog_users
+from fragment_cache import invalidate_user_fragments
+from omdb_api import fetch_movie_data, fetch_many
+from omdb_cache import normalize_title
+
+
+def _movie_data(entry):
+    """
+    Converts a catalog entry into the movie data dictionary returned by the OMDb layer.
+
+    Args:
+        entry (CatalogMovie): The catalog entry.
+
+    Returns:
+        dict: Movie data with imdb_id, title, director, year, rating and poster.
+    """
+    return {
+        "imdb_id": entry.imdb_id,
+        "title": entry.title,
+        "director": entry.director,
+        "year": entry.year,
+        "rating": entry.rating,
+        "poster": entry.poster
+    }
+
+
+def store_in_catalog(movie_data, session=None):
+    """
+    Adds OMDb movie data to the catalog, or refreshes the existing entry with the same imdbID.
+    The session is flushed but not committed, so the caller controls the transaction.
+
+    The entry is created with INSERT ... ON CONFLICT DO NOTHING and then selected, so two
+    requests adding the same film at once both end up with the one entry instead of one of
+    them failing on the primary key.
+
+    Refreshing an entry changes the movies of every user who links to it, so if any value
+    changed, their aggregates and `updated_at` version stamps are refreshed in the same
+    transaction, and their cached movie grids are dropped.
+
+    Args:
+        movie_data (dict): Movie data as returned by `fetch_movie_data`.
+        session (Session, optional): The session to write with; defaults to `db.session`.
+
+    Returns:
+        CatalogMovie or None: The catalog entry, or None if the data has no imdbID.
+    """
+    imdb_id = movie_data.get("imdb_id")
+    if not imdb_id:
+        return None
+
+    session = session or db.session
+    entry = session.get(CatalogMovie, imdb_id)
+    if entry is None:
+        session.execute(insert(CatalogMovie)
+                           .values(imdb_id=imdb_id, title=movie_data["title"],
+                                   title_key=normalize_title(movie_data["title"]))
+                           .on_conflict_do_nothing(index_elements=["imdb_id"]))
+        entry = session.get(CatalogMovie, imdb_id)
+    values = {
+        "title": movie_data["title"],
+        "title_key": normalize_title(movie_data["title"]),
+        "director": movie_data.get("director"),
+        "year": movie_data.get("year"),
+        "rating": movie_data.get("rating"),
+        "poster": movie_data.get("poster"),
+    }
+    changed = {field: value for field, value in values.items() if getattr(entry, field) != value}
+    for field, value in changed.items():
+        setattr(entry, field, value)
+    session.flush()
+    if changed:
+        for user_id in refresh_catalog_users(session, imdb_id):
+            invalidate_user_fragments(user_id)
+    return entry
+
+
+def lookup_movie(title, session=None):
+    """
+    Finds a movie by title, using the catalog first and asking OMDb only if it is not there.
+    Must be called inside an application context.
+
+    Args:
+        title (str): Title of the movie to search for.
+        session (Session, optional): The session to read and write the catalog with;
+            defaults to `db.session`.
+
+    Returns:
+        dict or None: Movie data if found, otherwise None.
+    """
+    session = session or db.session
+    entry = session.scalars(select(CatalogMovie).filter_by(title_key=normalize_title(title)).limit(1)).first()
+    if entry is not None:
+        return _movie_data(entry)
+
+    movie_data = fetch_movie_data(title)
+    if movie_data:
+        store_in_catalog(movie_data, session)
+    return movie_data
+
+
+def lookup_movies(titles, concurrency=10, return_exceptions=False):
+    """
+    Finds many movies by title. Titles already in the catalog are resolved with one query,
+    the rest are looked up concurrently in OMDb and added to the catalog.
+    Must be called inside an application context.
+
+    Args:
+        titles (list): Titles of the movies to search for.
+        concurrency (int): Maximum number of OMDb lookups in flight.
+        return_exceptions (bool): Return the exception of a failed OMDb lookup in its place instead of None.
+
+    Returns:
+        list: Movie data dictionaries, None or exceptions, in the same order as `titles`.
+    """
+    keys = [normalize_title(title) for title in titles]
+    known = {}
+    for entry in db.session.scalars(select(CatalogMovie).where(CatalogMovie.title_key.in_(set(keys)))):
+        known.setdefault(entry.title_key, _movie_data(entry))
+
+    missing = [title for title, key in zip(titles, keys) if key not in known]
+    if missing:
+        results = fetch_many(missing, concurrency=concurrency, return_exceptions=return_exceptions)
+        for title, movie_data in zip(missing, results):
+            if movie_data and not isinstance(movie_data, Exception):
+                store_in_catalog(movie_data)
+            known[normalize_title(title)] = movie_data
+
+    return [known.get(key) for key in keys]
+
+
+def user_movie_fields(user_id, movie_data):
+    """
+    Builds the column values of a user's movie from movie data. Movies with a catalog entry
+    only link to it and read everything else from the catalog; others keep their own values.
+
+    Args:
+        user_id (int): The ID of the user who the movie belongs to.
+        movie_data (dict): Movie data as returned by `lookup_movie`.
+
+    Returns:
+        dict: Keyword arguments for `Movie` or rows for a bulk insert. Every call returns the
+        same keys, so the rows of one import can be inserted together.
+    """
+    imdb_id = movie_data.get("imdb_id")
+    if imdb_id:
+        return {"name_override": None, "director_override": None, "year_override": None,
+                "rating_override": None, "poster": None, "imdb_id": imdb_id, "user_id": user_id}
+    return {
+        "name_override": movie_data["title"],
+        "director_override": movie_data.get("director") or "Unknown",
+        "year_override": movie_data.get("year"),
+        "rating_override": movie_data.get("rating"),
+        "poster": movie_data.get("poster"),
+        "imdb_id": None,
+        "user_id": user_id
+    }
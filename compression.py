@@ -0,0 +1,222 @@
+import gzip
+import os
+import zlib
+from flask import request, send_file
+from fragment_cache import MemoryBackend
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it responses are only gzipped.
+    brotli = None
+
+COMPRESSIBLE_TYPES = {"text/html", "text/css", "text/csv", "text/plain", "application/json",
+                      "application/x-ndjson", "application/javascript", "image/svg+xml"}
+STATIC_VARIANTS = {"br": ".br", "gzip": ".gz"}
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_CACHE_SIZE = 128
+
+
+def available_encodings():
+    """
+    Returns the content codings this process can produce, preferred first.
+
+    Returns:
+        tuple: "br" if the brotli package is installed, and "gzip".
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def choose_encoding(accept_encodings, encodings):
+    """
+    Picks the content coding to answer with from the client's Accept-Encoding header.
+
+    Among the codings the client accepts with the highest quality, the one listed first in
+    `encodings` wins, so brotli is preferred over gzip when both are equally welcome.
+
+    Args:
+        accept_encodings (Accept): `request.accept_encodings`.
+        encodings (tuple): The codings that can be produced, preferred first.
+
+    Returns:
+        str or None: The chosen coding, or None to send the body uncompressed.
+    """
+    best, best_quality = None, 0
+    for encoding in encodings:
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level=6):
+    """
+    Compresses a response body.
+
+    Args:
+        data (bytes): The body.
+        encoding (str): "br" or "gzip".
+        level (int): The gzip level (1-9); brotli uses a quality of `level - 1` capped at 11 for comparable speed.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=min(max(level - 1, 0), 11))
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks, encoding, level=6):
+    """
+    Compresses a streamed body chunk by chunk, flushing after every chunk so that the client
+    receives rows as soon as they are produced.
+
+    Args:
+        chunks (Iterable): The body chunks, bytes or str.
+        encoding (str): "br" or "gzip".
+        level (int): The compression level as for `compress`.
+
+    Yields:
+        bytes: Compressed chunks.
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=min(max(level - 1, 0), 11))
+        process, flush = compressor.process, compressor.flush
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        process, finish = compressor.compress, compressor.flush
+        flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            output = process(chunk) + flush()
+            if output:
+                yield output
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
+
+
+class Compression:
+    """
+    Compresses HTML and JSON responses with gzip or brotli, negotiated through Accept-Encoding.
+
+    Bodies smaller than `min_size` are sent as they are. Compressed bodies of responses with an
+    ETag are kept in a small LRU keyed by ETag and coding, so a page that has not changed is not
+    compressed again on every request. Streamed responses (API lists, exports) are compressed
+    chunk by chunk. Static files are answered with their prebuilt `.br`/`.gz` sibling if
+    `flask build-assets` wrote one.
+    """
+    def __init__(self, app=None, min_size=DEFAULT_MIN_SIZE, level=6, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Initializes the compression and registers it with the app if one is given.
+
+        Args:
+            app (Flask, optional): The application.
+            min_size (int): Bodies smaller than this many bytes are not compressed.
+            level (int): The compression level (1-9).
+            cache_size (int): Maximum number of compressed bodies kept; 0 disables the cache.
+        """
+        self.min_size = min_size
+        self.level = level
+        self.cache = MemoryBackend(cache_size) if cache_size else None
+        self.encodings = available_encodings()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Registers the compression as the last after-request step of the app.
+
+        Args:
+            app (Flask): The application.
+        """
+        self.app = app
+        app.after_request_funcs.setdefault(None, []).insert(0, self.after_request)
+        app.extensions["compression"] = self
+
+    def after_request(self, response):
+        """
+        Compresses an outgoing response if the client accepts it and it is worth it.
+
+        Args:
+            response (Response): The outgoing response.
+
+        Returns:
+            Response: The compressed response, a precompressed static file, or the response unchanged.
+        """
+        if response.status_code != 200 or "Content-Encoding" in response.headers:
+            return response
+        if request.endpoint == "static":
+            return self._precompressed(response)
+        if response.direct_passthrough or response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings, self.encodings)
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, self.level)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self._compressed(data, encoding, response.get_etag()[0]))
+
+        response.headers["Content-Encoding"] = encoding
+        self._weaken_etag(response)
+        return response
+
+    def _compressed(self, data, encoding, etag):
+        """
+        Compresses a body, reusing the cached result for the same ETag and coding.
+        """
+        if self.cache is None or etag is None:
+            return compress(data, encoding, self.level)
+        body = self.cache.get(encoding, etag)
+        if body is None:
+            body = compress(data, encoding, self.level)
+            self.cache.set(encoding, etag, body)
+        return body
+
+    @staticmethod
+    def _weaken_etag(response):
+        """
+        Marks the ETag of a compressed response as weak: the bytes differ from the uncompressed
+        representation, but both stand for the same page, so either may be revalidated with it.
+        """
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+
+    def _precompressed(self, response):
+        """
+        Replaces a static file response with its prebuilt `.br` or `.gz` variant if the client accepts it.
+        """
+        filename = (request.view_args or {}).get("filename", "")
+        encodings = [encoding for encoding in STATIC_VARIANTS
+                     if os.path.isfile(os.path.join(self.app.static_folder, filename + STATIC_VARIANTS[encoding]))]
+        if not encodings:
+            return response
+
+        response.vary.add("Accept-Encoding")
+        encoding = choose_encoding(request.accept_encodings, encodings)
+        if encoding is None:
+            return response
+
+        variant = send_file(os.path.join(self.app.static_folder, filename + STATIC_VARIANTS[encoding]),
+                            mimetype=response.mimetype, conditional=True,
+                            max_age=self.app.get_send_file_max_age(filename))
+        if "Cache-Control" in response.headers:
+            variant.headers["Cache-Control"] = response.headers["Cache-Control"]
+        variant.headers["Content-Encoding"] = encoding
+        variant.vary.add("Accept-Encoding")
+        response.close()
+        return variant
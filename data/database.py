@@ -1,9 +1,13 @@
 import os
+from datetime import datetime, timezone
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
+from sqlalchemy import event, select, func, DDL
+from sqlalchemy.ext.hybrid import hybrid_property
+from data.sqlite_tuning import apply_sqlite_profile, DEFAULT_PROFILE, MaintenanceTimer
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(os.path.dirname(__file__))), 'migrations')
 
 db = SQLAlchemy()
-migrate = Migrate()
 
 
 class User(db.Model):
@@ -14,10 +18,23 @@ class User(db.Model):
     Attributes:
         id (int): The primary key identifier for the user.
         name (str): The name of the user.
+        movie_count (int): The number of movies in the user's collection.
+        avg_rating (float): The average rating of the user's movies.
+        latest_added (datetime): When the user last added a movie.
+        updated_at (datetime): When the user or one of its movies last changed; the version
+            stamp for HTTP caching of the user's pages.
+
+    The aggregate columns and `updated_at` are kept up to date by `data.user_stats.refresh_user_stats`
+    whenever the user's movies change; they are recomputed once per transaction, when it commits.
     """
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    movie_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    avg_rating = db.Column(db.Float)
+    latest_added = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
     movies = db.relationship("Movie", backref="user", lazy=True)
 
     def __repr__(self):
@@ -31,26 +48,140 @@ class User(db.Model):
         return f"<User(id={self.id}, name={self.name})>"
 
 
+class CatalogMovie(db.Model):
+    """
+    Represents a movie in the shared catalog.
+    Movie data fetched from OMDb is stored here once per imdbID and reused by every user
+    who adds the same film, so popular films are neither duplicated nor fetched again.
+
+    Attributes:
+        imdb_id (str): The IMDb ID of the movie, used as primary key.
+        title (str): The title of the movie as returned by OMDb.
+        title_key (str): The normalized title, used to find the movie without asking OMDb.
+        director (str): The name of the movie's director.
+        year (int): The release year of the movie.
+        rating (float): The IMDb rating of the movie.
+        poster (str): The URL of the movie's poster.
+        fetched_at (datetime): When the data was fetched from OMDb.
+    """
+    __tablename__ = 'catalog'
+    imdb_id = db.Column(db.String(20), primary_key=True)
+    title = db.Column(db.String(255), nullable=False)
+    title_key = db.Column(db.String(255), nullable=False, index=True)
+    director = db.Column(db.String(255))
+    year = db.Column(db.Integer)
+    rating = db.Column(db.Float)
+    poster = db.Column(db.String(255))
+    fetched_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        """
+        Returns a string representation of the CatalogMovie instance.
+
+        Returns:
+            str: A string representing the CatalogMovie instance.
+        """
+        return f"<CatalogMovie(imdb_id={self.imdb_id}, title={self.title})>"
+
+
+def catalog_fallback(override, field, resolved=None):
+    """
+    Builds a property of Movie that reads the movie's own value if it has one and the catalog's otherwise.
+
+    In SQL it is the column holding the resolved value, if the property has one, and otherwise a COALESCE
+    of the user's column and a correlated lookup in the catalog, so it can be selected, filtered and sorted
+    on like a column. Assigning the catalog's value clears the movie's own value, so user_movies only
+    stores what a user actually changed.
+
+    Args:
+        override (str): The attribute of Movie holding the user's own value.
+        field (str): The attribute of CatalogMovie the value falls back to.
+        resolved (str, optional): The attribute of Movie that triggers keep at the resolved value.
+
+    Returns:
+        hybrid_property: The property.
+    """
+    def fget(movie):
+        value = getattr(movie, override)
+        if value is None and movie.catalog is not None:
+            return getattr(movie.catalog, field)
+        return value
+
+    def fset(movie, value):
+        if movie.catalog is not None and value == getattr(movie.catalog, field):
+            value = None
+        setattr(movie, override, value)
+
+    def expression(cls):
+        label = override.removesuffix("_override")
+        if resolved is not None:
+            return getattr(cls, resolved).label(label)
+        catalog_value = (select(getattr(CatalogMovie, field)).where(CatalogMovie.imdb_id == cls.imdb_id)
+                         .correlate_except(CatalogMovie).scalar_subquery())
+        return func.coalesce(getattr(cls, override), catalog_value).label(label)
+
+    return hybrid_property(fget, fset, expr=expression)
+
+
 class Movie(db.Model):
     """
-    Represents a movie in the system.
-    The Movie model stores information about a movie, including its name, director, release year, and rating.
+    Represents a movie in a user's collection.
+    The Movie model links a user to a catalog entry. The name, director, year and rating are read
+    from the catalog unless the user changed them, in which case only the changed values are stored
+    here and take precedence for this user alone. Movies added by hand or before the catalog existed
+    have no catalog entry and store all their values themselves.
 
     Attributes:
         id (int): The primary key identifier for the movie.
         name (str): The name of the movie.
         director (str): The name of the movie's director.
         year (int): The release year of the movie.
-        rating (float): The rating of the movie (e.g., IMDb rating).
+        rating (float): The user's rating of the movie (initially the IMDb rating).
+        name_override, director_override, year_override, rating_override: The stored values behind
+            the attributes above; None where the catalog's value applies.
+        sort_name, sort_year, sort_rating: The resolved name, year and rating, kept up to date by
+            triggers so listings are sorted, paginated and aggregated from the (user_id, ...) indexes.
+        poster (str): The URL of the poster, only set for movies without a catalog entry.
+        imdb_id (str): The IMDb ID of the catalog entry, if any.
+        added_at (datetime): When the movie was added to the collection.
     """
-    __tablename__ = 'movies'
+    __tablename__ = 'user_movies'
+    __table_args__ = (
+        db.CheckConstraint('name IS NOT NULL OR imdb_id IS NOT NULL', name='ck_user_movies_name_or_catalog'),
+        db.Index('ix_user_movies_user_id_sort_name', 'user_id', 'sort_name'),
+        db.Index('ix_user_movies_user_id_sort_year', 'user_id', 'sort_year'),
+        db.Index('ix_user_movies_user_id_sort_rating', 'user_id', 'sort_rating'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    director = db.Column(db.String(100), nullable=False)
-    year = db.Column(db.Integer)
-    rating = db.Column(db.Float)
+    name_override = db.Column('name', db.String(100))
+    director_override = db.Column('director', db.String(100))
+    year_override = db.Column('year', db.Integer)
+    rating_override = db.Column('rating', db.Float)
     poster = db.Column(db.String(255))
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    imdb_id = db.Column(db.String(20), db.ForeignKey('catalog.imdb_id'))
+    added_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sort_name = db.Column(db.String(255))
+    sort_year = db.Column(db.Integer)
+    sort_rating = db.Column(db.Float)
+    catalog = db.relationship("CatalogMovie", lazy="joined")
+
+    name = catalog_fallback('name_override', 'title', 'sort_name')
+    director = catalog_fallback('director_override', 'director')
+    year = catalog_fallback('year_override', 'year', 'sort_year')
+    rating = catalog_fallback('rating_override', 'rating', 'sort_rating')
+
+    @property
+    def poster_url(self):
+        """
+        Returns the poster of the movie, taken from the catalog unless the movie has its own.
+
+        Returns:
+            str or None: The URL of the poster.
+        """
+        if self.poster:
+            return self.poster
+        return self.catalog.poster if self.catalog else None
 
     def __repr__(self):
         """
@@ -63,31 +194,142 @@ class Movie(db.Model):
         return f"<Movie(id={self.id}, name={self.name}, director={self.director})>"
 
 
+# Full-text index over the names and directors of user_movies for `data.search`. Most names and
+# directors live in the catalog, so the index stores the resolved text itself: triggers on user_movies
+# index a movie's own values or, where it has none, those of its catalog entry, and a trigger on the
+# catalog re-indexes the movies linked to an entry when OMDb data is refreshed. user_id is indexed as
+# a token as well, which restricts a search to one user inside the index, and prefixes of up to six
+# characters are indexed so that prefix searches do not merge term lists.
+SEARCH_TABLE = 'user_movies_fts'
+_RESOLVED_MOVIE = (
+    "SELECT m.id, coalesce(m.name, c.title), coalesce(m.director, c.director), m.user_id "
+    "FROM user_movies m LEFT JOIN catalog c ON c.imdb_id = m.imdb_id"
+)
+SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"name, director, user_id, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')",
+    f"CREATE TRIGGER {SEARCH_TABLE}_ai AFTER INSERT ON user_movies BEGIN "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, director, user_id) {_RESOLVED_MOVIE} WHERE m.id = new.id; END",
+    f"CREATE TRIGGER {SEARCH_TABLE}_ad AFTER DELETE ON user_movies BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; END",
+    f"CREATE TRIGGER {SEARCH_TABLE}_au AFTER UPDATE OF name, director, imdb_id, user_id ON user_movies BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id; "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, director, user_id) {_RESOLVED_MOVIE} WHERE m.id = new.id; END",
+    f"CREATE TRIGGER {SEARCH_TABLE}_catalog_au AFTER UPDATE OF title, director ON catalog BEGIN "
+    f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN (SELECT id FROM user_movies WHERE imdb_id = new.imdb_id); "
+    f"INSERT INTO {SEARCH_TABLE}(rowid, name, director, user_id) {_RESOLVED_MOVIE} "
+    f"WHERE m.imdb_id = new.imdb_id; END",
+)
+
+# The resolved name, year and rating of every movie, copied into sort columns of user_movies so the
+# (user_id, sort column) indexes can serve sorting, keyset pagination and the per-user aggregates.
+# Like the search index, they follow changes to a movie's own values and to its catalog entry.
+_SORT_VALUES = (
+    "sort_name = coalesce(name, (SELECT c.title FROM catalog c WHERE c.imdb_id = user_movies.imdb_id)), "
+    "sort_year = coalesce(year, (SELECT c.year FROM catalog c WHERE c.imdb_id = user_movies.imdb_id)), "
+    "sort_rating = coalesce(rating, (SELECT c.rating FROM catalog c WHERE c.imdb_id = user_movies.imdb_id))"
+)
+SORT_DDL = (
+    f"CREATE TRIGGER user_movies_sort_ai AFTER INSERT ON user_movies BEGIN "
+    f"UPDATE user_movies SET {_SORT_VALUES} WHERE id = new.id; END",
+    f"CREATE TRIGGER user_movies_sort_au AFTER UPDATE OF name, year, rating, imdb_id ON user_movies BEGIN "
+    f"UPDATE user_movies SET {_SORT_VALUES} WHERE id = new.id; END",
+    f"CREATE TRIGGER user_movies_sort_catalog_au AFTER UPDATE OF title, year, rating ON catalog BEGIN "
+    f"UPDATE user_movies SET {_SORT_VALUES} WHERE imdb_id = new.imdb_id; END",
+)
+
+for statement in SEARCH_DDL + SORT_DDL:
+    event.listen(Movie.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(Movie.__table__, "before_drop", DDL(f"DROP TABLE IF EXISTS {SEARCH_TABLE}").execute_if(dialect="sqlite"))
+
+
+class Job(db.Model):
+    """
+    Represents a background job, such as looking up a movie in OMDb after the request has returned.
+    Jobs are stored in the database so that they survive restarts and their status can be polled.
+
+    Attributes:
+        id (int): The primary key identifier for the job.
+        kind (str): The name of the handler that runs the job, e.g. "add_movie" or "import_movies".
+        user_id (int): The user the job belongs to.
+        movie_id (int): The placeholder movie the job fills in, if any.
+        payload (str): The input of the job, e.g. the movie title or the JSON list of titles to import.
+        status (str): One of "pending", "running", "done" or "failed".
+        error (str): The error message of a failed job.
+        progress (int): How many items of the job have been processed.
+        total (int): How many items the job processes, if known.
+        result (str): The JSON summary of a finished job, if it has one.
+        created_at (datetime): When the job was enqueued.
+        updated_at (datetime): When the status last changed.
+    """
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    movie_id = db.Column(db.Integer)
+    payload = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default="pending")
+    error = db.Column(db.String(255))
+    progress = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    total = db.Column(db.Integer)
+    result = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        """
+        Returns a string representation of the Job instance.
+
+        Returns:
+            str: A string representing the Job instance.
+        """
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
+
+
 def init_database(app):
     """
     Initializes the database for the Flask application.
-    This function configures SQLAlchemy with the given Flask app, sets up the connection to the SQLite database,
-    and ensures the necessary database tables are created if they do not already exist.
+    This function configures SQLAlchemy with the given Flask app and sets up the connection to the SQLite database:
+    `app.config['SQLALCHEMY_DATABASE_URI']` if given, otherwise `data/movies.sqlite` unless the `DATABASE_PATH`
+    environment variable names another file.
+
+    The schema is not touched here, so creating the app stays cheap and never races with a migration:
+    a new database is created, and an existing one upgraded, with `flask db upgrade`.
+
+    Every connection is tuned with the PRAGMAs in `app.config['SQLITE_PROFILE']` (WAL, busy timeout, mmap, ...).
+    If `app.config['SQLITE_MAINTENANCE_INTERVAL']` is set, the WAL is checkpointed every that many seconds.
 
     Args:
         app (Flask): The Flask application instance to bind the database to.
     """
-    db_file_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'movies.sqlite')
-
-    data_folder = os.path.dirname(db_file_path)
-    if not os.path.exists(data_folder):
-        print(f"Creating directory: {data_folder}")
-        os.makedirs(data_folder)
-
-    if not os.path.exists(db_file_path):
-        print(f"Creating database file: {db_file_path}")
-
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file_path}'
+    if 'SQLALCHEMY_DATABASE_URI' not in app.config:
+        db_file_path = os.path.abspath(os.getenv("DATABASE_PATH") or
+                                       os.path.join(os.path.abspath(os.path.dirname(__file__)), 'movies.sqlite'))
+        os.makedirs(os.path.dirname(db_file_path), exist_ok=True)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_file_path}'
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config.setdefault('SQLITE_PROFILE', DEFAULT_PROFILE)
+    app.config.setdefault('SQLITE_MAINTENANCE_INTERVAL', float(os.getenv("SQLITE_MAINTENANCE_INTERVAL", 0)))
 
     db.init_app(app)
-    migrate.init_app(app, db)
 
     with app.app_context():
-        db.create_all()
-    print("Database initialized and tables created.")
+        apply_sqlite_profile(db.engine, app.config['SQLITE_PROFILE'])
+        if app.config['SQLITE_MAINTENANCE_INTERVAL']:
+            app.extensions['sqlite_maintenance'] = MaintenanceTimer(
+                db.engine, app.config['SQLITE_MAINTENANCE_INTERVAL']).start()
+
+
+def init_migrations(app):
+    """
+    Registers Flask-Migrate, which backs the `flask db` commands.
+
+    Flask-Migrate pulls in Alembic, the slowest import of the application, so it is imported here
+    rather than with the models, and only called if the MIGRATIONS setting is on.
+
+    Args:
+        app (Flask): The Flask application instance.
+    """
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=MIGRATIONS_DIR, render_as_batch=True)
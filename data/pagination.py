@@ -0,0 +1,166 @@
+import base64
+import json
+from sqlalchemy import and_, or_, tuple_
+from data.database import Movie
+
+SORT_COLUMNS = {
+    "name": Movie.sort_name,
+    "year": Movie.sort_year,
+    "rating": Movie.sort_rating,
+}
+DIRECTIONS = ("asc", "desc")
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 200
+
+
+class Page(list):
+    """
+    One page of results. Behaves like a list of the items on the page and additionally
+    carries the cursor of the following page, which is None on the last page.
+    """
+    def __init__(self, items, next_cursor=None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(value, movie_id):
+    """
+    Encodes the sort value and ID of the last movie on a page into an opaque cursor.
+
+    Args:
+        value: The sort column value of the last movie.
+        movie_id (int): The ID of the last movie.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    raw = json.dumps([value, movie_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor string.
+
+    Returns:
+        tuple: The sort value and movie ID.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        value, movie_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return value, int(movie_id)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
+
+
+def encode_id_cursor(row_id):
+    """
+    Encodes the ID of the last row on a page that is ordered by ID alone.
+
+    Args:
+        row_id (int): The ID of the last row.
+
+    Returns:
+        str: A URL-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(json.dumps([row_id]).encode()).decode().rstrip("=")
+
+
+def decode_id_cursor(cursor):
+    """
+    Decodes a cursor created by `encode_id_cursor`.
+
+    Args:
+        cursor (str): The cursor string.
+
+    Returns:
+        int: The ID of the last row on the previous page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    try:
+        (row_id,) = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(row_id)
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"Invalid cursor: {cursor}") from error
+
+
+def paginate_movies(statement, sort="name", direction="asc", cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Applies keyset pagination to a select statement over user_movies.
+
+    Rows are ordered by the stored sort column (the movie's resolved name, year or rating) and then
+    by ID. Instead of an OFFSET, the page starts right after the (value, ID) pair stored in the cursor,
+    so the database seeks directly into the (user_id, sort column) index and deep pages are as fast
+    as the first one. SQLite sorts NULLs first in ascending and last in descending order, which the
+    cursor conditions follow.
+
+    Args:
+        statement (Select): A select statement over user_movies, usually filtered by user.
+        sort (str): One of "name", "year" or "rating".
+        direction (str): "asc" or "desc".
+        cursor (str, optional): The cursor of the page to load; None for the first page.
+        limit (int, optional): The page size; None loads all remaining rows.
+
+    Returns:
+        Select: The statement with ordering, cursor condition and limit applied. One row more
+        than `limit` is selected so `build_page` can tell whether another page follows.
+
+    Raises:
+        ValueError: If the sort key, direction or cursor is invalid.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort key: {sort}")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"Invalid sort direction: {direction}")
+
+    column = SORT_COLUMNS[sort]
+    descending = direction == "desc"
+
+    if cursor is not None:
+        value, movie_id = decode_cursor(cursor)
+        if value is None:
+            if descending:
+                condition = and_(column.is_(None), Movie.id < movie_id)
+            else:
+                condition = or_(and_(column.is_(None), Movie.id > movie_id), column.is_not(None))
+        elif descending:
+            condition = or_(tuple_(column, Movie.id) < tuple_(value, movie_id), column.is_(None))
+        else:
+            condition = tuple_(column, Movie.id) > tuple_(value, movie_id)
+        statement = statement.where(condition)
+
+    if descending:
+        statement = statement.order_by(column.desc(), Movie.id.desc())
+    else:
+        statement = statement.order_by(column.asc(), Movie.id.asc())
+
+    if limit is not None:
+        statement = statement.limit(limit + 1)
+    return statement
+
+
+def build_page(rows, sort="name", limit=DEFAULT_PAGE_SIZE):
+    """
+    Turns the rows selected by a statement from `paginate_movies` into a Page.
+
+    Args:
+        rows (list): Movies or rows with `id` and the sort attribute.
+        sort (str): The sort key the statement was paginated with.
+        limit (int, optional): The page size that was passed to `paginate_movies`.
+
+    Returns:
+        Page: At most `limit` rows and the cursor of the next page.
+    """
+    if limit is None or len(rows) <= limit:
+        return Page(rows)
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return Page(rows, encode_cursor(getattr(last, sort), last.id))
@@ -0,0 +1,46 @@
+from collections import namedtuple
+from sqlalchemy import select, func
+from data.database import User, Movie, CatalogMovie
+
+
+class UserRow(namedtuple("UserRow", ["id", "name", "movie_count", "avg_rating", "latest_added"])):
+    """
+    A read-only user for list pages: its ID, name and movie statistics.
+    """
+    __slots__ = ()
+
+
+class MovieRow(namedtuple("MovieRow", ["id", "name", "director", "year", "rating", "poster_url"])):
+    """
+    A read-only movie for list pages, with the poster already resolved from the catalog.
+    """
+    __slots__ = ()
+
+
+def user_rows_statement():
+    """
+    Builds a column-only select of all users with their movie statistics, ordered by ID.
+    The statistics are read from the aggregate columns on users, so no movies are scanned.
+
+    Returns:
+        Select: A statement whose rows can be turned into UserRow tuples.
+    """
+    return (select(User.id, User.name, User.movie_count, User.avg_rating, User.latest_added)
+            .order_by(User.id))
+
+
+def movie_rows_statement(user_id):
+    """
+    Builds a column-only select of a user's movies. It can be paginated with
+    `data.pagination.paginate_movies` like a select of Movie objects.
+
+    Args:
+        user_id (int): The ID of the user whose movies are selected.
+
+    Returns:
+        Select: A statement whose rows can be turned into MovieRow tuples.
+    """
+    return (select(Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating,
+                   func.coalesce(Movie.poster, CatalogMovie.poster))
+            .outerjoin(CatalogMovie, CatalogMovie.imdb_id == Movie.imdb_id)
+            .where(Movie.user_id == user_id))
@@ -0,0 +1,58 @@
+import re
+from sqlalchemy import func, literal_column, table, column
+from data.database import Movie, SEARCH_TABLE
+from data.rows import movie_rows_statement
+
+TERM = re.compile(r"\w+")
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Weights of the name, director and user_id columns in the bm25 ranking.
+RANK_WEIGHTS = (10.0, 5.0, 0.0)
+
+search_table = table(SEARCH_TABLE, column("rowid"))
+
+
+def build_match_query(user_id, query):
+    """
+    Turns what a user typed into an FTS5 query over one user's movies.
+
+    Every word becomes a quoted prefix term, so "star wa" finds "Star Wars", and FTS5
+    syntax characters in the input cannot produce an invalid query.
+
+    Args:
+        user_id (int): The ID of the user whose movies are searched.
+        query (str): The search text.
+
+    Returns:
+        str or None: The MATCH expression, or None if the text contains no words.
+    """
+    terms = TERM.findall(query or "")
+    if not terms:
+        return None
+    words = " ".join(f'"{term}"*' for term in terms)
+    return f"user_id : {int(user_id)} AND {{name director}} : ({words})"
+
+
+def search_statement(user_id, query, limit=DEFAULT_SEARCH_LIMIT):
+    """
+    Builds a column-only select of the movies of a user matching a search, best matches first.
+
+    Args:
+        user_id (int): The ID of the user whose movies are searched.
+        query (str): The search text.
+        limit (int): The maximum number of results.
+
+    Returns:
+        Select or None: A statement whose rows can be turned into MovieRow tuples,
+        or None if the text contains no words.
+    """
+    match = build_match_query(user_id, query)
+    if match is None:
+        return None
+    fts = literal_column(SEARCH_TABLE)
+    return (movie_rows_statement(user_id)
+            .join(search_table, search_table.c.rowid == Movie.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, *RANK_WEIGHTS), Movie.id)
+            .limit(limit))
@@ -0,0 +1,121 @@
+import logging
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from sqlalchemy import event, text
+
+# Production profile for SQLite connections:
+# - journal_mode=WAL lets readers run while a writer commits, instead of locking the whole file.
+# - busy_timeout waits up to 5 s for a lock instead of failing with "database is locked".
+# - synchronous=NORMAL only syncs at checkpoints, which is safe in WAL mode.
+# - mmap_size maps up to 256 MiB of the file into memory for faster reads.
+# - cache_size keeps up to 64 MiB of pages per connection (negative values are KiB).
+# - temp_store keeps temporary tables and sort buffers in memory.
+DEFAULT_PROFILE = {
+    "journal_mode": "WAL",
+    "busy_timeout": 5000,
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,
+    "cache_size": -65536,
+    "temp_store": "MEMORY",
+}
+
+
+def apply_sqlite_profile(engine, profile=None):
+    """
+    Registers a connect event on an engine that applies the PRAGMAs of a profile to every new connection.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine. Engines for other databases than SQLite are left alone.
+        profile (dict, optional): Maps PRAGMA names to values. Defaults to `DEFAULT_PROFILE`;
+            pass an empty dict to keep SQLite's defaults.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    profile = DEFAULT_PROFILE if profile is None else profile
+    if not profile:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in profile.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+@contextmanager
+def sqlite_connection(path, timeout=5):
+    """
+    Opens a plain sqlite3 connection for the duration of a `with` block, as the file-backed caches
+    use outside SQLAlchemy. The block runs as one transaction, committed or rolled back on an
+    error, and the connection is closed afterwards; sqlite3's own context manager would only
+    end the transaction and leave the connection to the garbage collector.
+
+    Args:
+        path (str): Path of the SQLite file.
+        timeout (float): Seconds to wait for a lock held by another connection.
+
+    Yields:
+        sqlite3.Connection: A new connection to `path`.
+    """
+    with closing(sqlite3.connect(path, timeout=timeout)) as connection, connection:
+        yield connection
+
+
+def run_maintenance(engine):
+    """
+    Checkpoints the write-ahead log back into the database file and lets SQLite refresh its
+    query planner statistics. Keeps the WAL file from growing under constant writes.
+
+    Args:
+        engine (Engine): The SQLAlchemy engine of the SQLite database.
+
+    Returns:
+        tuple: The (busy, log pages, checkpointed pages) result of the checkpoint.
+    """
+    with engine.connect() as connection:
+        result = tuple(connection.execute(text("PRAGMA wal_checkpoint(PASSIVE)")).one())
+        connection.execute(text("PRAGMA optimize"))
+        connection.commit()
+    return result
+
+
+class MaintenanceTimer:
+    """
+    Runs `run_maintenance` periodically on a daemon thread.
+    """
+    def __init__(self, engine, interval):
+        """
+        Initializes the timer.
+
+        Args:
+            engine (Engine): The SQLAlchemy engine of the SQLite database.
+            interval (float): Seconds between two maintenance runs.
+        """
+        self.engine = engine
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sqlite-maintenance", daemon=True)
+
+    def start(self):
+        """
+        Starts the maintenance thread.
+        """
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the maintenance thread after the current run.
+        """
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                run_maintenance(self.engine)
+            except Exception as error:
+                logging.warning(f"SQLite maintenance failed: {error}")
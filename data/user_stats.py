@@ -0,0 +1,97 @@
+from datetime import datetime, timezone
+from sqlalchemy import select, update, func, event
+from sqlalchemy.orm import Session
+from data.database import User, Movie
+
+# Key in `Session.info` of the IDs of the users whose aggregates are recomputed at commit.
+STALE_USERS_KEY = "stale_user_stats"
+
+
+def _aggregate_values():
+    """
+    Builds the correlated subqueries that compute a user's aggregates from user_movies.
+    They read the user's rows through the user_id indexes; the average comes from the stored
+    sort_rating column, so it needs no catalog lookups.
+
+    Returns:
+        dict: Values for an UPDATE of users.
+    """
+    def per_user(aggregate):
+        return select(aggregate).where(Movie.user_id == User.id).scalar_subquery()
+
+    return {
+        "movie_count": per_user(func.count(Movie.id)),
+        "avg_rating": per_user(func.avg(Movie.rating)),
+        "latest_added": per_user(func.max(Movie.added_at)),
+    }
+
+
+def refresh_user_stats(session, user_id):
+    """
+    Marks the movie count, average rating and latest addition of one user as stale.
+
+    Call it after adding, updating or deleting a movie; the change is flushed, so a new movie
+    has its ID right away. The aggregates are recomputed, and the `updated_at` version stamp
+    bumped, just before the session commits, in the same transaction as the change. All users
+    marked in one transaction are refreshed with a single UPDATE, so ten movies added in one
+    unit of work cost one recomputation instead of ten.
+
+    Args:
+        session (Session): The session holding the change.
+        user_id (int): The ID of the user whose movies changed.
+    """
+    session.flush()
+    session.info.setdefault(STALE_USERS_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_stale_users(session):
+    user_ids = session.info.pop(STALE_USERS_KEY, None)
+    if user_ids:
+        session.flush()
+        session.execute(update(User).where(User.id.in_(user_ids))
+                        .values(updated_at=datetime.now(timezone.utc), **_aggregate_values())
+                        .execution_options(synchronize_session="fetch"))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_stale_users(session, transaction):
+    # A rolled back transaction leaves nothing to refresh; savepoints keep the outer marks.
+    if transaction.parent is None:
+        session.info.pop(STALE_USERS_KEY, None)
+
+
+def refresh_catalog_users(session, imdb_id):
+    """
+    Recomputes the aggregates and bumps the `updated_at` version stamp of every user with a movie
+    linked to a catalog entry. Call it after the entry's values changed and before committing.
+
+    Args:
+        session (Session): The session holding the change.
+        imdb_id (str): The IMDb ID of the catalog entry.
+
+    Returns:
+        list: The IDs of the refreshed users.
+    """
+    session.flush()
+    linked = select(Movie.user_id).where(Movie.imdb_id == imdb_id)
+    return list(session.scalars(update(User).where(User.id.in_(linked))
+                                .values(updated_at=datetime.now(timezone.utc), **_aggregate_values())
+                                .returning(User.id)
+                                .execution_options(synchronize_session="fetch")))
+
+
+def rebuild_user_stats(session):
+    """
+    Recomputes the aggregates of all users in one statement, e.g. after bulk changes made outside the application.
+    The caller commits.
+
+    Args:
+        session (Session): The session to run the update in.
+
+    Returns:
+        int: The number of updated users.
+    """
+    result = session.execute(update(User).values(updated_at=datetime.now(timezone.utc), **_aggregate_values())
+                             .execution_options(synchronize_session="fetch"))
+    return result.rowcount
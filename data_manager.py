@@ -1,69 +1,342 @@
 import logging
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker, selectinload
 from sqlalchemy.exc import SQLAlchemyError
 from data.database import User, Movie
+from data.pagination import paginate_movies, build_page
+from data.rows import UserRow, MovieRow, user_rows_statement, movie_rows_statement
+from data.search import search_statement, DEFAULT_SEARCH_LIMIT
+from data.sqlite_tuning import apply_sqlite_profile
+from data.user_stats import refresh_user_stats
 from interfaces.data_manager_interface import DataManagerInterface
 
 
 class SQLiteDataManager(DataManagerInterface):
     """
     A concrete implementation of DataManagerInterface for managing data in an SQLite database using SQLAlchemy.
+
+    Each method runs in its own session and transaction, unless it is called inside `unit_of_work`,
+    in which case all calls share one session and are committed together. Objects are not expired
+    on commit and relationships are loaded eagerly, so returned objects stay usable after the
+    session is closed.
     """
-    def __init__(self, db_file_name):
+    def __init__(self, db_file_name, sqlite_profile=None):
         """
         Initializes the SQLiteDataManager with the SQLite database file.
 
         Args:
             db_file_name (str): The name of the SQLite database file.
+            sqlite_profile (dict, optional): PRAGMAs applied to every connection.
+                Defaults to `data.sqlite_tuning.DEFAULT_PROFILE`; pass an empty dict for SQLite's defaults.
         """
         self.db_file_name = db_file_name
         self.engine = create_engine(f'sqlite:///{db_file_name}')
-        self.Session = sessionmaker(bind=self.engine)
+        apply_sqlite_profile(self.engine, sqlite_profile)
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self._local = threading.local()
+
+    @contextmanager
+    def unit_of_work(self):
+        """
+        Groups several operations into one session and one transaction.
+
+        All data manager calls made inside the `with` block on the same thread share the yielded
+        session. The transaction is committed when the block ends and rolled back if it raises.
+        Nested units of work join the outer one.
+
+        Example:
+            with data_manager.unit_of_work():
+                data_manager.add_user(user)
+                data_manager.add_movie(movie)
+
+        Yields:
+            Session: The shared session.
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield self._local.session
+            return
+
+        session = self.Session()
+        self._local.session = session
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self._local.session = None
+            session.close()
+
+    @contextmanager
+    def _session(self):
+        """
+        Provides the session for a single operation: the one of the current unit of work if there is one,
+        otherwise a new session that is committed and closed when the operation ends.
+
+        Yields:
+            Session: The session to use.
+        """
+        if getattr(self._local, "session", None) is not None:
+            yield self._local.session
+            return
+
+        session = self.Session()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
 
     def get_all_users(self):
         """
-        Retrieves all users from the database.
+        Retrieves all users from the database, with their movies loaded.
 
         Returns:
             list: A list of all users in the database.
         """
-        session = self.Session()
         try:
-            users = session.query(User).all()
-            return users
+            with self._session() as session:
+                return session.scalars(select(User).options(selectinload(User.movies))).all()
         except SQLAlchemyError as error:
-            session.rollback()
             logging.error(f"Error retrieving users: {error}")
             raise SQLAlchemyError(f"Error retrieving users: {error}")
-        finally:
-            session.close()
 
-    def get_user_movies(self, user_id):
+    def get_user(self, user_id):
         """
-        Retrieves all movies for a specific user.
+        Retrieves a single user by its ID.
+
+        Args:
+            user_id (int): The ID of the user.
+
+        Returns:
+            User: The user, usable after the session is closed.
+
+        Raises:
+            ValueError: If the user does not exist.
+        """
+        try:
+            with self._session() as session:
+                user = session.get(User, user_id)
+                if not user:
+                    raise ValueError(f"User with ID {user_id} not found.")
+                return user
+        except ValueError as error:
+            logging.warning(f"ValueError: {error}")
+            raise
+        except SQLAlchemyError as error:
+            logging.error(f"Error retrieving user {user_id}: {error}")
+            raise SQLAlchemyError(f"Error retrieving user {user_id}: {error}")
+
+    def get_user_movies(self, user_id, sort="name", direction="asc", cursor=None, limit=None):
+        """
+        Retrieves the movies of a specific user, optionally one page at a time.
+
+        Pages use keyset pagination: pass the `next_cursor` of the returned page as `cursor`
+        to get the following page.
 
         Args:
             user_id (int): The ID of the user whose movies are to be retrieved.
+            sort (str): The column to sort by: "name", "year" or "rating".
+            direction (str): The sort direction: "asc" or "desc".
+            cursor (str, optional): The cursor of the page to retrieve; None for the first page.
+            limit (int, optional): The page size; None retrieves all movies.
 
         Returns:
-            list: A list of all movies for the specified user.
+            Page: A list of the movies for the specified user with the `next_cursor` of the following page.
+        """
+        try:
+            with self._session() as session:
+                if not session.get(User, user_id):
+                    raise ValueError(f"User with ID {user_id} not found.")
+                statement = paginate_movies(select(Movie).where(Movie.user_id == user_id),
+                                            sort=sort, direction=direction, cursor=cursor, limit=limit)
+                return build_page(session.scalars(statement).all(), sort=sort, limit=limit)
+        except ValueError as error:
+            logging.error(f"ValueError: {error}")
+            raise
+        except SQLAlchemyError as error:
+            logging.error(f"Error retrieving movies for user {user_id}: {error}")
+            raise SQLAlchemyError(f"Error retrieving movies for user {user_id}: {error}")
+
+    def get_user_rows(self):
+        """
+        Retrieves all users as lightweight read-only rows, without loading ORM objects.
+
+        Returns:
+            list: A list of UserRow(id, name, movie_count, avg_rating, latest_added) tuples.
         """
-        session = self.Session()
         try:
-            user = session.query(User).get(user_id)
-            if not user:
-                raise ValueError(f"User with ID {user_id} not found.")
-            return user.movies
+            with self._session() as session:
+                return [UserRow._make(row) for row in session.execute(user_rows_statement())]
+        except SQLAlchemyError as error:
+            logging.error(f"Error retrieving users: {error}")
+            raise SQLAlchemyError(f"Error retrieving users: {error}")
+
+    def get_movie_rows(self, user_id, sort="name", direction="asc", cursor=None, limit=None):
+        """
+        Retrieves the movies of a specific user as lightweight read-only rows, optionally one page at a time.
+        Takes the same sorting and paging arguments as `get_user_movies`.
+
+        Args:
+            user_id (int): The ID of the user whose movies are to be retrieved.
+            sort (str): The column to sort by: "name", "year" or "rating".
+            direction (str): The sort direction: "asc" or "desc".
+            cursor (str, optional): The cursor of the page to retrieve; None for the first page.
+            limit (int, optional): The page size; None retrieves all movies.
+
+        Returns:
+            Page: A list of MovieRow tuples with the `next_cursor` of the following page.
+        """
+        try:
+            with self._session() as session:
+                if not session.get(User, user_id):
+                    raise ValueError(f"User with ID {user_id} not found.")
+                statement = paginate_movies(movie_rows_statement(user_id),
+                                            sort=sort, direction=direction, cursor=cursor, limit=limit)
+                rows = [MovieRow._make(row) for row in session.execute(statement)]
+                return build_page(rows, sort=sort, limit=limit)
         except ValueError as error:
             logging.error(f"ValueError: {error}")
-            raise ValueError(f"User with ID {user_id} not found.")
+            raise
+        except SQLAlchemyError as error:
+            logging.error(f"Error retrieving movies for user {user_id}: {error}")
+            raise SQLAlchemyError(f"Error retrieving movies for user {user_id}: {error}")
+
+    def iter_user_rows(self, after_id=None, limit=None, batch_size=500):
+        """
+        Streams users as read-only rows in ID order, fetching them from the database in batches.
+        The session stays open until the returned iterator is exhausted or closed.
+
+        Args:
+            after_id (int, optional): Only users with a greater ID are returned.
+            limit (int, optional): The maximum number of users; None streams all of them.
+            batch_size (int): Rows fetched from the database at a time.
+
+        Returns:
+            Iterator: UserRow tuples.
+        """
+        statement = user_rows_statement()
+        if after_id is not None:
+            statement = statement.where(User.id > after_id)
+        if limit is not None:
+            statement = statement.limit(limit)
+        return self._stream(statement, UserRow, batch_size)
+
+    def iter_movie_rows(self, user_id, sort="name", direction="asc", cursor=None, limit=None, batch_size=500):
+        """
+        Streams the movies of a user as read-only rows, fetching them from the database in batches.
+        Takes the same sorting and paging arguments as `get_movie_rows`; with a `limit`, one row more
+        than the limit is returned so the caller can tell whether another page follows.
+        The session stays open until the returned iterator is exhausted or closed.
+
+        Args:
+            user_id (int): The ID of the user whose movies are streamed.
+            sort (str): The column to sort by: "name", "year" or "rating".
+            direction (str): The sort direction: "asc" or "desc".
+            cursor (str, optional): The cursor to start after; None starts at the beginning.
+            limit (int, optional): The page size; None streams all movies.
+            batch_size (int): Rows fetched from the database at a time.
+
+        Returns:
+            Iterator: MovieRow tuples.
+
+        Raises:
+            ValueError: If the user does not exist or the sort arguments or cursor are invalid.
+        """
+        try:
+            with self._session() as session:
+                if not session.get(User, user_id):
+                    raise ValueError(f"User with ID {user_id} not found.")
         except SQLAlchemyError as error:
             logging.error(f"Error retrieving movies for user {user_id}: {error}")
             raise SQLAlchemyError(f"Error retrieving movies for user {user_id}: {error}")
+
+        statement = paginate_movies(movie_rows_statement(user_id),
+                                    sort=sort, direction=direction, cursor=cursor, limit=limit)
+        return self._stream(statement, MovieRow, batch_size)
+
+    def _stream(self, statement, row_type, batch_size):
+        """
+        Runs a column-only select in its own session and yields its rows in batches.
+
+        Args:
+            statement (Select): The statement to run.
+            row_type (type): The row tuple type the rows are turned into.
+            batch_size (int): Rows fetched from the database at a time.
+
+        Yields:
+            tuple: Rows of `row_type`.
+        """
+        session = self.Session()
+        try:
+            for row in session.execute(statement.execution_options(yield_per=batch_size)):
+                yield row_type._make(row)
+        except SQLAlchemyError as error:
+            logging.error(f"Error streaming rows: {error}")
+            raise SQLAlchemyError(f"Error streaming rows: {error}")
         finally:
             session.close()
 
+    def get_movie(self, movie_id):
+        """
+        Retrieves a single movie by its ID.
+
+        Args:
+            movie_id (int): The ID of the movie.
+
+        Returns:
+            Movie: The movie, usable after the session is closed.
+
+        Raises:
+            ValueError: If the movie does not exist.
+        """
+        try:
+            with self._session() as session:
+                movie = session.get(Movie, movie_id)
+                if not movie:
+                    raise ValueError(f"Movie with ID {movie_id} not found.")
+                return movie
+        except ValueError as error:
+            logging.warning(f"ValueError: {error}")
+            raise
+        except SQLAlchemyError as error:
+            logging.error(f"Error retrieving movie {movie_id}: {error}")
+            raise SQLAlchemyError(f"Error retrieving movie {movie_id}: {error}")
+
+    def search_movies(self, user_id, query, limit=DEFAULT_SEARCH_LIMIT):
+        """
+        Searches the names and directors of a user's movies, best matches first.
+        Every word of the query also matches longer words it is a prefix of.
+
+        Args:
+            user_id (int): The ID of the user whose movies are searched.
+            query (str): The search text.
+            limit (int): The maximum number of results.
+
+        Returns:
+            list: A list of MovieRow tuples ranked by bm25; empty if the query contains no words.
+        """
+        try:
+            with self._session() as session:
+                if not session.get(User, user_id):
+                    raise ValueError(f"User with ID {user_id} not found.")
+                statement = search_statement(user_id, query, limit=limit)
+                if statement is None:
+                    return []
+                return [MovieRow._make(row) for row in session.execute(statement)]
+        except ValueError as error:
+            logging.error(f"ValueError: {error}")
+            raise
+        except SQLAlchemyError as error:
+            logging.error(f"Error searching movies for user {user_id}: {error}")
+            raise SQLAlchemyError(f"Error searching movies for user {user_id}: {error}")
+
     def add_user(self, user):
         """
         Adds a new user to the database.
@@ -71,16 +344,13 @@ class SQLiteDataManager(DataManagerInterface):
         Args:
             user (User): The User instance to be added.
         """
-        session = self.Session()
         try:
-            session.add(user)
-            session.commit()
+            with self._session() as session:
+                session.add(user)
+                session.flush()
         except SQLAlchemyError as error:
-            session.rollback()
             logging.error(f"Error adding user: {error}")
             raise SQLAlchemyError(f"Error adding user: {error}")
-        finally:
-            session.close()
 
     def add_movie(self, movie):
         """
@@ -89,16 +359,13 @@ class SQLiteDataManager(DataManagerInterface):
         Args:
             movie (Movie): The Movie instance to be added.
         """
-        session = self.Session()
         try:
-            session.add(movie)
-            session.commit()
+            with self._session() as session:
+                session.add(movie)
+                refresh_user_stats(session, movie.user_id)
         except SQLAlchemyError as error:
-            session.rollback()
             logging.error(f"Error adding movie: {error}")
             raise SQLAlchemyError(f"Error adding movie: {error}")
-        finally:
-            session.close()
 
     def update_movie(self, movie):
         """
@@ -107,25 +374,22 @@ class SQLiteDataManager(DataManagerInterface):
         Args:
             movie (Movie): The Movie instance with updated details.
         """
-        session = self.Session()
         try:
-            existing_movie = session.query(Movie).get(movie.id)
-            if not existing_movie:
-                raise ValueError(f"Movie with ID {movie.id} not found for update.")
-            existing_movie.name = movie.name
-            existing_movie.director = movie.director
-            existing_movie.year = movie.year
-            existing_movie.rating = movie.rating
-            session.commit()
+            with self._session() as session:
+                existing_movie = session.get(Movie, movie.id)
+                if not existing_movie:
+                    raise ValueError(f"Movie with ID {movie.id} not found for update.")
+                existing_movie.name = movie.name
+                existing_movie.director = movie.director
+                existing_movie.year = movie.year
+                existing_movie.rating = movie.rating
+                refresh_user_stats(session, existing_movie.user_id)
         except ValueError as error:
             logging.warning(f"ValueError: {error}")
             raise ValueError(f"Movie with ID {movie.id} not found for update.")
         except SQLAlchemyError as error:
-            session.rollback()
             logging.error(f"Error updating movie {movie.id}: {error}")
             raise SQLAlchemyError(f"Error updating movie {movie.id}: {error}")
-        finally:
-            session.close()
 
     def delete_movie(self, movie_id):
         """
@@ -134,19 +398,16 @@ class SQLiteDataManager(DataManagerInterface):
         Args:
             movie_id (int): The ID of the movie to be deleted.
         """
-        session = self.Session()
         try:
-            movie = session.query(Movie).get(movie_id)
-            if not movie:
-                raise ValueError(f"Movie with ID {movie_id} not found for deletion.")
-            session.delete(movie)
-            session.commit()
+            with self._session() as session:
+                movie = session.get(Movie, movie_id)
+                if not movie:
+                    raise ValueError(f"Movie with ID {movie_id} not found for deletion.")
+                session.delete(movie)
+                refresh_user_stats(session, movie.user_id)
         except ValueError as error:
             logging.warning(f"ValueError: {error}")
             raise ValueError(f"Movie with ID {movie_id} not found for deletion.")
         except SQLAlchemyError as error:
-            session.rollback()
             logging.error(f"Error deleting movie {movie_id}: {error}")
             raise SQLAlchemyError(f"Error deleting movie {movie_id}: {error}")
-        finally:
-            session.close()
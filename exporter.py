@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select, func
+from data.database import User, Movie, CatalogMovie
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_COLUMNS = ("user_id", "user_name", "movie_id", "name", "director", "year", "rating",
+                  "imdb_id", "poster_url", "added_at")
+DEFAULT_BATCH_SIZE = 2000
+
+
+def export_statement(user_id=None):
+    """
+    Builds a column-only select of the rows to export, ordered by user and movie ID.
+
+    All users are exported with a LEFT JOIN, so users without movies appear once with
+    empty movie columns.
+
+    Args:
+        user_id (int, optional): Export only this user's movies; None exports all users.
+
+    Returns:
+        Select: A statement with the columns of EXPORT_COLUMNS.
+    """
+    statement = (select(User.id, User.name, Movie.id, Movie.name, Movie.director, Movie.year, Movie.rating,
+                        Movie.imdb_id, func.coalesce(Movie.poster, CatalogMovie.poster), Movie.added_at)
+                 .select_from(User)
+                 .outerjoin(Movie, Movie.user_id == User.id)
+                 .outerjoin(CatalogMovie, CatalogMovie.imdb_id == Movie.imdb_id)
+                 .order_by(User.id, Movie.id))
+    if user_id is not None:
+        statement = statement.where(User.id == user_id, Movie.id.is_not(None))
+    return statement
+
+
+def json_default(value):
+    """
+    Serializes values that the json module does not know, i.e. datetimes. Pass it as `default`
+    to `json.dumps`.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def iter_export(engine, statement, fmt="csv", batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Runs an export statement and yields the output in chunks of about `batch_size` rows.
+
+    The rows are fetched with `yield_per`, so only one batch is in memory at a time. The CSV
+    header is yielded before the query runs and every batch as soon as it is written. The
+    generator uses its own connection, which lets it outlive the request that started it.
+
+    Args:
+        engine (Engine): The engine of the database.
+        statement (Select): A statement from `export_statement`.
+        fmt (str): "csv" (with a header row) or "ndjson" (one JSON object per row).
+        batch_size (int): Rows fetched and written per chunk.
+
+    Yields:
+        str: Chunks of the export.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer:
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    with engine.connect() as connection:
+        result = connection.execute(statement.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            for row in rows:
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=json_default))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
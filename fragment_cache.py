@@ -0,0 +1,246 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from data.sqlite_tuning import sqlite_connection
+
+
+def user_group(user_id):
+    """
+    Returns the group of the fragments that show a user's movies.
+
+    Args:
+        user_id (int): The ID of the user.
+
+    Returns:
+        str: The group name.
+    """
+    return f"user:{user_id}"
+
+
+def invalidate_user_fragments(user_id):
+    """
+    Drops the cached movie grids of a user after one of its movies was added, updated or deleted.
+    Must be called inside an application context; apps without a fragment cache are skipped.
+
+    Args:
+        user_id (int): The ID of the user whose movies changed.
+    """
+    fragment_cache = current_app.extensions.get('fragment_cache')
+    if fragment_cache is not None:
+        fragment_cache.invalidate(user_group(user_id))
+
+
+class MemoryBackend:
+    """
+    Keeps rendered fragments in an in-process LRU. Each worker process has its own copy.
+    """
+    def __init__(self, max_size=256):
+        """
+        Initializes the backend.
+
+        Args:
+            max_size (int): Maximum number of fragments kept.
+        """
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, group, key):
+        """
+        Returns the fragment stored under a key, or None.
+        """
+        with self._lock:
+            value = self._entries.get((group, key))
+            if value is not None:
+                self._entries.move_to_end((group, key))
+            return value
+
+    def set(self, group, key, value):
+        """
+        Stores a fragment, evicting the least recently used ones if full.
+        """
+        with self._lock:
+            self._entries[(group, key)] = value
+            self._entries.move_to_end((group, key))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_group(self, group):
+        """
+        Removes all fragments of a group.
+        """
+        with self._lock:
+            for entry in [entry for entry in self._entries if entry[0] == group]:
+                del self._entries[entry]
+
+    def clear(self):
+        """
+        Removes all fragments.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    Keeps rendered fragments in an SQLite file, shared by all worker processes on a host,
+    so a fragment rendered by one worker is reused and invalidated by all of them.
+    """
+    def __init__(self, db_path, max_size=4096):
+        """
+        Initializes the backend and creates its table.
+
+        Args:
+            db_path (str): Path of the SQLite file.
+            max_size (int): Maximum number of fragments kept; the oldest are removed first.
+        """
+        self.db_path = db_path
+        self.max_size = max_size
+        with sqlite_connection(self.db_path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragment_cache ("
+                "grp TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "PRIMARY KEY (grp, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_fragment_cache_stored_at ON fragment_cache (stored_at)")
+
+    def get(self, group, key):
+        """
+        Returns the fragment stored under a key, or None.
+        """
+        with sqlite_connection(self.db_path) as connection:
+            row = connection.execute("SELECT value FROM fragment_cache WHERE grp = ? AND key = ?",
+                                     (group, key)).fetchone()
+        return row[0] if row else None
+
+    def set(self, group, key, value):
+        """
+        Stores a fragment and removes the oldest ones beyond `max_size`.
+        """
+        with sqlite_connection(self.db_path) as connection:
+            connection.execute("INSERT OR REPLACE INTO fragment_cache (grp, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                               (group, key, value, time.time()))
+            connection.execute(
+                "DELETE FROM fragment_cache WHERE stored_at <= ("
+                "SELECT stored_at FROM fragment_cache ORDER BY stored_at DESC LIMIT 1 OFFSET ?)",
+                (self.max_size,)
+            )
+
+    def delete_group(self, group):
+        """
+        Removes all fragments of a group.
+        """
+        with sqlite_connection(self.db_path) as connection:
+            connection.execute("DELETE FROM fragment_cache WHERE grp = ?", (group,))
+
+    def clear(self):
+        """
+        Removes all fragments.
+        """
+        with sqlite_connection(self.db_path) as connection:
+            connection.execute("DELETE FROM fragment_cache")
+
+    def __len__(self):
+        with sqlite_connection(self.db_path) as connection:
+            return connection.execute("SELECT count(*) FROM fragment_cache").fetchone()[0]
+
+
+class FragmentCache:
+    """
+    A cache of rendered template fragments in front of a pluggable backend.
+
+    Fragments belong to a group, e.g. one user, and are stored under a key that includes the
+    version of the data they show. `invalidate` drops a whole group when its data changes.
+    """
+    def __init__(self, backend=None):
+        """
+        Initializes the cache.
+
+        Args:
+            backend (MemoryBackend or SQLiteBackend, optional): Where fragments are stored.
+                Defaults to an in-process LRU.
+        """
+        self.backend = backend if backend is not None else MemoryBackend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, group, key, render):
+        """
+        Returns a cached fragment, rendering and storing it on a miss.
+
+        Args:
+            group (str): The group the fragment belongs to.
+            key (str): The key of the fragment within the group.
+            render (callable): Renders the fragment; called only on a miss.
+
+        Returns:
+            str: The rendered fragment.
+        """
+        value = self.backend.get(group, key)
+        with self._lock:
+            if value is not None:
+                self.hits += 1
+                return value
+            self.misses += 1
+
+        value = render()
+        self.backend.set(group, key, value)
+        return value
+
+    def invalidate(self, group):
+        """
+        Drops all fragments of a group.
+
+        Args:
+            group (str): The group whose data changed.
+        """
+        self.backend.delete_group(group)
+
+    def clear(self):
+        """
+        Drops all fragments and resets the counters.
+        """
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of the cache.
+
+        Returns:
+            dict: Counters for hits and misses and the number of stored fragments.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.backend)}
+
+
+def create_fragment_cache(spec, max_size=256):
+    """
+    Creates a fragment cache from a configuration string.
+
+    Args:
+        spec (str): "memory" for an in-process LRU, "sqlite:<path>" for a file shared by
+            all workers, or "none" to disable caching.
+        max_size (int): Maximum number of fragments kept.
+
+    Returns:
+        FragmentCache or None: The cache, or None if caching is disabled.
+
+    Raises:
+        ValueError: If the backend is unknown.
+    """
+    spec = (spec or "memory").strip()
+    if spec == "none":
+        return None
+    if spec == "memory":
+        return FragmentCache(MemoryBackend(max_size))
+    if spec.startswith("sqlite:"):
+        return FragmentCache(SQLiteBackend(spec[len("sqlite:"):], max_size))
+    raise ValueError(f"Unknown fragment cache backend: {spec}")
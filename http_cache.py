@@ -0,0 +1,107 @@
+import hashlib
+import os
+from datetime import timezone
+from flask import request, session, make_response, get_flashed_messages
+
+
+def templates_version(template_folder):
+    """
+    Computes a fingerprint of the templates, so that ETags change when a deploy changes the markup.
+    Every worker process computes the same value from the same files.
+
+    Args:
+        template_folder (str): The folder with the Jinja templates.
+
+    Returns:
+        str: A short hex digest of the template file names and contents.
+    """
+    digest = hashlib.sha1()
+    for root, _, files in sorted(os.walk(template_folder)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, template_folder).encode())
+            with open(path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()[:12]
+
+
+def make_etag(*parts):
+    """
+    Builds a strong entity tag from the parts a response depends on.
+
+    Args:
+        *parts: Version stamps, IDs and request arguments; converted with str().
+
+    Returns:
+        str: The unquoted ETag value.
+    """
+    return hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _as_utc(timestamp):
+    """
+    Treats naive datetimes read from SQLite as UTC and drops the microseconds,
+    which HTTP dates cannot express.
+    """
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.replace(microsecond=0)
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Answers a conditional GET before the response is built.
+
+    If-None-Match is compared weakly against `etag`, as RFC 9110 requires, so the weak ETags of
+    compressed responses revalidate too; If-Modified-Since is only consulted when the request has
+    no If-None-Match. While flashed messages are waiting to be shown the page is always rendered,
+    since showing them is what takes them out of the session.
+
+    Args:
+        etag (str): The current ETag of the resource.
+        last_modified (datetime, optional): When the resource last changed.
+
+    Returns:
+        Response or None: A 304 response carrying the validators, or None if the page must be rendered.
+    """
+    if request.method not in ("GET", "HEAD") or session.get("_flashes"):
+        return None
+
+    if request.if_none_match:
+        fresh = request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        fresh = _as_utc(last_modified) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if not fresh:
+        return None
+    return with_validators(make_response("", 304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """
+    Adds the ETag, Last-Modified and Cache-Control headers to a response.
+
+    Browsers may keep the page but have to revalidate it on every visit (`no-cache`), which costs
+    one cheap version query instead of a query and template render. Pages are `private` because
+    they carry the session cookie. A page that showed flashed messages gets `no-store` and no
+    validators instead, so a later 304 cannot bring the messages back from the browser cache.
+
+    Args:
+        response (Response): The response to decorate.
+        etag (str): The ETag of the resource.
+        last_modified (datetime, optional): When the resource last changed.
+
+    Returns:
+        Response: The same response.
+    """
+    if get_flashed_messages():
+        response.cache_control.no_store = True
+        return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _as_utc(last_modified)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
@@ -16,12 +16,75 @@ class DataManagerInterface(ABC):
         pass
 
     @abstractmethod
-    def get_user_movies(self, user_id):
+    def get_user(self, user_id):
         """
-        Retrieves all movies of a specific user.
+        Retrieves a single user by its ID.
+
+        Args:
+            user_id (int): The ID of the user.
+        """
+        pass
+
+    @abstractmethod
+    def get_user_movies(self, user_id, sort="name", direction="asc", cursor=None, limit=None):
+        """
+        Retrieves the movies of a specific user, optionally one page at a time.
 
         Args:
             user_id (int): The ID of the user whose movies are to be retrieved.
+            sort (str): The column to sort by: "name", "year" or "rating".
+            direction (str): The sort direction: "asc" or "desc".
+            cursor (str, optional): The cursor of the page to retrieve; None for the first page.
+            limit (int, optional): The page size; None retrieves all movies.
+        """
+        pass
+
+    @abstractmethod
+    def iter_user_rows(self, after_id=None, limit=None, batch_size=500):
+        """
+        Streams users as read-only rows in ID order.
+
+        Args:
+            after_id (int, optional): Only users with a greater ID are returned.
+            limit (int, optional): The maximum number of users; None streams all of them.
+            batch_size (int): Rows fetched from the database at a time.
+        """
+        pass
+
+    @abstractmethod
+    def iter_movie_rows(self, user_id, sort="name", direction="asc", cursor=None, limit=None, batch_size=500):
+        """
+        Streams the movies of a user as read-only rows, optionally one page at a time.
+
+        Args:
+            user_id (int): The ID of the user whose movies are streamed.
+            sort (str): The column to sort by: "name", "year" or "rating".
+            direction (str): The sort direction: "asc" or "desc".
+            cursor (str, optional): The cursor to start after; None starts at the beginning.
+            limit (int, optional): The page size; None streams all movies.
+            batch_size (int): Rows fetched from the database at a time.
+        """
+        pass
+
+    @abstractmethod
+    def get_movie(self, movie_id):
+        """
+        Retrieves a single movie by its ID.
+
+        Args:
+            movie_id (int): The ID of the movie.
+        """
+        pass
+
+    @abstractmethod
+    def search_movies(self, user_id, query, limit=20):
+        """
+        Searches the names and directors of a user's movies, best matches first.
+
+        Args:
+            user_id (int): The ID of the user whose movies are searched.
+            query (str): The search text.
+            limit (int): The maximum number of results.
         """
         pass
 
@@ -0,0 +1,162 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from data.database import db, Job
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobRunner:
+    """
+    An in-process background job runner.
+
+    Jobs are written to the `jobs` table before they are handed to a thread pool, so their
+    status can be polled from any worker and unfinished jobs are picked up again after a restart.
+    Each job runs inside its own application context with its own database session.
+
+    A job is claimed with a conditional UPDATE from "pending" to "running" before it runs, so
+    when several workers schedule the same job only one of them runs it.
+    """
+    def __init__(self, app, handlers, max_workers=4, stale_after=600):
+        """
+        Initializes the runner. The thread pool is only started when the first job is submitted.
+
+        Args:
+            app (Flask): The application whose context the jobs run in.
+            handlers (dict): Maps a job kind to a callable that receives the Job instance.
+            max_workers (int): Number of worker threads.
+            stale_after (float): Seconds after which a running job is assumed to belong to a
+                process that died and is run again by `resume`.
+        """
+        self.app = app
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.stale_after = stale_after
+        self._executor = None
+        self._lock = threading.Lock()
+        self._resumed = False
+
+    def enqueue(self, kind, user_id, payload=None, movie_id=None):
+        """
+        Stores a new job and schedules it. Must be called inside an application context.
+
+        Args:
+            kind (str): The name of the handler that runs the job.
+            user_id (int): The user the job belongs to.
+            payload (str, optional): The input of the job.
+            movie_id (int, optional): The placeholder movie the job fills in.
+
+        Returns:
+            Job: The stored job.
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'.")
+
+        job = Job(kind=kind, user_id=user_id, payload=payload, movie_id=movie_id, status=PENDING)
+        db.session.add(job)
+        db.session.commit()
+        self.submit(job.id)
+        return job
+
+    def submit(self, job_id):
+        """
+        Hands a stored job to the thread pool.
+
+        Args:
+            job_id (int): The ID of the job to run.
+
+        Returns:
+            Future: The future of the running job.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor.submit(self.run, job_id)
+
+    def run(self, job_id):
+        """
+        Runs a job in the calling thread and records its outcome. Jobs that are no longer
+        pending, e.g. because another worker claimed them first, are skipped.
+
+        Args:
+            job_id (int): The ID of the job to run.
+        """
+        with self.app.app_context():
+            try:
+                claimed = db.session.execute(
+                    update(Job).where(Job.id == job_id, Job.status == PENDING)
+                    .values(status=RUNNING, updated_at=datetime.now(timezone.utc))
+                ).rowcount
+                db.session.commit()
+                if not claimed:
+                    return
+                job = db.session.get(Job, job_id)
+
+                try:
+                    self.handlers[job.kind](job)
+                    job.status = DONE
+                except Exception as error:
+                    db.session.rollback()
+                    logging.error(f"Job {job_id} failed: {error}")
+                    job = db.session.get(Job, job_id)
+                    job.status = FAILED
+                    job.error = str(error)[:255]
+                db.session.commit()
+            finally:
+                db.session.remove()
+
+    def resume(self):
+        """
+        Schedules all jobs that were not finished, e.g. because the process was restarted.
+        Must be called inside an application context. Pending jobs are scheduled; running jobs
+        only if they were claimed more than `stale_after` seconds ago. A database without the
+        jobs table, e.g. one that has not been upgraded yet, has nothing to resume.
+
+        Returns:
+            int: The number of resumed jobs.
+        """
+        now = datetime.now(timezone.utc)
+        try:
+            db.session.execute(
+                update(Job).where(Job.status == RUNNING, Job.updated_at < now - timedelta(seconds=self.stale_after))
+                .values(status=PENDING, updated_at=now)
+            )
+            db.session.commit()
+            job_ids = [job_id for (job_id,) in db.session.query(Job.id).filter(Job.status == PENDING).all()]
+        except OperationalError as error:
+            db.session.rollback()
+            logging.warning(f"Cannot resume jobs: {error}")
+            return 0
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+    def resume_once(self):
+        """
+        Resumes unfinished jobs the first time it is called in this process. Meant to be registered
+        as a `before_request` hook, so that creating the app, e.g. for `flask db upgrade`, never
+        touches the jobs table.
+        """
+        with self._lock:
+            if self._resumed:
+                return
+            self._resumed = True
+        self.resume()
+
+    def shutdown(self, wait=True):
+        """
+        Stops the thread pool.
+
+        Args:
+            wait (bool): Whether to wait for running jobs to finish.
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
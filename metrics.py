@@ -0,0 +1,342 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    A monotonically increasing count per label combination.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        """
+        Initializes the counter.
+
+        Args:
+            name (str): The metric name, e.g. `omdb_cache_lookups_total`.
+            help_text (str): The description shown in the HELP line.
+            labelnames (tuple): The names of the labels each observation carries.
+        """
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Increments the count of a label combination.
+
+        Args:
+            amount (float): The increment.
+            **labels: A value for every label name.
+        """
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        """
+        Returns the count of a label combination, 0 if it was never incremented.
+        """
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def samples(self):
+        """
+        Returns the exposition lines of the counter.
+
+        Returns:
+            list: Lines in Prometheus text format.
+        """
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in values]
+
+
+class Histogram:
+    """
+    Counts observations into cumulative buckets per label combination, with their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        """
+        Initializes the histogram.
+
+        Args:
+            name (str): The metric name, e.g. `http_request_duration_seconds`.
+            help_text (str): The description shown in the HELP line.
+            labelnames (tuple): The names of the labels each observation carries.
+            buckets (tuple): The sorted upper bounds of the buckets; +Inf is added.
+        """
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Records one observation.
+
+        Args:
+            value (float): The observed value, e.g. seconds.
+            **labels: A value for every label name.
+        """
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels):
+        """
+        Returns the number of observations of a label combination.
+        """
+        entry = self._values.get(tuple(labels[name] for name in self.labelnames))
+        return entry[2] if entry else 0
+
+    def samples(self):
+        """
+        Returns the exposition lines of the histogram: cumulative buckets, sum and count.
+
+        Returns:
+            list: Lines in Prometheus text format.
+        """
+        with self._lock:
+            values = sorted((key, ([*counts], total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                labels = _format_labels(self.labelnames, key, [f'le="{_format_number(bound)}"'])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """
+    The metrics of a process, rendered together in Prometheus text format.
+
+    Each worker process has its own registry; Prometheus scrapes every worker, or a single
+    worker if the app runs in one process. Code outside the request instrumentation, e.g. the
+    OMDb client, only records while `enabled` is set, which `init_metrics` does.
+    """
+    def __init__(self):
+        self.enabled = False
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric_type, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_type(name, *args, **kwargs)
+            elif not isinstance(metric, metric_type):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind}.")
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        """
+        Returns the counter of this name, creating it on first use.
+
+        Returns:
+            Counter: The counter.
+        """
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        """
+        Returns the histogram of this name, creating it on first use.
+
+        Returns:
+            Histogram: The histogram.
+        """
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def get(self, name):
+        """
+        Returns a registered metric by name, or None.
+        """
+        return self._metrics.get(name)
+
+    def render(self):
+        """
+        Renders all metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+def _query_stats():
+    """
+    Returns the query statistics of the current request, or None outside of an instrumented request.
+    """
+    if has_request_context():
+        return g.get("_metrics_queries")
+    return None
+
+
+def instrument_engine(engine, registry=registry):
+    """
+    Times every SQL statement executed on an engine.
+
+    All statements are recorded in the `db_query_duration_seconds` histogram. Statements executed
+    during an instrumented request are also counted for that request, see `init_metrics`.
+    The start time is kept on the statement's execution context, so a statement that fails,
+    and never reaches `after_cursor_execute`, leaves nothing behind on the connection.
+
+    Args:
+        engine (Engine): The engine to instrument.
+        registry (Registry): The registry to record into.
+    """
+    query_seconds = registry.histogram("db_query_duration_seconds", "SQL statement execution time.",
+                                       ("operation",), QUERY_BUCKETS)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_query_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_metrics_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        query_seconds.observe(elapsed, operation=statement.lstrip().split(None, 1)[0].upper())
+        stats = _query_stats()
+        if stats is not None:
+            stats["count"] += 1
+            stats["seconds"] += elapsed
+            stats["statements"][statement] = stats["statements"].get(statement, 0) + 1
+
+
+def init_metrics(app, engines=(), registry=registry):
+    """
+    Instruments an app: request latency, SQL queries per request, N+1 detection and `/metrics`.
+
+    Nothing is registered or recorded unless `METRICS_ENABLED` is set in the app config. If `METRICS_TOKEN` is
+    set as well, `/metrics` only answers requests with the header `Authorization: Bearer <token>`,
+    and 403 otherwise. Every request is
+    timed into `http_request_duration_seconds` and gets a `Server-Timing` header with its
+    database and total time. When one SQL statement runs `METRICS_N_PLUS_ONE_THRESHOLD` times
+    or more in a single request, e.g. a lazy `user.movies` load per user in a loop, a warning is
+    logged and `db_n_plus_one_total` is incremented. Requests slower than `METRICS_SLOW_REQUEST_MS`
+    are logged as well.
+
+    Args:
+        app (Flask): The application.
+        engines (Iterable): The engines whose queries are counted.
+        registry (Registry): The registry to record into and to expose.
+    """
+    if not app.config.get("METRICS_ENABLED"):
+        return
+    registry.enabled = True
+
+    request_seconds = registry.histogram("http_request_duration_seconds", "Time spent handling a request.",
+                                         ("method", "endpoint", "status"))
+    request_queries = registry.histogram("http_request_queries", "SQL statements executed per request.",
+                                         ("endpoint",), COUNT_BUCKETS)
+    request_query_seconds = registry.histogram("http_request_query_seconds", "Time spent in SQL per request.",
+                                               ("endpoint",))
+    n_plus_one = registry.counter("db_n_plus_one_total",
+                                  "Requests that repeated one SQL statement at least the N+1 threshold.",
+                                  ("endpoint",))
+    threshold = app.config.get("METRICS_N_PLUS_ONE_THRESHOLD", 5)
+    slow_seconds = app.config.get("METRICS_SLOW_REQUEST_MS", 500) / 1000
+
+    for engine in engines:
+        instrument_engine(engine, registry)
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+        g._metrics_queries = {"count": 0, "seconds": 0.0, "statements": {}}
+
+    def record_request(response):
+        start = g.pop("_metrics_start", None)
+        stats = g.pop("_metrics_queries", None)
+        if start is None or stats is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+
+        request_seconds.observe(elapsed, method=request.method, endpoint=endpoint, status=response.status_code)
+        request_queries.observe(stats["count"], endpoint=endpoint)
+        request_query_seconds.observe(stats["seconds"], endpoint=endpoint)
+        response.headers.add("Server-Timing",
+                             f"db;desc=\"{stats['count']} queries\";dur={stats['seconds'] * 1000:.1f}, "
+                             f"total;dur={elapsed * 1000:.1f}")
+
+        repeated = [(count, statement) for statement, count in stats["statements"].items() if count >= threshold]
+        if repeated:
+            n_plus_one.inc(endpoint=endpoint)
+            for count, statement in sorted(repeated, reverse=True):
+                app.logger.warning(f"Possible N+1 query in {endpoint}: {count}x {' '.join(statement.split())[:200]}")
+        if elapsed >= slow_seconds:
+            app.logger.warning(f"Slow request {request.method} {request.path}: {elapsed * 1000:.0f} ms, "
+                               f"{stats['count']} queries in {stats['seconds'] * 1000:.0f} ms")
+        return response
+
+    # Runs after every other after-request step, including compression, so their time is included.
+    app.after_request_funcs.setdefault(None, []).insert(0, record_request)
+
+    def metrics():
+        """
+        Exposes the metrics of this process in Prometheus text format.
+
+        Returns:
+            Response: The exposition text.
+        """
+        token = app.config.get("METRICS_TOKEN")
+        if token:
+            sent = request.headers.get("Authorization", "").removeprefix("Bearer ")
+            if not hmac.compare_digest(sent.encode(), token.encode()):
+                abort(403)
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule("/metrics", "metrics", metrics)
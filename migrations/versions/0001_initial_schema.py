@@ -0,0 +1,68 @@
+"""Initial schema: users, movies and jobs
+
+Databases created by `db.create_all()` before migrations were introduced already
+contain some of these tables; only the missing ones are created, so such a
+database can simply be upgraded.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'movies' not in existing:
+        op.create_table(
+            'movies',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('director', sa.String(length=100), nullable=False),
+            sa.Column('year', sa.Integer(), nullable=True),
+            sa.Column('rating', sa.Float(), nullable=True),
+            sa.Column('poster', sa.String(length=255), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if 'jobs' not in existing:
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=50), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('movie_id', sa.Integer(), nullable=True),
+            sa.Column('payload', sa.String(length=255), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('error', sa.String(length=255), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('jobs')
+    op.drop_table('movies')
+    op.drop_table('users')
@@ -0,0 +1,56 @@
+"""Shared movie catalog keyed by imdbID
+
+Adds the `catalog` table and turns `movies` into `user_movies`, which links each
+user's entry to the catalog. Existing rows keep their own data and poster and
+simply have no catalog entry.
+
+Revision ID: 0002_shared_catalog
+Revises: 0001_initial_schema
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_shared_catalog'
+down_revision = '0001_initial_schema'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'catalog',
+        sa.Column('imdb_id', sa.String(length=20), nullable=False),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('title_key', sa.String(length=255), nullable=False),
+        sa.Column('director', sa.String(length=255), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('rating', sa.Float(), nullable=True),
+        sa.Column('poster', sa.String(length=255), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('imdb_id')
+    )
+    op.create_index('ix_catalog_title_key', 'catalog', ['title_key'])
+
+    op.rename_table('movies', 'user_movies')
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.add_column(sa.Column('imdb_id', sa.String(length=20), nullable=True))
+        batch_op.create_foreign_key('fk_user_movies_imdb_id_catalog', 'catalog', ['imdb_id'], ['imdb_id'])
+
+
+def downgrade():
+    op.execute(
+        "UPDATE user_movies SET poster = "
+        "(SELECT catalog.poster FROM catalog WHERE catalog.imdb_id = user_movies.imdb_id) "
+        "WHERE poster IS NULL AND imdb_id IS NOT NULL"
+    )
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.drop_constraint('fk_user_movies_imdb_id_catalog', type_='foreignkey')
+        batch_op.drop_column('imdb_id')
+    op.rename_table('user_movies', 'movies')
+
+    op.drop_index('ix_catalog_title_key', table_name='catalog')
+    op.drop_table('catalog')
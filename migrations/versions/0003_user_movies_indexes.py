@@ -0,0 +1,33 @@
+"""Indexes on user_movies.user_id and the per-user sort columns
+
+SQLite does not index foreign keys by itself, so loading a user's movies was a
+full scan of user_movies. The composite indexes also serve listings sorted by
+year, rating or name.
+
+Revision ID: 0003_user_movies_indexes
+Revises: 0002_shared_catalog
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_user_movies_indexes'
+down_revision = '0002_shared_catalog'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_user_movies_user_id', 'user_movies', ['user_id'])
+    op.create_index('ix_user_movies_user_id_year', 'user_movies', ['user_id', 'year'])
+    op.create_index('ix_user_movies_user_id_rating', 'user_movies', ['user_id', 'rating'])
+    op.create_index('ix_user_movies_user_id_name', 'user_movies', ['user_id', 'name'])
+
+
+def downgrade():
+    op.drop_index('ix_user_movies_user_id_name', table_name='user_movies')
+    op.drop_index('ix_user_movies_user_id_rating', table_name='user_movies')
+    op.drop_index('ix_user_movies_user_id_year', table_name='user_movies')
+    op.drop_index('ix_user_movies_user_id', table_name='user_movies')
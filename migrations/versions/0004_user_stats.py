@@ -0,0 +1,47 @@
+"""Aggregate movie statistics on users
+
+The users list showed a movie count computed with a GROUP BY over
+user_movies on every request. The count, average rating and latest addition
+are now stored on users and refreshed whenever a user's movies change.
+
+Revision ID: 0004_user_stats
+Revises: 0003_user_movies_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_user_stats'
+down_revision = '0003_user_movies_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.add_column(sa.Column('added_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('movie_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('avg_rating', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('latest_added', sa.DateTime(), nullable=True))
+
+    op.execute("""
+        UPDATE users SET
+            movie_count = (SELECT count(*) FROM user_movies WHERE user_movies.user_id = users.id),
+            avg_rating = (SELECT avg(rating) FROM user_movies WHERE user_movies.user_id = users.id),
+            latest_added = (SELECT max(added_at) FROM user_movies WHERE user_movies.user_id = users.id)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('latest_added')
+        batch_op.drop_column('avg_rating')
+        batch_op.drop_column('movie_count')
+
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.drop_column('added_at')
@@ -0,0 +1,55 @@
+"""Full-text search index over user_movies
+
+Adds the FTS5 table user_movies_fts over the name and director of every movie,
+with user_id as an extra indexed column, and the triggers that keep it in sync.
+The index is filled from the existing rows.
+
+Batch migrations that recreate user_movies drop these triggers; such migrations
+must create them again and rebuild the index.
+
+Revision ID: 0005_user_movies_search
+Revises: 0004_user_stats
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_user_movies_search'
+down_revision = '0004_user_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE user_movies_fts USING fts5("
+        "name, director, user_id, content='user_movies', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ai AFTER INSERT ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(rowid, name, director, user_id) "
+        "VALUES (new.id, new.name, new.director, new.user_id); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ad AFTER DELETE ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(user_movies_fts, rowid, name, director, user_id) "
+        "VALUES ('delete', old.id, old.name, old.director, old.user_id); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_au AFTER UPDATE OF name, director, user_id ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(user_movies_fts, rowid, name, director, user_id) "
+        "VALUES ('delete', old.id, old.name, old.director, old.user_id); "
+        "INSERT INTO user_movies_fts(rowid, name, director, user_id) "
+        "VALUES (new.id, new.name, new.director, new.user_id); END"
+    )
+    op.execute("INSERT INTO user_movies_fts(user_movies_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS user_movies_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS user_movies_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS user_movies_fts_ai")
+    op.execute("DROP TABLE IF EXISTS user_movies_fts")
@@ -0,0 +1,35 @@
+"""Version stamp on users
+
+users.updated_at changes whenever a user or one of its movies changes and is
+used to answer conditional GET requests for the user pages. Existing users
+start at their latest addition, or now if they have no movies.
+
+Revision ID: 0006_users_updated_at
+Revises: 0005_user_movies_search
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_users_updated_at'
+down_revision = '0005_user_movies_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE users SET updated_at = coalesce(latest_added, CURRENT_TIMESTAMP)")
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('updated_at')
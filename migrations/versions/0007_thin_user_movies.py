@@ -0,0 +1,127 @@
+"""Read catalog data through the link instead of copying it into user_movies
+
+The name, director, year and rating of a user's movie become nullable overrides:
+NULL means the value of the linked catalog entry applies. Values that are equal
+to the catalog's are cleared, so only what a user changed is kept. Movies without
+a catalog entry keep their values, and a check constraint makes sure every movie
+has either a name or a catalog entry.
+
+The (user_id, year/rating/name) indexes only covered the overrides, so they are
+dropped. The full-text index stores the resolved names and directors itself now
+and is kept in sync by triggers on user_movies and on catalog.
+
+Revision ID: 0007_thin_user_movies
+Revises: 0006_users_updated_at
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_thin_user_movies'
+down_revision = '0006_users_updated_at'
+branch_labels = None
+depends_on = None
+
+RESOLVED_MOVIE = (
+    "SELECT m.id, coalesce(m.name, c.title), coalesce(m.director, c.director), m.user_id "
+    "FROM user_movies m LEFT JOIN catalog c ON c.imdb_id = m.imdb_id"
+)
+SORT_INDEXES = (('ix_user_movies_user_id_year', 'year'), ('ix_user_movies_user_id_rating', 'rating'),
+                ('ix_user_movies_user_id_name', 'name'))
+
+
+def catalog_value(column):
+    return f"(SELECT catalog.{column} FROM catalog WHERE catalog.imdb_id = user_movies.imdb_id)"
+
+
+def drop_search_index():
+    for trigger in ('user_movies_fts_catalog_au', 'user_movies_fts_au', 'user_movies_fts_ad', 'user_movies_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS user_movies_fts")
+
+
+def upgrade():
+    drop_search_index()
+    for index, _ in SORT_INDEXES:
+        op.drop_index(index, table_name='user_movies')
+
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.alter_column('name', existing_type=sa.String(length=100), nullable=True)
+        batch_op.alter_column('director', existing_type=sa.String(length=100), nullable=True)
+        batch_op.create_check_constraint('ck_user_movies_name_or_catalog', 'name IS NOT NULL OR imdb_id IS NOT NULL')
+
+    linked = "imdb_id IS NOT NULL AND EXISTS (SELECT 1 FROM catalog WHERE catalog.imdb_id = user_movies.imdb_id)"
+    op.execute(f"UPDATE user_movies SET name = NULL WHERE {linked} AND name IS {catalog_value('title')}")
+    op.execute(f"UPDATE user_movies SET director = NULL WHERE {linked} AND (director IS {catalog_value('director')} "
+               f"OR (director = 'Unknown' AND {catalog_value('director')} IS NULL))")
+    op.execute(f"UPDATE user_movies SET year = NULL WHERE {linked} AND year IS {catalog_value('year')}")
+    op.execute(f"UPDATE user_movies SET rating = NULL WHERE {linked} AND rating IS {catalog_value('rating')}")
+
+    op.execute(
+        "CREATE VIRTUAL TABLE user_movies_fts USING fts5("
+        "name, director, user_id, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ai AFTER INSERT ON user_movies BEGIN "
+        f"INSERT INTO user_movies_fts(rowid, name, director, user_id) {RESOLVED_MOVIE} WHERE m.id = new.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ad AFTER DELETE ON user_movies BEGIN "
+        "DELETE FROM user_movies_fts WHERE rowid = old.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_au AFTER UPDATE OF name, director, imdb_id, user_id ON user_movies BEGIN "
+        "DELETE FROM user_movies_fts WHERE rowid = old.id; "
+        f"INSERT INTO user_movies_fts(rowid, name, director, user_id) {RESOLVED_MOVIE} WHERE m.id = new.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_catalog_au AFTER UPDATE OF title, director ON catalog BEGIN "
+        "DELETE FROM user_movies_fts WHERE rowid IN (SELECT id FROM user_movies WHERE imdb_id = new.imdb_id); "
+        f"INSERT INTO user_movies_fts(rowid, name, director, user_id) {RESOLVED_MOVIE} "
+        "WHERE m.imdb_id = new.imdb_id; END"
+    )
+    op.execute(f"INSERT INTO user_movies_fts(rowid, name, director, user_id) {RESOLVED_MOVIE}")
+
+
+def downgrade():
+    drop_search_index()
+
+    op.execute(f"UPDATE user_movies SET name = coalesce(name, {catalog_value('title')}), "
+               f"director = coalesce(director, {catalog_value('director')}, 'Unknown'), "
+               f"year = coalesce(year, {catalog_value('year')}), "
+               f"rating = coalesce(rating, {catalog_value('rating')})")
+
+    with op.batch_alter_table('user_movies') as batch_op:
+        batch_op.drop_constraint('ck_user_movies_name_or_catalog', type_='check')
+        batch_op.alter_column('name', existing_type=sa.String(length=100), nullable=False)
+        batch_op.alter_column('director', existing_type=sa.String(length=100), nullable=False)
+
+    for index, column in SORT_INDEXES:
+        op.create_index(index, 'user_movies', ['user_id', column])
+
+    op.execute(
+        "CREATE VIRTUAL TABLE user_movies_fts USING fts5("
+        "name, director, user_id, content='user_movies', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4 5 6')"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ai AFTER INSERT ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(rowid, name, director, user_id) "
+        "VALUES (new.id, new.name, new.director, new.user_id); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_ad AFTER DELETE ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(user_movies_fts, rowid, name, director, user_id) "
+        "VALUES ('delete', old.id, old.name, old.director, old.user_id); END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_fts_au AFTER UPDATE OF name, director, user_id ON user_movies BEGIN "
+        "INSERT INTO user_movies_fts(user_movies_fts, rowid, name, director, user_id) "
+        "VALUES ('delete', old.id, old.name, old.director, old.user_id); "
+        "INSERT INTO user_movies_fts(rowid, name, director, user_id) "
+        "VALUES (new.id, new.name, new.director, new.user_id); END"
+    )
+    op.execute("INSERT INTO user_movies_fts(user_movies_fts) VALUES ('rebuild')")
@@ -0,0 +1,37 @@
+"""Progress and result of background jobs
+
+Bulk imports run as jobs now. Their payload is the whole list of titles, so
+jobs.payload becomes TEXT, and the number of processed titles, the total and
+the JSON summary of the import are stored on the job for the import page to poll.
+
+Revision ID: 0008_import_jobs
+Revises: 0007_thin_user_movies
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_import_jobs'
+down_revision = '0007_thin_user_movies'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.alter_column('payload', existing_type=sa.String(length=255), type_=sa.Text())
+        batch_op.add_column(sa.Column('progress', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('total', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('result', sa.Text(), nullable=True))
+
+
+def downgrade():
+    op.execute("DELETE FROM jobs WHERE kind = 'import_movies'")
+    with op.batch_alter_table('jobs') as batch_op:
+        batch_op.drop_column('result')
+        batch_op.drop_column('total')
+        batch_op.drop_column('progress')
+        batch_op.alter_column('payload', existing_type=sa.Text(), type_=sa.String(length=255))
@@ -0,0 +1,64 @@
+"""Resolved sort columns on user_movies
+
+Since 0007, the name, year and rating of most movies are read from the catalog,
+and the (user_id, name/year/rating) indexes were dropped with the copies. Sorting
+a user's page then scanned the whole collection and looked up the catalog for
+every row. The resolved values are stored again, in sort_name, sort_year and
+sort_rating, and indexed together with user_id. Triggers keep them in sync with
+a movie's own values and with its catalog entry.
+
+Revision ID: 0009_user_movies_sort_columns
+Revises: 0008_import_jobs
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_user_movies_sort_columns'
+down_revision = '0008_import_jobs'
+branch_labels = None
+depends_on = None
+
+SORT_VALUES = (
+    "sort_name = coalesce(name, (SELECT c.title FROM catalog c WHERE c.imdb_id = user_movies.imdb_id)), "
+    "sort_year = coalesce(year, (SELECT c.year FROM catalog c WHERE c.imdb_id = user_movies.imdb_id)), "
+    "sort_rating = coalesce(rating, (SELECT c.rating FROM catalog c WHERE c.imdb_id = user_movies.imdb_id))"
+)
+SORT_INDEXES = (('ix_user_movies_user_id_sort_name', 'sort_name'), ('ix_user_movies_user_id_sort_year', 'sort_year'),
+                ('ix_user_movies_user_id_sort_rating', 'sort_rating'))
+TRIGGERS = ('user_movies_sort_catalog_au', 'user_movies_sort_au', 'user_movies_sort_ai')
+
+
+def upgrade():
+    op.add_column('user_movies', sa.Column('sort_name', sa.String(length=255), nullable=True))
+    op.add_column('user_movies', sa.Column('sort_year', sa.Integer(), nullable=True))
+    op.add_column('user_movies', sa.Column('sort_rating', sa.Float(), nullable=True))
+    op.execute(f"UPDATE user_movies SET {SORT_VALUES}")
+
+    op.execute(
+        "CREATE TRIGGER user_movies_sort_ai AFTER INSERT ON user_movies BEGIN "
+        f"UPDATE user_movies SET {SORT_VALUES} WHERE id = new.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_sort_au AFTER UPDATE OF name, year, rating, imdb_id ON user_movies BEGIN "
+        f"UPDATE user_movies SET {SORT_VALUES} WHERE id = new.id; END"
+    )
+    op.execute(
+        "CREATE TRIGGER user_movies_sort_catalog_au AFTER UPDATE OF title, year, rating ON catalog BEGIN "
+        f"UPDATE user_movies SET {SORT_VALUES} WHERE imdb_id = new.imdb_id; END"
+    )
+    for index, column in SORT_INDEXES:
+        op.create_index(index, 'user_movies', ['user_id', column])
+
+
+def downgrade():
+    for index, _ in SORT_INDEXES:
+        op.drop_index(index, table_name='user_movies')
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.drop_column('user_movies', 'sort_rating')
+    op.drop_column('user_movies', 'sort_year')
+    op.drop_column('user_movies', 'sort_name')
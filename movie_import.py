@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import logging
+from collections import namedtuple
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from data.database import db, Movie
+from catalog import lookup_movies, user_movie_fields
+from data.user_stats import refresh_user_stats
+
+RowError = namedtuple("RowError", ["line", "title", "reason"])
+
+
+class ImportResult:
+    """
+    Summary of a bulk import: how many movies were added and which rows failed.
+
+    Attributes:
+        total (int): Number of titles that were processed.
+        added (int): Number of movies written to the database.
+        errors (list): One RowError(line, title, reason) per failed row.
+    """
+    def __init__(self, total):
+        self.total = total
+        self.added = 0
+        self.errors = []
+
+    def __repr__(self):
+        return f"<ImportResult(total={self.total}, added={self.added}, errors={len(self.errors)})>"
+
+    def to_json(self):
+        """
+        Serializes the result, e.g. to store it on the job that ran the import.
+
+        Returns:
+            str: The result as a JSON object.
+        """
+        return json.dumps({"total": self.total, "added": self.added,
+                           "errors": [list(row_error) for row_error in self.errors]})
+
+    @classmethod
+    def from_json(cls, text):
+        """
+        Restores a result serialized by `to_json`.
+
+        Args:
+            text (str): The JSON object.
+
+        Returns:
+            ImportResult: The restored result.
+        """
+        data = json.loads(text)
+        result = cls(data["total"])
+        result.added = data["added"]
+        result.errors = [RowError(*row_error) for row_error in data["errors"]]
+        return result
+
+
+def parse_titles(text, fmt=None):
+    """
+    Extracts movie titles from an uploaded list.
+
+    Two formats are accepted: CSV with a header row containing a "title" column, and plain
+    text with one title per line. If `fmt` is not given, CSV is assumed when the first line
+    has a "title" column, so that titles containing commas work in plain lists.
+
+    Args:
+        text (str): The uploaded file content.
+        fmt (str, optional): "csv" or "lines" to skip the detection.
+
+    Returns:
+        list: (line number, title) tuples in file order. Empty CSV title cells are kept so they can be reported.
+    """
+    lines = text.splitlines()
+    if not lines:
+        return []
+
+    if fmt is None:
+        header = [cell.strip().casefold() for cell in next(csv.reader([lines[0]]))]
+        fmt = "csv" if "title" in header else "lines"
+
+    if fmt == "csv":
+        reader = csv.reader(io.StringIO(text))
+        header = [cell.strip().casefold() for cell in next(reader)]
+        column = header.index("title") if "title" in header else 0
+        return [(reader.line_num, row[column].strip() if len(row) > column else "")
+                for row in reader if any(cell.strip() for cell in row)]
+
+    return [(number, line.strip()) for number, line in enumerate(lines, start=1) if line.strip()]
+
+
+def import_movies(user_id, titles, chunk_size=500, concurrency=10, progress=None):
+    """
+    Resolves titles with OMDb and adds the found movies to a user's collection.
+
+    Titles are processed in chunks: each chunk is resolved from the catalog or, if unknown,
+    concurrently via OMDb, and written with a single multi-row INSERT in its own transaction,
+    so a failing chunk does not undo the chunks before it. Must be called inside an application context.
+
+    Args:
+        user_id (int): The ID of the user who the movies will be added to.
+        titles (list): (line number, title) tuples as returned by `parse_titles`.
+        chunk_size (int): Number of titles looked up and inserted per transaction.
+        concurrency (int): Maximum number of OMDb lookups in flight.
+        progress (callable, optional): Called as progress(processed, total) after each chunk.
+
+    Returns:
+        ImportResult: The number of added movies and the per-row errors.
+    """
+    result = ImportResult(len(titles))
+
+    for start in range(0, len(titles), chunk_size):
+        chunk = titles[start:start + chunk_size]
+        valid = [(line, title) for line, title in chunk if title]
+        result.errors.extend(RowError(line, title, "Empty title.") for line, title in chunk if not title)
+
+        rows = []
+        lines = []
+        try:
+            movies_data = lookup_movies([title for _, title in valid], concurrency=concurrency,
+                                        return_exceptions=True)
+        except SQLAlchemyError as error:
+            db.session.rollback()
+            logging.error(f"Error looking up movies for user {user_id}: {error}")
+            result.errors.extend(RowError(line, title, f"Database error during lookup: {error.__class__.__name__}.")
+                                 for line, title in valid)
+            movies_data = []
+
+        for (line, title), movie_data in zip(valid, movies_data):
+            if isinstance(movie_data, Exception):
+                result.errors.append(RowError(line, title, f"OMDb lookup failed: {movie_data}"))
+            elif not movie_data:
+                result.errors.append(RowError(line, title, "Movie not found in OMDb."))
+            else:
+                try:
+                    rows.append(user_movie_fields(user_id, movie_data))
+                    lines.append((line, title))
+                except (KeyError, TypeError, ValueError) as error:
+                    result.errors.append(RowError(line, title, f"Invalid movie data: {error!r}"))
+
+        if rows:
+            try:
+                db.session.execute(insert(Movie), rows)
+                refresh_user_stats(db.session, user_id)
+                db.session.commit()
+                result.added += len(rows)
+            except SQLAlchemyError as error:
+                db.session.rollback()
+                logging.error(f"Error importing movies for user {user_id}: {error}")
+                result.errors.extend(RowError(line, title, f"Database error: {error.__class__.__name__}.")
+                                     for line, title in lines)
+
+        if progress:
+            progress(start + len(chunk), result.total)
+
+    result.errors.sort(key=lambda error: error.line)
+    return result
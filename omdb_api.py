@@ -1,42 +1,328 @@
+import asyncio
+import logging
 import os
-import requests
-from dotenv import load_dotenv
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from omdb_cache import MovieCache, MISS, normalize_title
+from metrics import registry
 
-load_dotenv()
+# Overrides the OMDB_API_KEY environment variable, which is read when a lookup is made.
+API_KEY = None
+DEFAULT_BASE_URL = "http://www.omdbapi.com/"
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+OMDB_SECONDS = registry.histogram("omdb_request_duration_seconds", "Time spent waiting for OMDb, including retries.",
+                                  ("outcome",))
+OMDB_CACHE_LOOKUPS = registry.counter("omdb_cache_lookups_total", "OMDb lookups answered from the cache or not.",
+                                      ("result",))
+
+YEAR = re.compile(r"\d{4}")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def api_key():
+    """
+    Returns the OMDb API key: `API_KEY` if set, otherwise the OMDB_API_KEY environment variable.
+    """
+    return API_KEY or os.getenv("OMDB_API_KEY")
+
+
+def get_cache():
+    """
+    Returns the shared OMDb lookup cache, creating it on first use from the environment.
+
+    Returns:
+        MovieCache: The process-wide cache.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = MovieCache(
+                    ttl=int(os.getenv("OMDB_CACHE_TTL", 86400)),
+                    negative_ttl=int(os.getenv("OMDB_NEGATIVE_CACHE_TTL", 600)),
+                    max_size=int(os.getenv("OMDB_CACHE_SIZE", 1024)),
+                    db_path=os.getenv("OMDB_CACHE_DB")
+                )
+    return _cache
+
+
+def parse_year(value):
+    """
+    Reads a release year from an OMDb "Year" field. Ranges of series such as "2010–2015"
+    or "2010–" resolve to their first year.
+
+    Args:
+        value (str): The field as returned by OMDb.
+
+    Returns:
+        int or None: The year, or None if the field is missing or "N/A".
+    """
+    match = YEAR.match(str(value or "").strip())
+    return int(match.group()) if match else None
+
+
+def parse_rating(value):
+    """
+    Reads a rating from an OMDb "imdbRating" field.
+
+    Args:
+        value (str): The field as returned by OMDb.
+
+    Returns:
+        float or None: The rating, or None if the field is missing or "N/A".
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_movie_response(data):
+    """
+    Converts an OMDb JSON payload into the movie data used by the application.
+
+    Args:
+        data (dict): The decoded JSON body returned by OMDb.
+
+    Returns:
+        dict or None: Dictionary with movie data if OMDb found the movie, otherwise None.
+    """
+    if data.get("Response") == "True":
+        director = data.get("Director")
+        return {
+            "imdb_id": data.get("imdbID"),
+            "title": data.get("Title"),
+            "director": director if director and director != "N/A" else None,
+            "year": parse_year(data.get("Year")),
+            "rating": parse_rating(data.get("imdbRating")),
+            "poster": data.get("Poster")
+        }
+    logging.warning(f"Movie not found: {data.get('Error')}")
+    return None
+
+
+class OMDbClient:
+    """
+    A reusable OMDb client backed by a pooled keep-alive `requests.Session`.
+
+    Connections are reused between lookups, every request is bounded by a connect and a
+    read timeout, and 429 and 5xx responses are retried with jittered exponential backoff.
+    """
+    def __init__(self, api_key=None, base_url=None, pool_size=10, connect_timeout=3.05,
+                 read_timeout=10, retries=3, backoff_factor=0.5, backoff_jitter=0.5, movie_cache=None):
+        """
+        Initializes the client and its connection pool.
+
+        Args:
+            api_key (str, optional): The OMDb API key. Defaults to `api_key()`.
+            base_url (str, optional): The OMDb endpoint. Defaults to the OMDB_BASE_URL environment variable
+                or `DEFAULT_BASE_URL`.
+            pool_size (int): Maximum number of pooled connections kept open.
+            connect_timeout (float): Seconds to wait for a connection to be established.
+            read_timeout (float): Seconds to wait for the response.
+            retries (int): How often a failed request is retried.
+            backoff_factor (float): Base of the exponential backoff between retries in seconds.
+            backoff_jitter (float): Maximum random seconds added to each backoff.
+            movie_cache (MovieCache, optional): The lookup cache. Defaults to `get_cache()`.
+        """
+        # requests is imported by the first client rather than at startup; it is a slow import.
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self.api_key = api_key
+        self.base_url = base_url or os.getenv("OMDB_BASE_URL", DEFAULT_BASE_URL)
+        self.timeout = (connect_timeout, read_timeout)
+        self.cache = movie_cache if movie_cache is not None else get_cache()
+        self.request_errors = requests.exceptions.RequestException
+
+        retry = Retry(
+            total=retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=("GET",),
+            backoff_factor=backoff_factor,
+            backoff_jitter=backoff_jitter,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_movie(self, title):
+        """
+        Fetches movie data from OMDb using the given title, answering from the cache if possible.
+
+        Results are cached by normalized title, including "not found" answers which
+        are kept for a shorter time. Failed requests are not cached.
+
+        Args:
+            title (str): Title of the movie to search for.
+
+        Returns:
+            dict or None: Dictionary with movie data if found, otherwise None.
+        """
+        cached = self.cache.get(title)
+        if registry.enabled:
+            OMDB_CACHE_LOOKUPS.inc(result="miss" if cached is MISS else "hit")
+        if cached is not MISS:
+            return cached
+
+        key = self.api_key or api_key()
+        start = time.perf_counter()
+        try:
+            response = self.session.get(self.base_url, params={"apikey": key, "t": title},
+                                        timeout=self.timeout)
+            if registry.enabled:
+                OMDB_SECONDS.observe(time.perf_counter() - start, outcome=str(response.status_code))
+            if response.status_code == 200:
+                movie_data = parse_movie_response(response.json())
+                self.cache.set(title, movie_data)
+                return movie_data
+            else:
+                logging.error(f"Error: Status code {response.status_code}")
+        except self.request_errors as e:
+            if registry.enabled:
+                OMDB_SECONDS.observe(time.perf_counter() - start, outcome="error")
+            logging.error(f"Request error: {e}")
+        except (ValueError, KeyError, TypeError) as e:
+            logging.error(f"Invalid response for '{title}': {e}")
+
+        return None
+
+    def close(self):
+        """
+        Closes all pooled connections.
+        """
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the shared OMDb client, creating it on first use from the environment.
+
+    Returns:
+        OMDbClient: The process-wide client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OMDbClient(
+                    pool_size=int(os.getenv("OMDB_POOL_SIZE", 10)),
+                    connect_timeout=float(os.getenv("OMDB_CONNECT_TIMEOUT", 3.05)),
+                    read_timeout=float(os.getenv("OMDB_READ_TIMEOUT", 10)),
+                    retries=int(os.getenv("OMDB_RETRIES", 3))
+                )
+    return _client
 
-API_KEY = os.getenv("OMDB_API_KEY")
-BASE_URL = "http://www.omdbapi.com/"
 
 def fetch_movie_data(title):
     """
     Fetches movie data from the OMDb API using the given title.
 
+    This is a thin wrapper around the shared `OMDbClient`.
+
     Args:
         title (str): Title of the movie to search for.
 
     Returns:
         dict or None: Dictionary with movie data if found, otherwise None.
     """
-    if not API_KEY:
-        print("OMDb API key not found. Please check your .env file.")
+    if not api_key():
+        logging.error("OMDb API key not found. Please check your .env file.")
         return None
 
+    return get_client().fetch_movie(title)
+
+
+async def fetch_many_async(titles, concurrency=10, timeout=15, client=None, return_exceptions=False):
+    """
+    Resolves many titles concurrently from within an asyncio event loop.
+
+    At most `concurrency` lookups run at the same time. Each lookup goes through
+    `OMDbClient.fetch_movie` on a worker thread, so it shares the connection pool,
+    the cache and the response parsing with the synchronous path. Titles that only
+    differ in case or spacing are looked up once. A lookup that fails or times out
+    only affects its own title.
+
+    Args:
+        titles (list): Titles of the movies to search for.
+        concurrency (int): Maximum number of lookups in flight.
+        timeout (float): Seconds after which a single lookup is given up.
+        client (OMDbClient, optional): The client to use. Defaults to the shared client.
+        return_exceptions (bool): Return the exception of a failed lookup in its place instead of None.
+
+    Returns:
+        list: Movie data dictionaries, None or exceptions, in the same order as `titles`.
+    """
+    titles = list(titles)
+    if not api_key() and (client is None or not client.api_key):
+        logging.error("OMDb API key not found. Please check your .env file.")
+        return [None] * len(titles)
+
+    client = client or get_client()
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="omdb")
+
+    async def fetch_one(title):
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(executor, client.fetch_movie, title), timeout)
+            except asyncio.TimeoutError:
+                logging.warning(f"Request error: lookup of '{title}' timed out after {timeout}s")
+                return TimeoutError(f"Lookup timed out after {timeout}s") if return_exceptions else None
+            except Exception as e:
+                logging.error(f"Request error: lookup of '{title}' failed: {e}")
+                return e if return_exceptions else None
+
+    lookups = {}
+    for title in titles:
+        key = normalize_title(title)
+        if key not in lookups:
+            lookups[key] = asyncio.ensure_future(fetch_one(title))
+
     try:
-        response = requests.get(BASE_URL, params={"apikey": API_KEY, "t": title})
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("Response") == "True":
-                return {
-                    "title": data.get("Title"),
-                    "year": int(data.get("Year", 0)),
-                    "rating": float(data.get("imdbRating", 0)),
-                    "poster": data.get("Poster")
-                }
-            else:
-                print(f"Movie not found: {data.get('Error')}")
-        else:
-            print(f"Error: Status code {response.status_code}")
-    except requests.exceptions.RequestException as e:
-        print(f"Request error: {e}")
+        await asyncio.gather(*lookups.values())
+    finally:
+        executor.shutdown(wait=False)
 
-    return None
\ No newline at end of file
+    return [lookups[normalize_title(title)].result() for title in titles]
+
+
+def fetch_many(titles, concurrency=10, timeout=15, client=None, return_exceptions=False):
+    """
+    Resolves many titles concurrently. Synchronous entry point for `fetch_many_async`.
+
+    Args:
+        titles (list): Titles of the movies to search for.
+        concurrency (int): Maximum number of lookups in flight.
+        timeout (float): Seconds after which a single lookup is given up.
+        client (OMDbClient, optional): The client to use. Defaults to the shared client.
+        return_exceptions (bool): Return the exception of a failed lookup in its place instead of None.
+
+    Returns:
+        list: Movie data dictionaries, None or exceptions, in the same order as `titles`.
+    """
+    return asyncio.run(fetch_many_async(titles, concurrency=concurrency, timeout=timeout, client=client,
+                                        return_exceptions=return_exceptions))
+
+
+def cache_stats():
+    """
+    Returns the hit and miss counters of the OMDb cache.
+
+    Returns:
+        dict: See `MovieCache.stats`.
+    """
+    return get_cache().stats()
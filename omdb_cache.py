@@ -0,0 +1,169 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from data.sqlite_tuning import sqlite_connection
+
+MISS = object()
+
+
+def normalize_title(title):
+    """
+    Normalizes a movie title so that trivially different spellings share one cache entry.
+
+    Args:
+        title (str): The title as entered by the user.
+
+    Returns:
+        str: The lower-cased title with surrounding and repeated whitespace removed.
+    """
+    return " ".join(title.split()).casefold()
+
+
+class MovieCache:
+    """
+    A TTL cache for OMDb lookups keyed by normalized title.
+
+    Found movies are kept for `ttl` seconds and "not found" answers for the shorter
+    `negative_ttl`. Entries live in an in-memory LRU of at most `max_size` items and,
+    if `db_path` is given, in an SQLite table that survives restarts and is shared
+    between worker processes.
+    """
+    def __init__(self, ttl=86400, negative_ttl=600, max_size=1024, db_path=None, clock=time.time):
+        """
+        Initializes the cache.
+
+        Args:
+            ttl (int): Seconds a found movie stays cached.
+            negative_ttl (int): Seconds a "not found" answer stays cached.
+            max_size (int): Maximum number of entries held in memory.
+            db_path (str, optional): Path of the SQLite file used as second tier.
+            clock (callable): Returns the current time in seconds, replaceable in tests.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.db_path = db_path
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.db_hits = 0
+
+        if self.db_path:
+            with sqlite_connection(self.db_path) as connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS omdb_cache ("
+                    "key TEXT PRIMARY KEY, payload TEXT, expires_at REAL NOT NULL)"
+                )
+
+    def get(self, title):
+        """
+        Looks up a title in the cache.
+
+        Args:
+            title (str): The movie title to look up.
+
+        Returns:
+            dict, None or MISS: The cached movie data, None for a cached "not found",
+            or MISS if there is no valid entry.
+        """
+        key = normalize_title(title)
+        now = self.clock()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit(value)
+                    return value
+                del self._entries[key]
+
+        if self.db_path:
+            with sqlite_connection(self.db_path) as connection:
+                row = connection.execute(
+                    "SELECT payload, expires_at FROM omdb_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row and row[1] > now:
+                value = json.loads(row[0]) if row[0] is not None else None
+                with self._lock:
+                    self._store(key, value, row[1])
+                    self.db_hits += 1
+                    self._record_hit(value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return MISS
+
+    def set(self, title, value):
+        """
+        Stores the result of an OMDb lookup.
+
+        Args:
+            title (str): The movie title that was looked up.
+            value (dict or None): The movie data, or None if OMDb did not find the movie.
+        """
+        key = normalize_title(title)
+        expires_at = self.clock() + (self.ttl if value is not None else self.negative_ttl)
+
+        with self._lock:
+            self._store(key, value, expires_at)
+
+        if self.db_path:
+            payload = json.dumps(value) if value is not None else None
+            with sqlite_connection(self.db_path) as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO omdb_cache (key, payload, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at)
+                )
+
+    def clear(self):
+        """
+        Removes all entries from both tiers and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.negative_hits = self.db_hits = 0
+
+        if self.db_path:
+            with sqlite_connection(self.db_path) as connection:
+                connection.execute("DELETE FROM omdb_cache")
+
+    def stats(self):
+        """
+        Returns the hit and miss counters of the cache.
+
+        Returns:
+            dict: Counters for hits, misses, negative hits, SQLite-tier hits and the in-memory size.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "db_hits": self.db_hits,
+                "size": len(self._entries)
+            }
+
+    def _store(self, key, value, expires_at):
+        """
+        Puts an entry into the in-memory LRU, evicting the least recently used one if full.
+        Must be called with the lock held.
+        """
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _record_hit(self, value):
+        """
+        Updates the hit counters. Must be called with the lock held.
+        """
+        self.hits += 1
+        if value is None:
+            self.negative_hits += 1
@@ -0,0 +1,230 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from data.sqlite_tuning import sqlite_connection
+
+POSTER_WIDTHS = (150, 300, 600)
+DEFAULT_MAX_BYTES = 200 * 2 ** 20
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+UPSTREAM_TYPES = {value: key for key, value in CONTENT_TYPES.items()}
+
+
+def snap_width(width):
+    """
+    Rounds a requested width up to the nearest stored thumbnail width, so arbitrary
+    widths do not create arbitrarily many thumbnails.
+
+    Args:
+        width (int or None): The requested width in pixels.
+
+    Returns:
+        int: One of POSTER_WIDTHS.
+    """
+    for candidate in POSTER_WIDTHS:
+        if width is not None and width <= candidate:
+            return candidate
+    return POSTER_WIDTHS[-1] if width is not None else POSTER_WIDTHS[1]
+
+
+def url_version(url):
+    """
+    Returns a short fingerprint of a poster URL, used in local poster URLs so that
+    they can be cached forever and still change when the movie gets another poster.
+
+    Args:
+        url (str): The remote poster URL.
+
+    Returns:
+        str: Eight hex characters.
+    """
+    return hashlib.sha1(url.encode()).hexdigest()[:8]
+
+
+def make_thumbnail(data, width):
+    """
+    Scales an image down to the given width and encodes it as progressive JPEG.
+    Pillow is imported on the first call rather than with the module, so starting the app
+    does not pay for it.
+
+    Args:
+        data (bytes): The original image.
+        width (int): The target width in pixels; smaller images are not enlarged.
+
+    Returns:
+        tuple: The thumbnail bytes and their extension ("jpg"). Without Pillow the
+        original bytes are returned with the extension None.
+    """
+    try:
+        from PIL import Image
+    except ImportError:  # Pillow is optional; without it posters are stored at their original size.
+        return data, None
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, "JPEG", quality=82, optimize=True, progressive=True)
+    return output.getvalue(), "jpg"
+
+
+class PosterStore:
+    """
+    A disk cache of poster thumbnails.
+
+    Posters are downloaded once per URL and width, scaled down, and stored under the SHA-256
+    of their bytes, so identical images are stored once. An SQLite index maps (URL, width)
+    to the stored file and records when it was last served; when the files exceed `max_bytes`,
+    the least recently served ones are removed.
+    """
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, timeout=10, session=None):
+        """
+        Initializes the store and creates its directory and index.
+
+        Args:
+            directory (str): Where thumbnails and the index are stored.
+            max_bytes (int): Maximum total size of the stored thumbnails.
+            timeout (float): Seconds to wait for a poster download.
+            session (requests.Session, optional): The HTTP session used for downloads.
+        """
+        self.directory = directory
+        self.index_path = os.path.join(directory, "index.sqlite")
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._session = session
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        with sqlite_connection(self.index_path) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS posters ("
+                "url TEXT NOT NULL, width INTEGER NOT NULL, digest TEXT NOT NULL, extension TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_access REAL NOT NULL, PRIMARY KEY (url, width))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_posters_last_access ON posters (last_access)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_posters_digest ON posters (digest)")
+
+    def path_of(self, digest, extension):
+        """
+        Returns the file path of a stored thumbnail.
+
+        Args:
+            digest (str): The SHA-256 of the thumbnail.
+            extension (str): The file extension.
+
+        Returns:
+            str: The path, inside a subdirectory named after the first two digest characters.
+        """
+        return os.path.join(self.directory, digest[:2], f"{digest}.{extension}")
+
+    def get(self, url, width):
+        """
+        Returns a stored thumbnail, downloading and resizing the poster on first use.
+
+        Args:
+            url (str): The remote poster URL.
+            width (int): The thumbnail width, one of POSTER_WIDTHS.
+
+        Returns:
+            tuple or None: The file path and content type, or None if the poster could not be fetched.
+        """
+        with sqlite_connection(self.index_path) as connection:
+            row = connection.execute("SELECT digest, extension FROM posters WHERE url = ? AND width = ?",
+                                     (url, width)).fetchone()
+            if row and os.path.exists(self.path_of(*row)):
+                connection.execute("UPDATE posters SET last_access = ? WHERE url = ? AND width = ?",
+                                   (time.time(), url, width))
+                return self.path_of(*row), CONTENT_TYPES[row[1]]
+
+        stored = self._fetch(url, width)
+        if stored is None:
+            return None
+        self.evict()
+        return stored
+
+    @property
+    def session(self):
+        """
+        The HTTP session used for downloads, created on first use so that `requests` is not imported at startup.
+        """
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def _fetch(self, url, width):
+        """
+        Downloads a poster, stores its thumbnail and records it in the index.
+
+        Returns:
+            tuple or None: The file path and content type, or None if the download failed.
+        """
+        from requests.exceptions import RequestException
+
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data, extension = make_thumbnail(response.content, width)
+        except (RequestException, OSError) as error:
+            logging.warning(f"Could not fetch poster {url}: {error}")
+            return None
+
+        if extension is None:
+            extension = UPSTREAM_TYPES.get(response.headers.get("Content-Type", "").split(";")[0], "jpg")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.path_of(digest, extension)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+
+        with sqlite_connection(self.index_path) as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO posters (url, width, digest, extension, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, width, digest, extension, len(data), time.time())
+            )
+        return path, CONTENT_TYPES[extension]
+
+    def evict(self):
+        """
+        Removes the least recently served thumbnails until the store fits into `max_bytes`.
+
+        Returns:
+            int: The number of removed files.
+        """
+        removed = 0
+        with self._lock, sqlite_connection(self.index_path) as connection:
+            total = connection.execute(
+                "SELECT coalesce(sum(size), 0) FROM (SELECT DISTINCT digest, size FROM posters)").fetchone()[0]
+            while total > self.max_bytes:
+                row = connection.execute(
+                    "SELECT digest, extension, size FROM posters ORDER BY last_access LIMIT 1").fetchone()
+                if row is None:
+                    break
+                digest, extension, size = row
+                connection.execute("DELETE FROM posters WHERE digest = ?", (digest,))
+                try:
+                    os.remove(self.path_of(digest, extension))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+        return removed
+
+    def stats(self):
+        """
+        Returns the number and total size of the stored thumbnails.
+
+        Returns:
+            dict: The number of files and their size in bytes.
+        """
+        with sqlite_connection(self.index_path) as connection:
+            files, size = connection.execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM (SELECT DISTINCT digest, size FROM posters)").fetchone()
+        return {"files": files, "bytes": size}
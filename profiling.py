@@ -0,0 +1,382 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from flask import Blueprint, Response, abort, current_app, g, has_request_context, jsonify, request, \
+    send_from_directory, url_for, before_render_template, template_rendered
+from sqlalchemy import event
+
+MODES = {"cprofile": ".pstats", "sample": ".collapsed"}
+DEFAULT_RETENTION = 50
+DEFAULT_SAMPLE_INTERVAL_MS = 5
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+
+profiles = Blueprint("profiles", __name__, url_prefix="/admin/profiles")
+
+# One profiled request at a time per process: profilers slow a request down severalfold,
+# and a sampler only looks at the thread of its own request.
+_profile_lock = threading.Lock()
+
+
+def _authorized(token):
+    """
+    Checks a token against `PROFILE_TOKEN` in constant time.
+
+    Args:
+        token (str): The token sent with the request.
+
+    Returns:
+        bool: True if profiling is enabled and the token matches.
+    """
+    expected = current_app.config.get("PROFILE_TOKEN")
+    return bool(expected and token) and hmac.compare_digest(token.encode(), expected.encode())
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval, counting identical stacks.
+
+    Unlike cProfile it does not slow the profiled code down, and its counts can be turned into a
+    flamegraph by `flamegraph.pl` or speedscope.
+    """
+    def __init__(self, thread_id, interval):
+        """
+        Initializes the sampler; it starts sampling with `start`.
+
+        Args:
+            thread_id (int): The ident of the thread to sample.
+            interval (float): Seconds between two samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """
+        Returns the samples in the collapsed-stack format, one `frame;frame;frame count` line per stack.
+
+        Returns:
+            str: The collapsed stacks, most frequent first.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _record_query_start(conn, cursor, statement, parameters, context, executemany):
+    # Kept on the execution context, so a statement that fails leaves nothing behind.
+    if context is not None and has_request_context() and "_profile_queries" in g:
+        context._profile_query_start = time.perf_counter()
+
+
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profile_query_start", None)
+    if start is None or not (has_request_context() and "_profile_queries" in g):
+        return
+    elapsed = time.perf_counter() - start
+    entry = g._profile_queries.setdefault(" ".join(statement.split()), [0, 0.0])
+    entry[0] += 1
+    entry[1] += elapsed
+
+
+def _record_template_start(sender, template, context, **extra):
+    if "_profile_templates" in g:
+        g._profile_template_starts.append(time.perf_counter())
+
+
+def _record_template(sender, template, context, **extra):
+    if "_profile_templates" in g and g._profile_template_starts:
+        elapsed = time.perf_counter() - g._profile_template_starts.pop()
+        g._profile_templates.append({"name": template.name, "ms": round(elapsed * 1000, 2)})
+
+
+def record_profile_error(error):
+    """
+    Notes the exception of a failed request in its profile, for the 500 error handler.
+
+    Args:
+        error (Exception): The error passed to the error handler.
+    """
+    if has_request_context() and "_profile" in g:
+        original = getattr(error, "original_exception", None) or error
+        g._profile_error = f"{type(original).__name__}: {original}"
+
+
+def prune_profiles(directory, retention):
+    """
+    Deletes the oldest profiles beyond the retention cap.
+
+    Args:
+        directory (str): The profile folder.
+        retention (int): The number of profiles to keep.
+
+    Returns:
+        int: The number of profiles deleted.
+    """
+    names = [name for name in os.listdir(directory) if name.endswith(".json")]
+    ids = [name[:-5] for name in sorted(names, key=lambda name: (os.stat(os.path.join(directory, name)).st_mtime_ns,
+                                                                  name))]
+    expired = ids[:max(len(ids) - retention, 0)]
+    for profile_id in expired:
+        for suffix in (".json", *MODES.values()):
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+    return len(expired)
+
+
+def _start_profile():
+    """
+    Starts profiling the current request if it asks for it with a valid token in the `X-Profile` header.
+    The token is never read from the query string, where it would end up in access logs and browser history.
+    """
+    # The profile routes take the same header and are never profiled themselves.
+    if request.blueprint == profiles.name or not _authorized(request.headers.get("X-Profile")):
+        return
+    if not _profile_lock.acquire(blocking=False):
+        g._profile_busy = True
+        return
+    mode = request.headers.get("X-Profile-Mode", "cprofile")
+    if mode not in MODES:
+        mode = "cprofile"
+    if mode == "sample":
+        profiler = StackSampler(threading.get_ident(), current_app.config["PROFILE_SAMPLE_INTERVAL_MS"] / 1000)
+        profiler.start()
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    g._profile = {"mode": mode, "profiler": profiler, "start": time.perf_counter(),
+                  "started_at": datetime.now(timezone.utc)}
+    g._profile_queries = {}
+    g._profile_templates = []
+    g._profile_template_starts = []
+
+
+def _stop_profile(status):
+    """
+    Stops the profiler of the current request, writes its data and metadata and applies the retention cap.
+
+    Args:
+        status (int or None): The response status, None if the request ended with an exception.
+
+    Returns:
+        str or None: The profile ID, or None if the request was not profiled.
+    """
+    profile = g.pop("_profile", None)
+    if profile is None:
+        return None
+    try:
+        profiler = profile["profiler"]
+        if profile["mode"] == "sample":
+            profiler.stop()
+        else:
+            profiler.disable()
+        elapsed = time.perf_counter() - profile["start"]
+
+        directory = current_app.config["PROFILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        profile_id = f"{profile['started_at']:%Y%m%dT%H%M%S}-{secrets.token_hex(4)}"
+        path = os.path.join(directory, profile_id + MODES[profile["mode"]])
+        if profile["mode"] == "sample":
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(profiler.collapsed())
+        else:
+            profiler.dump_stats(path)
+
+        queries = g.pop("_profile_queries", {})
+        statements = sorted(queries.items(), key=lambda item: item[1][1], reverse=True)
+        metadata = {
+            "id": profile_id,
+            "mode": profile["mode"],
+            "started_at": profile["started_at"].isoformat(),
+            "method": request.method,
+            "path": request.full_path.rstrip("?"),
+            "endpoint": request.endpoint,
+            "status": status,
+            "duration_ms": round(elapsed * 1000, 2),
+            "error": g.pop("_profile_error", None),
+            "sql": {
+                "count": sum(count for count, _ in queries.values()),
+                "ms": round(sum(seconds for _, seconds in queries.values()) * 1000, 2),
+                "statements": [{"statement": statement[:500], "count": count, "ms": round(seconds * 1000, 2)}
+                               for statement, (count, seconds) in statements[:20]],
+            },
+            "templates": g.pop("_profile_templates", []),
+        }
+        with open(os.path.join(directory, profile_id + ".json"), "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=2)
+        prune_profiles(directory, current_app.config["PROFILE_RETENTION"])
+        current_app.logger.info(f"Profiled {request.method} {request.path} as {profile_id}")
+        return profile_id
+    finally:
+        g.pop("_profile_queries", None)
+        g.pop("_profile_templates", None)
+        g.pop("_profile_template_starts", None)
+        _profile_lock.release()
+
+
+def init_profiling(app, engines=()):
+    """
+    Lets admins profile single requests: a request sent with the header `X-Profile: <PROFILE_TOKEN>`
+    runs under cProfile, or under a stack sampler with the additional header `X-Profile-Mode: sample`.
+
+    The profile covers the view, its SQL and the Jinja rendering. It is stored in `PROFILE_DIR` as a
+    `.pstats` file for `python -m pstats` and snakeviz, or a `.collapsed` file for flamegraph tools,
+    next to a JSON file with the request, its status, its SQL statements and template timings. The
+    response names the profile in `X-Profile-Id` and links its download in `X-Profile-Url`. Only the
+    newest `PROFILE_RETENTION` profiles are kept. Profiles are listed and downloaded under
+    `/admin/profiles` with the same `X-Profile` header.
+
+    Nothing is registered unless `PROFILE_TOKEN` is set in the app config.
+
+    Args:
+        app (Flask): The application.
+        engines (Iterable): The engines whose statements are recorded in profiles.
+    """
+    if not app.config.get("PROFILE_TOKEN"):
+        return
+    app.config.setdefault("PROFILE_DIR", os.path.join(app.root_path, "data", "profiles"))
+    app.config.setdefault("PROFILE_RETENTION", DEFAULT_RETENTION)
+    app.config.setdefault("PROFILE_SAMPLE_INTERVAL_MS", DEFAULT_SAMPLE_INTERVAL_MS)
+
+    for engine in engines:
+        if not event.contains(engine, "after_cursor_execute", _record_query):
+            event.listen(engine, "before_cursor_execute", _record_query_start)
+            event.listen(engine, "after_cursor_execute", _record_query)
+    before_render_template.connect(_record_template_start, app)
+    template_rendered.connect(_record_template, app)
+
+    def finish_profile(response):
+        if g.pop("_profile_busy", False):
+            response.headers["X-Profile"] = "busy"
+        profile_id = _stop_profile(response.status_code)
+        if profile_id:
+            response.headers["X-Profile-Id"] = profile_id
+            response.headers["X-Profile-Url"] = url_for("profiles.download_profile", profile_id=profile_id)
+        return response
+
+    def abandon_profile(exception):
+        # Requests whose exception propagates never reach the after-request steps.
+        if exception is not None:
+            g._profile_error = f"{type(exception).__name__}: {exception}"
+        _stop_profile(None)
+
+    # Starts before and stops after every other request step, so their time is included.
+    app.before_request_funcs.setdefault(None, []).insert(0, _start_profile)
+    app.after_request_funcs.setdefault(None, []).insert(0, finish_profile)
+    app.teardown_request(abandon_profile)
+    app.register_blueprint(profiles)
+
+
+@profiles.before_request
+def require_token():
+    """
+    Restricts the profile routes to requests with the profiling token.
+    """
+    if not _authorized(request.headers.get("X-Profile")):
+        abort(403)
+
+
+def _profile_path(profile_id, suffix):
+    if not PROFILE_ID.match(profile_id):
+        abort(404)
+    path = os.path.join(current_app.config["PROFILE_DIR"], profile_id + suffix)
+    if not os.path.exists(path):
+        abort(404)
+    return path
+
+
+def _load_metadata(profile_id):
+    with open(_profile_path(profile_id, ".json"), encoding="utf-8") as file:
+        return json.load(file)
+
+
+@profiles.route("")
+def list_profiles():
+    """
+    Lists the stored profiles, newest first.
+
+    Returns:
+        Response: The profile metadata as JSON.
+    """
+    directory = current_app.config["PROFILE_DIR"]
+    names = sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True) \
+        if os.path.isdir(directory) else []
+    return jsonify([_load_metadata(name[:-5]) for name in names])
+
+
+@profiles.route("/<profile_id>")
+def show_profile(profile_id):
+    """
+    Returns the metadata of a profile: the request, its SQL statements and template timings.
+    """
+    return jsonify(_load_metadata(profile_id))
+
+
+@profiles.route("/<profile_id>/download")
+def download_profile(profile_id):
+    """
+    Downloads the profile data, a `.pstats` or `.collapsed` file depending on its mode.
+    """
+    suffix = MODES[_load_metadata(profile_id)["mode"]]
+    _profile_path(profile_id, suffix)
+    return send_from_directory(current_app.config["PROFILE_DIR"], profile_id + suffix, as_attachment=True,
+                               mimetype="application/octet-stream")
+
+
+@profiles.route("/<profile_id>/summary")
+def profile_summary(profile_id):
+    """
+    Summarizes a profile as text: the functions with the highest cumulative time for cProfile
+    profiles, the frames most often on top of the stack for sampled ones.
+
+    Query parameters:
+        limit (int): Number of functions shown, 40 by default.
+    """
+    metadata = _load_metadata(profile_id)
+    limit = min(max(request.args.get("limit", 40, type=int), 1), 500)
+    path = _profile_path(profile_id, MODES[metadata["mode"]])
+    output = io.StringIO()
+    output.write(f"{metadata['method']} {metadata['path']} -> {metadata['status']} "
+                 f"in {metadata['duration_ms']} ms, {metadata['sql']['count']} SQL statements "
+                 f"in {metadata['sql']['ms']} ms\n\n")
+    if metadata["mode"] == "sample":
+        leaves = Counter()
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                leaves[stack.rsplit(";", 1)[-1]] += int(count)
+        total = sum(leaves.values()) or 1
+        for frame, count in leaves.most_common(limit):
+            output.write(f"{count:8d} {count / total:7.1%}  {frame}\n")
+    else:
+        pstats.Stats(path, stream=output).sort_stats("cumulative").print_stats(limit)
+    return Response(output.getvalue(), content_type="text/plain; charset=utf-8")
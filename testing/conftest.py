@@ -0,0 +1,45 @@
+import pytest
+from flask import Flask
+from data.database import db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    Fixture that names a temporary SQLite file for the test's database.
+
+    Returns:
+        str: The path of the database file.
+    """
+    return str(tmp_path / "test.sqlite")
+
+
+@pytest.fixture
+def app(db_path):
+    """
+    Fixture that creates a bare Flask app with a temporary database containing all tables.
+    Test modules that need more, e.g. blueprints or seed data, build on it.
+
+    Yields:
+        Flask: The app with an active application context.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def session(app):
+    """
+    Fixture that provides the database session of the app.
+
+    Returns:
+        scoped_session: `db.session`, bound to the temporary database.
+    """
+    return db.session
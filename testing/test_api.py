@@ -0,0 +1,127 @@
+import json
+import pytest
+from unittest.mock import patch
+from api import api
+from data_manager import SQLiteDataManager
+
+
+@pytest.fixture
+def client(app, db_path):
+    """
+    Fixture that adds the API blueprint and a data manager on the same database to the shared app.
+
+    Yields:
+        FlaskClient: The test client.
+    """
+    app.register_blueprint(api)
+    manager = SQLiteDataManager(db_path, {})
+    app.extensions['data_manager'] = manager
+    yield app.test_client()
+    manager.engine.dispose()
+
+
+def create_user_with_movies(client, names):
+    """
+    Creates a user through the API and adds movies entered by hand.
+
+    Returns:
+        int: The ID of the user.
+    """
+    user_id = client.post('/api/v1/users', json={"name": "John Doe"}).get_json()["id"]
+    for index, name in enumerate(names):
+        response = client.post(f'/api/v1/users/{user_id}/movies',
+                               json={"name": name, "director": "Unknown", "year": 1990 + index, "rating": 7})
+        assert response.status_code == 201
+    return user_id
+
+
+def test_create_and_list_users(client):
+    """
+    Tests creating users and listing them with field selection and cursor pagination.
+    """
+    response = client.post('/api/v1/users', json={"name": "John Doe"})
+    assert response.status_code == 201
+    assert response.get_json()["name"] == "John Doe"
+    assert response.headers["Location"] == "/api/v1/users/1"
+    assert client.get(response.headers["Location"]).get_json() == {
+        "id": 1, "name": "John Doe", "movie_count": 0, "avg_rating": None, "latest_added": None}
+    assert client.get('/api/v1/users/999').status_code == 404
+    client.post('/api/v1/users', json={"name": "Jane Doe"})
+
+    page = client.get('/api/v1/users?limit=1&fields=id,name').get_json()
+    assert page["items"] == [{"id": 1, "name": "John Doe"}]
+
+    page = client.get(f'/api/v1/users?limit=1&fields=name&cursor={page["next_cursor"]}').get_json()
+    assert page == {"items": [{"name": "Jane Doe"}], "next_cursor": None}
+    assert client.get('/api/v1/users?cursor=bogus').status_code == 400
+
+    assert client.post('/api/v1/users', json={}).status_code == 400
+    assert client.get('/api/v1/users?fields=password').status_code == 400
+
+
+def test_list_movies_streams_pages(client):
+    """
+    Tests the movie list as chunked JSON and as NDJSON, sorted and paginated with a cursor.
+    """
+    user_id = create_user_with_movies(client, ["Alpha", "Beta", "Gamma"])
+
+    response = client.get(f'/api/v1/users/{user_id}/movies?sort=year&dir=desc&limit=2&fields=name,year')
+    assert response.is_streamed
+    page = response.get_json()
+    assert page["items"] == [{"name": "Gamma", "year": 1992}, {"name": "Beta", "year": 1991}]
+
+    response = client.get(f'/api/v1/users/{user_id}/movies?sort=year&dir=desc&limit=2&fields=name'
+                          f'&cursor={page["next_cursor"]}', headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in response.data.decode().splitlines()] == [{"name": "Alpha"}]
+
+    lines = client.get(f'/api/v1/users/{user_id}/movies?format=ndjson&limit=1&fields=id').data.decode().splitlines()
+    assert "next_cursor" in json.loads(lines[-1])
+
+    page = client.get(f'/api/v1/users/{user_id}/movies?limit=all&fields=name').get_json()
+    assert page == {"items": [{"name": "Alpha"}, {"name": "Beta"}, {"name": "Gamma"}], "next_cursor": None}
+    assert client.get(f'/api/v1/users/{user_id}/movies?limit=many').status_code == 400
+
+    assert client.get('/api/v1/users/999/movies').status_code == 404
+    assert client.get(f'/api/v1/users/{user_id}/movies?sort=director').status_code == 400
+    assert client.get(f'/api/v1/users/{user_id}/movies?cursor=bogus').status_code == 400
+
+
+def test_add_movie_by_title(client):
+    """
+    Tests adding a movie by title, which is looked up in the catalog and OMDb.
+    """
+    user_id = create_user_with_movies(client, [])
+    movie_data = {"imdb_id": "tt0113277", "title": "Heat", "director": "Michael Mann",
+                  "year": 1995, "rating": 8.3, "poster": "https://example.com/heat.jpg"}
+
+    with patch("catalog.fetch_movie_data", return_value=movie_data):
+        response = client.post(f'/api/v1/users/{user_id}/movies', json={"title": "heat"})
+    assert response.status_code == 201
+    assert response.get_json()["director"] == "Michael Mann"
+    assert client.get(f'/api/v1/users/{user_id}').get_json()["movie_count"] == 1
+
+    with patch("api.lookup_movie", return_value=None):
+        assert client.post(f'/api/v1/users/{user_id}/movies', json={"title": "nope"}).status_code == 404
+    assert client.post('/api/v1/users/999/movies', json={"title": "heat"}).status_code == 404
+
+
+def test_patch_and_delete_movie(client):
+    """
+    Tests partial updates and deletion, including ownership checks and validation.
+    """
+    user_id = create_user_with_movies(client, ["Alpha"])
+    other_id = client.post('/api/v1/users', json={"name": "Jane Doe"}).get_json()["id"]
+    movie_id = client.get(f'/api/v1/users/{user_id}/movies').get_json()["items"][0]["id"]
+
+    response = client.patch(f'/api/v1/users/{user_id}/movies/{movie_id}', json={"rating": 9.5})
+    assert response.get_json()["rating"] == 9.5
+    assert response.get_json()["name"] == "Alpha"
+
+    assert client.patch(f'/api/v1/users/{user_id}/movies/{movie_id}', json={"year": "soon"}).status_code == 400
+    assert client.patch(f'/api/v1/users/{user_id}/movies/{movie_id}', json={"id": 5}).status_code == 400
+    assert client.delete(f'/api/v1/users/{other_id}/movies/{movie_id}').status_code == 404
+
+    assert client.delete(f'/api/v1/users/{user_id}/movies/{movie_id}').status_code == 204
+    assert client.get(f'/api/v1/users/{user_id}/movies').get_json()["items"] == []
+    assert client.delete(f'/api/v1/users/{user_id}/movies/{movie_id}').status_code == 404
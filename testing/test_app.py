@@ -0,0 +1,628 @@
+import gzip
+import io
+import os
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask
+from flask.testing import FlaskClient
+from data.database import db, User, Movie
+from app import create_app
+from posters import PosterStore
+
+
+@pytest.fixture
+def app(tmp_path) -> Flask:
+    """
+    Creates the application on a test database in a temporary directory.
+
+    The tables are created before each test, as `flask db upgrade` would, and dropped afterwards.
+
+    Args:
+        tmp_path (Path): A temporary directory for the database and the poster store.
+
+    Returns:
+        Flask: The application, with an active app context.
+    """
+    app = create_app({
+        'SECRET_KEY': 'testsecretkey',
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'POSTER_DIR': str(tmp_path / 'posters'),
+        'PROFILE_TOKEN': None,
+        'METRICS_ENABLED': True,
+        'ASSET_MANIFEST': {'tailwind.css': 'dist/tailwind.test.css'},
+    })
+
+    with app.app_context():
+        db.create_all()
+
+        yield app
+
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app) -> FlaskClient:
+    """
+    Creates a Flask test client for testing the application routes.
+
+    Args:
+        app (Flask): The application from the `app` fixture.
+
+    Returns:
+        FlaskClient: The Flask test client used to simulate requests to the app.
+    """
+    return app.test_client()
+
+
+def test_home(client):
+    """Test the home route."""
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Welcome to MovieWeb' in response.data
+
+
+def test_list_users(client):
+    """
+    Tests the route that lists all users.
+
+    This test creates a user in the test database, sends a GET request to the
+    '/users' route, and checks if the user's name appears in the response.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.get('/users')
+    assert response.status_code == 200
+    assert b"John Doe" in response.data
+    assert b"0 movies" in response.data
+
+
+def test_add_user(client):
+    """
+    Tests the route for adding a new user.
+
+    This test sends a POST request with a user's name, checks if the response
+    redirects to the user list page, and ensures that the new user has been added to the database.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    response = client.post('/add_user', data={'name': 'Jane Doe'})
+    assert response.status_code == 302  # Check for redirect
+    assert User.query.filter_by(name='Jane Doe').first() is not None
+
+
+def test_add_movie(client):
+    """
+    Tests the route for adding a new movie to a user's collection.
+
+    This test creates a user, sends a POST request to add a movie to that user's collection
+    with the OMDb lookup stubbed out, and ensures that the movie appears in the database.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    found = {"imdb_id": "tt0092099", "title": "Top Gun", "director": "Tony Scott", "year": 1986, "rating": 6.9,
+             "poster": "url"}
+    with patch("catalog.fetch_movie_data", return_value=found):
+        response = client.post(f'/add_movie/{user.id}', data={'title': 'Top Gun'})
+    assert response.status_code == 302
+    assert Movie.query.filter_by(name='Top Gun').first() is not None
+
+
+def test_update_movie(client):
+    """
+    Tests the route for updating an existing movie's information.
+
+    This test creates a user, adds a movie, then sends a POST request to update that movie's details,
+    and ensures the changes are reflected in the database.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    movie = Movie(name="Top Gun", director="Tony Scott", year=1986, rating=6.9, user_id=user.id)
+    db.session.add(movie)
+    db.session.commit()
+
+    response = client.post(f'/users/{user.id}/update_movie/{movie.id}', data={
+        'name': 'Top Gun: Maverick',
+        'director': 'Joseph Kosinski',
+        'year': '2022',
+        'rating': '7.8'
+    })
+    assert response.status_code == 302
+    updated_movie = Movie.query.get(movie.id)
+    assert updated_movie.name == 'Top Gun: Maverick'
+    assert updated_movie.director == 'Joseph Kosinski'
+    assert updated_movie.year == 2022
+    assert updated_movie.rating == 7.8
+
+
+def test_delete_movie(client):
+    """
+    Tests the route for deleting a movie from a user's collection.
+
+    This test creates a user, adds a movie, sends a POST request to delete that movie,
+    and ensures the movie is removed from the database.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    movie = Movie(name="Top Gun", director="Tony Scott", year=1986, rating=6.9, user_id=user.id)
+    db.session.add(movie)
+    db.session.commit()
+
+    response = client.post(f'/users/{user.id}/delete_movie/{movie.id}')
+    assert response.status_code == 302
+    deleted_movie = Movie.query.get(movie.id)
+    assert deleted_movie is None
+
+
+def test_404_error(client):
+    """
+    Tests the 404 error handler.
+
+    This test sends a GET request to a non-existent route and checks if the response
+    status code is 404 and if the 404 error page is displayed.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    response = client.get('/nonexistent-page')
+    assert response.status_code == 404
+    assert b"<title>Page Not Found</title>" in response.data
+    assert b"Sorry, the page you're looking for doesn't exist." in response.data
+
+
+def test_import_movies(app, client):
+    """
+    Tests the route for importing a list of movies from an uploaded file.
+
+    This test creates a user and uploads a text file with two titles of which one is not found.
+    It ensures that the import is queued as a job whose progress the page shows, and that once the
+    job has run the found movie is stored and the failed row is reported.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    job_runner = app.extensions['job_runner']
+    with patch.object(job_runner, "submit") as mock_submit:
+        response = client.post(f'/users/{user.id}/import_movies', data={
+            'file': (io.BytesIO(b"Top Gun\nNo Such Movie\n"), 'movies.txt')
+        }, content_type='multipart/form-data')
+    job_id = mock_submit.call_args[0][0]
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith(f'/users/{user.id}/import_movies?job={job_id}')
+
+    page = client.get(f'/users/{user.id}/import_movies?job={job_id}')
+    assert f'data-job-url="/jobs/{job_id}"'.encode() in page.data
+    assert client.get(f'/jobs/{job_id}').get_json()['progress'] == 0
+
+    found = {"title": "Top Gun", "year": 1986, "rating": 6.9, "poster": "url"}
+    with patch("catalog.fetch_many", return_value=[found, None]):
+        job_runner.run(job_id)
+
+    db.session.expire_all()
+    status = client.get(f'/jobs/{job_id}').get_json()
+    assert (status['status'], status['progress'], status['total']) == ('done', 2, 2)
+    page = client.get(f'/users/{user.id}/import_movies?job={job_id}')
+    assert b"Imported 1 of 2 movies." in page.data
+    assert b"No Such Movie" in page.data
+    assert b"data-job-url" not in page.data
+    assert Movie.query.filter_by(name='Top Gun', user_id=user.id).first() is not None
+
+    other = User(name="Jane Doe")
+    db.session.add(other)
+    db.session.commit()
+    assert client.get(f'/users/{other.id}/import_movies?job={job_id}').status_code == 404
+
+
+def test_import_movies_command(app, client):
+    """
+    Tests the `flask import-movies` CLI command.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client, used here for its database setup.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    found = {"title": "Top Gun", "year": 1986, "rating": 6.9, "poster": "url"}
+    with patch("catalog.fetch_many", return_value=[found]):
+        result = app.test_cli_runner().invoke(args=["import-movies", str(user.id), "-"], input="title\nTop Gun\n")
+
+    assert result.exit_code == 0
+    assert "Imported 1 of 1 movies" in result.output
+    assert Movie.query.filter_by(name='Top Gun', user_id=user.id).first() is not None
+
+
+def test_add_movie_async(app, client):
+    """
+    Tests adding a movie with ASYNC_ADD_MOVIE enabled.
+
+    This test posts a title, checks that the request returns right away with a placeholder movie,
+    runs the queued job and ensures the placeholder is filled in and the job reports "done".
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    found = {"title": "Top Gun", "year": 1986, "rating": 6.9, "poster": "url"}
+    job_runner = app.extensions['job_runner']
+    app.config['ASYNC_ADD_MOVIE'] = True
+    try:
+        with patch.object(job_runner, "submit") as mock_submit:
+            response = client.post(f'/add_movie/{user.id}', data={'title': 'top gun'})
+        assert response.status_code == 302
+        placeholder = Movie.query.filter_by(name='top gun', user_id=user.id).first()
+        assert placeholder is not None
+
+        job_id = mock_submit.call_args[0][0]
+        assert client.get(f'/jobs/{job_id}').get_json()['status'] == 'pending'
+        page = client.get(f'/users/{user.id}', environ_overrides={'SCRIPT_NAME': '/movies'})
+        assert f'data-job-url="/movies/jobs/{job_id}"'.encode() in page.data
+
+        with patch("catalog.fetch_movie_data", return_value=found):
+            job_runner.run(job_id)
+    finally:
+        app.config['ASYNC_ADD_MOVIE'] = False
+
+    db.session.expire_all()
+    assert client.get(f'/jobs/{job_id}').get_json()['status'] == 'done'
+    assert db.session.get(Movie, placeholder.id).name == 'Top Gun'
+
+
+def test_add_movie_async_failure_removes_placeholder(app, client):
+    """
+    Tests that a background lookup failing with an unexpected error removes the placeholder
+    movie and marks the job as failed.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+
+    job_runner = app.extensions['job_runner']
+    app.config['ASYNC_ADD_MOVIE'] = True
+    try:
+        with patch.object(job_runner, "submit") as mock_submit:
+            client.post(f'/add_movie/{user.id}', data={'title': 'top gun'})
+        job_id = mock_submit.call_args[0][0]
+
+        with patch("catalog.fetch_movie_data", side_effect=RuntimeError("OMDb is down")):
+            job_runner.run(job_id)
+    finally:
+        app.config['ASYNC_ADD_MOVIE'] = False
+
+    db.session.expire_all()
+    status = client.get(f'/jobs/{job_id}').get_json()
+    assert status['status'] == 'failed'
+    assert status['error'] == 'OMDb is down'
+    assert Movie.query.filter_by(user_id=user.id).count() == 0
+    assert db.session.get(User, user.id).movie_count == 0
+
+
+def test_user_movies_pagination(client):
+    """
+    Tests the paginated and sorted user movie page.
+
+    This test creates a user with three movies, requests a page of two sorted by year in
+    descending order and follows the "Next page" cursor to the remaining movie.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all([Movie(name=name, director="Unknown", year=year, rating=7.0, user_id=user.id)
+                        for name, year in [("Alpha", 1990), ("Beta", 2010), ("Gamma", 2000)]])
+    db.session.commit()
+
+    response = client.get(f'/users/{user.id}?sort=year&dir=desc&size=2')
+    assert response.status_code == 200
+    assert response.data.index(b"Beta") < response.data.index(b"Gamma")
+    assert b"Alpha" not in response.data
+
+    cursor = response.data.split(b"cursor=")[1].split(b'"')[0].decode()
+    response = client.get(f'/users/{user.id}?sort=year&dir=desc&size=2&cursor={cursor}')
+    assert b"Alpha" in response.data
+    assert b"Beta" not in response.data
+
+    assert client.get(f'/users/{user.id}?cursor=bogus').status_code == 400
+
+
+def test_search_movies(client):
+    """
+    Tests the movie search route.
+
+    This test creates a user with three movies and searches for a title prefix and a director,
+    then checks that an empty query leads back to the movie page.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all([Movie(name=name, director=director, user_id=user.id)
+                        for name, director in [("Star Wars", "George Lucas"), ("Stardust", "Matthew Vaughn"),
+                                               ("Heat", "Michael Mann")]])
+    db.session.commit()
+
+    response = client.get(f'/users/{user.id}/search?q=star')
+    assert response.status_code == 200
+    assert b"Star Wars" in response.data and b"Stardust" in response.data
+    assert b"Heat" not in response.data
+
+    response = client.get(f'/users/{user.id}/search?q=mann')
+    assert b"Heat" in response.data and b"Stardust" not in response.data
+
+    assert b'No movies match' in client.get(f'/users/{user.id}/search?q=zzz').data
+    assert client.get(f'/users/{user.id}/search?q=').status_code == 302
+
+
+def test_conditional_get(client):
+    """
+    Tests that unchanged user pages are answered with 304 and changed ones are rendered again.
+
+    This test revalidates the users list and a user's movie page with the ETag of the
+    previous response, then changes a movie and checks that both pages are fresh again. The
+    page that shows the flashed message is not cacheable, and the message is shown only once.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    movie = Movie(name="Heat", director="Michael Mann", year=1995, rating=8.3, user_id=user.id)
+    db.session.add(movie)
+    db.session.commit()
+
+    users_page = client.get('/users')
+    movies_page = client.get(f'/users/{user.id}')
+    assert users_page.headers["ETag"] and movies_page.headers["Last-Modified"]
+
+    response = client.get('/users', headers={"If-None-Match": users_page.headers["ETag"]})
+    assert response.status_code == 304 and response.data == b""
+    response = client.get(f'/users/{user.id}', headers={"If-None-Match": movies_page.headers["ETag"]})
+    assert response.status_code == 304
+    response = client.get(f'/users/{user.id}?sort=year', headers={"If-None-Match": movies_page.headers["ETag"]})
+    assert response.status_code == 200
+
+    client.post(f'/users/{user.id}/update_movie/{movie.id}',
+                data={"name": "Heat", "director": "Michael Mann", "year": "1995", "rating": "9.0"})
+
+    response = client.get('/users', headers={"If-None-Match": users_page.headers["ETag"]})
+    assert response.status_code == 200 and b"Movie updated successfully." in response.data
+    assert "ETag" not in response.headers and response.cache_control.no_store
+    response = client.get('/users', headers={"If-None-Match": users_page.headers["ETag"]})
+    assert response.status_code == 200 and b"Movie updated successfully." not in response.data
+    response = client.get('/users', headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
+    response = client.get(f'/users/{user.id}', headers={"If-None-Match": movies_page.headers["ETag"]})
+    assert response.status_code == 200 and b"9.0" in response.data
+
+    assert client.get('/users/999').status_code == 404
+
+
+def test_movie_grid_fragment_cache(app, client):
+    """
+    Tests that the movie grid is served from the fragment cache until a movie changes.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    fragment_cache = app.extensions['fragment_cache']
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    movie = Movie(name="Heat", director="Michael Mann", year=1995, rating=8.3, user_id=user.id)
+    db.session.add(movie)
+    db.session.commit()
+
+    first = client.get(f'/users/{user.id}')
+    second = client.get(f'/users/{user.id}')
+    assert first.data == second.data
+    assert fragment_cache.stats()["hits"] == 1
+
+    client.post(f'/users/{user.id}/delete_movie/{movie.id}')
+    assert fragment_cache.stats()["size"] == 0
+    assert b"Heat" not in client.get(f'/users/{user.id}').data
+
+
+def test_export_routes_and_command(app, client):
+    """
+    Tests the streamed export downloads and the export CLI command.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(Movie(name="Heat", director="Michael Mann", year=1995, rating=8.3, user_id=user.id))
+    db.session.commit()
+
+    response = client.get(f'/users/{user.id}/export.csv')
+    assert response.is_streamed
+    assert response.headers["Content-Disposition"] == f'attachment; filename="movies-user-{user.id}.csv"'
+    assert b"Heat" in response.data
+
+    assert b'"name": "Heat"' in client.get('/export.ndjson').data
+    assert client.get('/export.xlsx').status_code == 404
+
+    result = app.test_cli_runner().invoke(args=["export", "--user-id", str(user.id), "--format", "ndjson"])
+    assert result.exit_code == 0
+    assert '"Heat"' in result.output
+
+
+def test_poster_route(app, client, tmp_path):
+    """
+    Tests that posters are served as local thumbnails with long-lived cache headers.
+
+    This test stubs the poster download, renders a user's page to get the local poster URL,
+    then fetches it, and checks that an outdated version is redirected and missing posters are 404.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+        tmp_path (Path): A temporary directory for the poster store.
+    """
+    image_module = pytest.importorskip("PIL.Image")
+    output = io.BytesIO()
+    image_module.new("RGB", (900, 1350), "red").save(output, "JPEG")
+    session = MagicMock()
+    session.get.return_value = MagicMock(content=output.getvalue(), headers={"Content-Type": "image/jpeg"})
+
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    movie = Movie(name="Heat", director="Michael Mann", user_id=user.id, poster="https://example.com/heat.jpg")
+    no_poster = Movie(name="Alien", director="Ridley Scott", user_id=user.id, poster="N/A")
+    db.session.add_all([movie, no_poster])
+    db.session.commit()
+
+    with patch.dict(app.extensions, {"poster_store": PosterStore(str(tmp_path), session=session)}):
+        page = client.get(f'/users/{user.id}').data.decode()
+        poster_url = page.split('<img src="')[1].split('"')[0].replace("&amp;", "&")
+        assert poster_url.startswith(f"/posters/{movie.id}/")
+
+        response = client.get(poster_url)
+        assert response.status_code == 200
+        assert response.mimetype == "image/jpeg"
+        assert "immutable" in response.headers["Cache-Control"]
+        assert image_module.open(io.BytesIO(response.data)).size == (300, 450)
+        client.get(poster_url)
+        assert session.get.call_count == 1
+
+        assert client.get(f'/posters/{movie.id}/outdated?w=300').status_code == 302
+        assert client.get(f'/posters/{no_poster.id}/whatever').status_code == 404
+
+
+def test_asset_urls(app, client):
+    """
+    Tests that pages link the fingerprinted stylesheet, fail instead of falling back to a CDN
+    while it is not built, and that fingerprinted files are served with immutable cache headers.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    with patch.dict(app.config, {'ASSET_MANIFEST': {}}):
+        with pytest.raises(RuntimeError, match="flask build-assets"):
+            client.get('/users')
+
+    dist = os.path.join(app.static_folder, "dist")
+    created = not os.path.isdir(dist)
+    os.makedirs(dist, exist_ok=True)
+    path = os.path.join(dist, "tailwind.0123456789ab.css")
+    with open(path, "w") as file:
+        file.write(".text-white{color:#fff}")
+    try:
+        with patch.dict(app.config, {'ASSET_MANIFEST': {'tailwind.css': 'dist/tailwind.0123456789ab.css'}}):
+            assert b'href="/static/dist/tailwind.0123456789ab.css"' in client.get('/users').data
+
+        response = client.get('/static/dist/tailwind.0123456789ab.css')
+        assert response.status_code == 200
+        assert "immutable" in response.headers["Cache-Control"]
+        assert "max-age=31536000" in response.headers["Cache-Control"]
+        response.close()
+        assert "immutable" not in client.get('/static/header.png').headers.get("Cache-Control", "")
+    finally:
+        os.remove(path)
+        if created:
+            os.rmdir(dist)
+
+
+def test_compressed_pages(app, client):
+    """
+    Tests that pages are gzipped for clients that accept it and still revalidate with the weak ETag.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all([Movie(name=f"Movie {index}", director="Someone", year=2000, rating=7.0, user_id=user.id)
+                        for index in range(20)])
+    db.session.commit()
+
+    plain = client.get(f'/users/{user.id}')
+    assert "Content-Encoding" not in plain.headers
+
+    with patch.object(app.extensions["compression"], "encodings", ("gzip",)):
+        response = client.get(f'/users/{user.id}', headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["ETag"] == "W/" + plain.headers["ETag"]
+        assert gzip.decompress(response.data) == plain.data
+
+        revalidated = client.get(f'/users/{user.id}', headers={"Accept-Encoding": "gzip",
+                                                               "If-None-Match": response.headers["ETag"]})
+        assert revalidated.status_code == 304
+
+
+def test_metrics_endpoint(client):
+    """
+    Tests that requests are timed and exposed in Prometheus format on /metrics.
+
+    Args:
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    response = client.get('/users')
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_request_duration_seconds_count{method="GET",endpoint="views.list_users",status="200"}' in response.text
+    assert "db_query_duration_seconds_bucket" in response.text
+
+
+def test_profiling_requires_token(app, client):
+    """
+    Tests that requests are not profiled and the profile routes do not exist without PROFILE_TOKEN.
+
+    Args:
+        app (Flask): The application under test.
+        client (FlaskClient): The Flask test client used to send requests to the app.
+    """
+    response = client.get('/users', headers={"X-Profile": "anything"})
+    assert "X-Profile-Id" not in response.headers
+    assert client.get('/admin/profiles?token=anything').status_code == 404
@@ -0,0 +1,104 @@
+import gzip
+import json
+import os
+import pytest
+import assets
+from assets import template_candidates, purge_css, build_assets, load_manifest
+
+CSS = """
+/*! tailwindcss v2.2.19 */
+*,::after,::before{box-sizing:border-box}
+html{line-height:1.5}
+.bg-blue-600{background-color:#2563eb}
+.bg-red-600{background-color:#dc2626}
+.w-0\\.5{width:.125rem}
+.hover\\:bg-blue-700:hover{background-color:#1d4ed8}
+.space-y-4>:not([hidden])~:not([hidden]){margin-top:1rem}
+.unused-a,.text-white{color:#fff}
+.group:hover .group-hover\\:block{display:block}
+@keyframes spin{to{transform:rotate(360deg)}}
+@media (min-width:768px){.md\\:grid-cols-3{grid-template-columns:repeat(3,minmax(0,1fr))}.md\\:hidden{display:none}}
+@media (min-width:1024px){.lg\\:flex{display:flex}}
+"""
+
+TEMPLATE = """
+<div class="space-y-4 md:grid-cols-3 text-white w-0.5">
+  <a class="{{ 'bg-blue-600 hover:bg-blue-700' if active else 'bg-gray-700' }}">Link</a>
+</div>
+"""
+
+
+@pytest.fixture
+def folders(tmp_path):
+    """
+    Fixture that creates a template folder with one template and an empty static folder.
+
+    Returns:
+        tuple: The static and template folder paths.
+    """
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text(TEMPLATE)
+    static = tmp_path / "static"
+    static.mkdir()
+    return str(static), str(templates)
+
+
+def test_purge_keeps_used_classes(folders):
+    """
+    Tests that purging keeps base rules, used (escaped, variant and responsive) classes and at-rules,
+    and drops classes the templates do not use.
+    """
+    css = purge_css(CSS, template_candidates(folders[1]))
+
+    for kept in ("*,::after,::before{", "html{", ".bg-blue-600{", ".w-0\\.5{", ".hover\\:bg-blue-700:hover{",
+                 ".space-y-4>", ".text-white{", "@keyframes spin{", "@media (min-width:768px){.md\\:grid-cols-3{"):
+        assert kept in css
+    for dropped in ("bg-red-600", "unused-a", "group-hover", "md\\:hidden", "lg\\:flex", "tailwindcss v2"):
+        assert dropped not in css
+
+
+def test_build_assets_writes_fingerprinted_files(folders, monkeypatch):
+    """
+    Tests that a build writes a hashed stylesheet with a gzip variant and a manifest,
+    and that a rebuild with other content removes the previous build.
+    """
+    static, templates = folders
+    monkeypatch.setattr(assets, "brotli", None)
+
+    manifest = build_assets(static, templates, sources={"tailwind.css": CSS})
+    path = manifest["tailwind.css"]
+    assert path.startswith("dist/tailwind.") and path.endswith(".css")
+    assert load_manifest(static) == manifest
+    with open(os.path.join(static, path), "rb") as file:
+        data = file.read()
+    with open(os.path.join(static, path + ".gz"), "rb") as file:
+        assert gzip.decompress(file.read()) == data
+    assert not os.path.exists(os.path.join(static, path + ".br"))
+
+    assert build_assets(static, templates, sources={"tailwind.css": CSS}) == manifest
+
+    rebuilt = build_assets(static, templates, sources={"tailwind.css": CSS + ".text-white{margin:0}"})
+    assert rebuilt["tailwind.css"] != path
+    assert sorted(os.listdir(os.path.join(static, "dist"))) == sorted(
+        ["manifest.json", rebuilt["tailwind.css"][5:], rebuilt["tailwind.css"][5:] + ".gz"])
+    with open(os.path.join(static, "dist", "manifest.json")) as file:
+        assert json.load(file) == rebuilt
+
+
+def test_build_assets_writes_brotli(folders):
+    """
+    Tests that a brotli variant is written when the brotli package is installed.
+    """
+    brotli = pytest.importorskip("brotli")
+    static, templates = folders
+    path = build_assets(static, templates, sources={"tailwind.css": CSS})["tailwind.css"]
+    with open(os.path.join(static, path), "rb") as original, open(os.path.join(static, path + ".br"), "rb") as file:
+        assert brotli.decompress(file.read()) == original.read()
+
+
+def test_load_manifest_without_build(tmp_path):
+    """
+    Tests that an unbuilt static folder has an empty manifest.
+    """
+    assert load_manifest(str(tmp_path)) == {}
@@ -0,0 +1,95 @@
+import requests
+from sqlalchemy import create_engine, text
+from benchmarks.dataset import generate
+from benchmarks.fake_omdb import FakeOMDb
+from benchmarks.load_test import Recorder, percentile
+from benchmarks.suite import compare, measure
+from omdb_api import OMDbClient
+from omdb_cache import MovieCache
+
+
+def result(median):
+    return {"median_ms": median, "p95_ms": median, "min_ms": median, "mean_ms": median, "runs": 1}
+
+
+def test_generate_is_skewed_and_reproducible():
+    """
+    Tests that the generator concentrates movies on few users, links popular titles to the
+    catalog, fills the user aggregates, and produces the same data for the same seed.
+    """
+    snapshots = []
+    for _ in range(2):
+        engine = create_engine("sqlite://")
+        generate(engine, users=50, movies=2000, seed=3)
+        with engine.connect() as connection:
+            counts = [row[0] for row in connection.execute(text("SELECT movie_count FROM users ORDER BY movie_count DESC"))]
+            shared = connection.execute(text(
+                "SELECT count(*) FROM (SELECT imdb_id FROM user_movies WHERE imdb_id IS NOT NULL "
+                "GROUP BY imdb_id HAVING count(DISTINCT user_id) > 1)")).scalar()
+            snapshots.append(connection.execute(text("SELECT name, user_id, rating FROM user_movies ORDER BY id")).all())
+        assert sum(counts) == 2000
+        assert sum(counts[:5]) > 2000 / 2
+        assert shared > 0
+    assert snapshots[0] == snapshots[1]
+
+
+def test_measure_summarizes_runs():
+    """
+    Tests that measure runs the setup before every run and reports the number of timed runs.
+    """
+    calls = []
+    summary = measure(lambda: calls.append("run"), repeat=5, warmup=1, setup=lambda: calls.append("setup"))
+    assert calls == ["setup", "run"] * 6
+    assert summary["runs"] == 5 and summary["min_ms"] <= summary["median_ms"] <= summary["p95_ms"]
+
+
+def test_compare_flags_regressions():
+    """
+    Tests that slowdowns above the threshold are regressions, tiny absolute changes are ignored,
+    and added or removed benchmarks are reported.
+    """
+    baseline = {"results": {"slower": result(10), "faster": result(10), "same": result(10),
+                            "tiny": result(0.01), "removed": result(1)}}
+    current = {"results": {"slower": result(12), "faster": result(5), "same": result(10.5),
+                           "tiny": result(0.03), "added": result(1)}}
+    statuses = {row[0]: row[4] for row in compare(baseline, current, threshold=0.1)}
+    assert statuses == {"slower": "regression", "faster": "improvement", "same": "ok", "tiny": "ok",
+                        "removed": "missing", "added": "new"}
+
+
+def test_fake_omdb_answers_like_omdb():
+    """
+    Tests that the fake OMDb works with the real client, and throttles and fails requests as configured.
+    """
+    with FakeOMDb(latency=0) as fake:
+        client = OMDbClient(api_key="test", base_url=fake.url, movie_cache=MovieCache(), retries=0)
+        movie = client.fetch_movie("Heat")
+        assert movie["title"] == "Heat" and movie["imdb_id"].startswith("tt")
+        assert client.fetch_movie("Missing Movie") is None
+        client.close()
+
+    with FakeOMDb(latency=0, rate_limit=2) as fake:
+        statuses = [requests.get(fake.url, params={"t": "Heat"}).status_code for _ in range(5)]
+        assert statuses.count(429) >= 2 and fake.stats()["429"] == statuses.count(429)
+
+    with FakeOMDb(latency=0, error_rate=1.0) as fake:
+        assert requests.get(fake.url, params={"t": "Heat"}).status_code == 503
+
+
+def test_load_test_percentiles():
+    """
+    Tests the nearest-rank percentiles of the load test report.
+    """
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 0.5) == 0.05
+    assert percentile(values, 0.99) == 0.099
+    assert percentile([], 0.95) == 0.0
+
+    recorder = Recorder()
+    recorder.recording = True
+    recorder.record("add_movie", 0.2, 302)
+    recorder.record("add_movie", 0.4, 503)
+    recorder.record("user_movies", 0.01, "error")
+    summary = recorder.summary(duration=2)
+    assert summary["endpoints"]["add_movie"]["errors"] == 1
+    assert summary["total"] == {**summary["total"], "requests": 3, "rps": 1.5, "errors": 2, "max_ms": 400.0}
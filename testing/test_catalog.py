@@ -0,0 +1,139 @@
+import pytest
+from unittest.mock import patch
+from data.database import db, User, Movie, CatalogMovie
+from catalog import lookup_movie, store_in_catalog, user_movie_fields
+
+
+@pytest.fixture
+def inception():
+    return {"imdb_id": "tt1375666", "title": "Inception", "director": "Christopher Nolan",
+            "year": 2010, "rating": 8.8, "poster": "someposterurl"}
+
+
+def test_lookup_movie_reuses_catalog(app, inception):
+    """
+    Tests that a movie found in OMDb once is afterwards resolved from the catalog.
+
+    Asserts:
+        OMDb is asked only once, also for a differently spelled title, and one catalog row exists.
+    """
+    with patch("catalog.fetch_movie_data", return_value=inception) as mock_fetch:
+        assert lookup_movie("Inception") == inception
+        db.session.commit()
+        assert lookup_movie(" INCEPTION ") == inception
+
+    assert mock_fetch.call_count == 1
+    assert CatalogMovie.query.count() == 1
+
+
+def test_store_in_catalog_updates_existing(app, inception):
+    """
+    Tests that storing the same imdbID again refreshes the entry instead of duplicating it.
+    """
+    store_in_catalog(inception)
+    store_in_catalog(dict(inception, rating=9.0))
+    db.session.commit()
+
+    assert CatalogMovie.query.count() == 1
+    assert db.session.get(CatalogMovie, "tt1375666").rating == 9.0
+
+
+def test_store_in_catalog_refreshes_linked_users(app, inception):
+    """
+    Tests that refreshing a catalog entry updates the stats and version stamp of its users.
+
+    Asserts:
+        A user whose movie follows the entry sees the new average, a newer updated_at and
+        dropped movie grids, and storing unchanged values leaves the stamp alone.
+    """
+    user = User(name="Alice")
+    db.session.add(user)
+    db.session.commit()
+    store_in_catalog(inception)
+    db.session.add(Movie(imdb_id="tt1375666", user_id=user.id))
+    db.session.commit()
+    stamp = user.updated_at
+
+    with patch("catalog.invalidate_user_fragments") as mock_invalidate:
+        store_in_catalog(dict(inception, rating=9.0))
+    db.session.commit()
+    db.session.refresh(user)
+    mock_invalidate.assert_called_once_with(user.id)
+    assert user.avg_rating == 9.0
+    assert user.updated_at > stamp
+
+    stamp = user.updated_at
+    store_in_catalog(dict(inception, rating=9.0))
+    db.session.commit()
+    db.session.refresh(user)
+    assert user.updated_at == stamp
+
+
+def test_user_movies_share_catalog_entry(app, inception):
+    """
+    Tests that two users adding the same film share one catalog entry but keep their own values.
+
+    Asserts:
+        Both movies read their data from the catalog without storing a copy, a personal rating
+        does not affect the other user, and refreshed catalog data reaches movies without own values.
+    """
+    first, second = User(name="First"), User(name="Second")
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    store_in_catalog(inception)
+    movie1 = Movie(**user_movie_fields(first.id, inception))
+    movie2 = Movie(**user_movie_fields(second.id, inception))
+    db.session.add_all([movie1, movie2])
+    db.session.commit()
+
+    movie1.rating = 5.0
+    db.session.commit()
+
+    assert movie1.poster is None
+    assert movie1.poster_url == movie2.poster_url == "someposterurl"
+    assert movie2.rating == 8.8
+    assert movie1.director == "Christopher Nolan"
+    assert (movie2.name_override, movie2.director_override, movie2.year_override, movie2.rating_override) == \
+        (None, None, None, None)
+    assert movie1.rating_override == 5.0
+
+    store_in_catalog(dict(inception, rating=9.0))
+    db.session.commit()
+    assert (movie1.rating, movie2.rating) == (5.0, 9.0)
+    assert db.session.scalars(db.select(Movie.rating).order_by(Movie.id)).all() == [5.0, 9.0]
+
+    movie1.rating = 9.0
+    assert movie1.rating_override is None
+
+
+def test_store_in_catalog_tolerates_concurrent_insert(app, inception):
+    """
+    Tests that an entry inserted by another connection after this session looked for it is reused.
+    """
+    with db.engine.begin() as connection:
+        connection.execute(CatalogMovie.__table__.insert(),
+                           {"imdb_id": "tt1375666", "title": "Inception", "title_key": "inception"})
+    get = db.session.get
+    calls = []
+
+    def stale_get(*args):
+        calls.append(args)
+        return None if len(calls) == 1 else get(*args)
+
+    with patch.object(db.session, "get", side_effect=stale_get):
+        entry = store_in_catalog(inception)
+    db.session.commit()
+
+    assert entry.director == "Christopher Nolan"
+    assert CatalogMovie.query.count() == 1
+
+
+def test_user_movie_without_catalog_keeps_poster(app):
+    """
+    Tests that movie data without an imdbID is stored with its own poster.
+    """
+    fields = user_movie_fields(1, {"title": "Home Video", "year": 2001, "rating": 5.0, "poster": "local"})
+    assert fields["imdb_id"] is None
+    assert fields["poster"] == "local"
+    assert fields["director_override"] == "Unknown"
@@ -0,0 +1,136 @@
+import gzip
+import zlib
+import pytest
+from flask import Flask, Response, make_response
+import compression
+from compression import Compression, choose_encoding, compress_stream
+from werkzeug.datastructures import Accept
+
+PAGE = "<html>" + "<div class='movie-card'>Heat</div>" * 200 + "</html>"
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Fixture that creates a Flask app with compression, a page, a small page, a streamed
+    response and a static folder with a precompressed stylesheet.
+
+    Returns:
+        Flask: The app.
+    """
+    app = Flask(__name__, static_folder=str(tmp_path), static_url_path="/static")
+    (tmp_path / "site.css").write_text("body{color:red}")
+    (tmp_path / "site.css.gz").write_bytes(gzip.compress(b"body{color:red}"))
+    app.extensions["renders"] = 0
+
+    @app.route("/page")
+    def page():
+        app.extensions["renders"] += 1
+        response = make_response(PAGE)
+        response.set_etag("v1")
+        return response
+
+    @app.route("/small")
+    def small():
+        return "<p>Hi</p>"
+
+    @app.route("/stream")
+    def stream():
+        return Response((f'{{"row":{index}}}\n' for index in range(100)), mimetype="application/x-ndjson")
+
+    Compression(app, min_size=500, cache_size=8)
+    return app
+
+
+def test_choose_encoding():
+    """
+    Tests that brotli is preferred at equal quality, quality values are respected and
+    an empty header means no compression.
+    """
+    assert choose_encoding(Accept([("gzip", 1), ("br", 1)]), ("br", "gzip")) == "br"
+    assert choose_encoding(Accept([("gzip", 1), ("br", 0.5)]), ("br", "gzip")) == "gzip"
+    assert choose_encoding(Accept([("*", 1)]), ("gzip",)) == "gzip"
+    assert choose_encoding(Accept([("gzip", 0)]), ("gzip",)) is None
+    assert choose_encoding(Accept(), ("br", "gzip")) is None
+
+
+def test_compress_stream_gzip():
+    """
+    Tests that a compressed stream decompresses to the chunks and yields output per chunk.
+    """
+    chunks = list(compress_stream(["a" * 100, b"b" * 100], "gzip"))
+    assert len(chunks) == 3
+    assert zlib.decompress(b"".join(chunks), 16 + zlib.MAX_WBITS) == b"a" * 100 + b"b" * 100
+
+
+def test_gzip_response_and_cache(app, monkeypatch):
+    """
+    Tests that a large page is gzipped with a weak ETag, compressed once per ETag,
+    and sent uncompressed to clients that do not accept gzip.
+    """
+    monkeypatch.setattr(compression, "compress", pytest.fail)
+    client = app.test_client()
+    compressor = app.extensions["compression"]
+    compressor.encodings = ("gzip",)
+    compressor.cache.set("gzip", "v1", gzip.compress(PAGE.encode()))
+
+    response = client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == 'W/"v1"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data).decode() == PAGE
+
+    plain = client.get("/page")
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data.decode() == PAGE
+    assert plain.headers["ETag"] == '"v1"'
+
+
+def test_compression_fills_cache(app):
+    """
+    Tests that the first compressed response of an ETag is stored for the next request.
+    """
+    client = app.test_client()
+    app.extensions["compression"].encodings = ("gzip",)
+    client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(app.extensions["compression"].cache.get("gzip", "v1")).decode() == PAGE
+
+
+def test_small_and_streamed_responses(app):
+    """
+    Tests that bodies below the threshold stay uncompressed and streamed bodies are compressed.
+    """
+    client = app.test_client()
+    app.extensions["compression"].encodings = ("gzip",)
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode().splitlines()[99] == '{"row":99}'
+
+
+def test_brotli_response(app):
+    """
+    Tests that brotli is used when installed and accepted.
+    """
+    brotli = pytest.importorskip("brotli")
+    response = app.test_client().get("/page", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(response.data).decode() == PAGE
+
+
+def test_precompressed_static(app):
+    """
+    Tests that static files are answered with their prebuilt .gz variant when accepted.
+    """
+    client = app.test_client()
+    response = client.get("/static/site.css", headers={"Accept-Encoding": "br, gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/css"
+    assert gzip.decompress(response.data) == b"body{color:red}"
+    response.close()
+
+    response = client.get("/static/site.css")
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"body{color:red}"
+    response.close()
@@ -1,5 +1,10 @@
+import os
+import tempfile
 import pytest
 from unittest.mock import MagicMock
+from sqlalchemy import event
+from data.database import db, User, Movie, CatalogMovie
+from data.rows import UserRow, MovieRow
 from data_manager import SQLiteDataManager
 
 
@@ -41,7 +46,7 @@ def test_get_all_users(data_manager):
     mock_user2 = MagicMock(id=2)
     mock_user2.name = "Jane Doe"
 
-    mock_session.query.return_value.all.return_value = [mock_user1, mock_user2]
+    mock_session.scalars.return_value.all.return_value = [mock_user1, mock_user2]
 
     users = data_manager.get_all_users()
 
@@ -98,7 +103,7 @@ def test_update_movie(data_manager):
 
     mock_movie = MagicMock(id=1, name="Old Name", director="Director", year=2000, rating=5)
 
-    mock_session.query.return_value.get.return_value = mock_movie
+    mock_session.get.return_value = mock_movie
 
     mock_movie.name = "New Name"
     data_manager.update_movie(mock_movie)
@@ -126,7 +131,7 @@ def test_delete_movie(data_manager):
     data_manager.Session = MagicMock(return_value=mock_session)
 
     mock_movie = MagicMock(id=1, name="Old Movie", director="Director", year=2000, rating=5)
-    mock_session.query.return_value.get.return_value = mock_movie
+    mock_session.get.return_value = mock_movie
 
     data_manager.delete_movie(mock_movie.id)
 
@@ -152,8 +157,162 @@ def test_get_user_movies_not_found(data_manager):
     """
     mock_session = MagicMock()
     data_manager.Session = MagicMock(return_value=mock_session)
-    mock_session.query.return_value.get.return_value = None
+    mock_session.get.return_value = None
 
     with pytest.raises(ValueError):
         data_manager.get_user_movies(999)
 
+
+@pytest.fixture
+def sqlite_data_manager():
+    """
+    Fixture that creates an SQLiteDataManager on a temporary database with all tables.
+
+    Returns:
+        SQLiteDataManager: An instance bound to the temporary database.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
+        db_path = tmp.name
+
+    manager = SQLiteDataManager(db_path)
+    db.metadata.create_all(manager.engine)
+    yield manager
+
+    manager.engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+
+def test_unit_of_work_shares_one_transaction(sqlite_data_manager):
+    """
+    Tests that operations inside a unit of work share one session and are committed once.
+
+    Asserts:
+        Only one session is created, the user ID is available to the following call,
+        and both rows are stored.
+    """
+    sessions = []
+    original_session = sqlite_data_manager.Session
+    sqlite_data_manager.Session = lambda: sessions.append(original_session()) or sessions[-1]
+
+    with sqlite_data_manager.unit_of_work():
+        user = User(name="John Doe")
+        sqlite_data_manager.add_user(user)
+        sqlite_data_manager.add_movie(Movie(name="Top Gun", director="Tony Scott", user_id=user.id))
+
+    assert len(sessions) == 1
+    movies = sqlite_data_manager.get_user_movies(user.id)
+    assert [movie.name for movie in movies] == ["Top Gun"]
+
+
+def test_unit_of_work_refreshes_user_stats_once(sqlite_data_manager):
+    """
+    Tests that several movies added in one unit of work refresh the user's aggregates once, at commit.
+
+    Asserts:
+        Only one UPDATE of users is executed and the aggregates count all movies.
+    """
+    user = User(name="John Doe")
+    sqlite_data_manager.add_user(user)
+    statements = []
+    event.listen(sqlite_data_manager.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    with sqlite_data_manager.unit_of_work():
+        for rating in range(1, 11):
+            sqlite_data_manager.add_movie(Movie(name=f"Movie {rating}", director="Unknown", rating=rating,
+                                                user_id=user.id))
+
+    assert sum(statement.startswith("UPDATE users") for statement in statements) == 1
+    stored = sqlite_data_manager.get_user(user.id)
+    assert (stored.movie_count, stored.avg_rating) == (10, 5.5)
+
+
+def test_unit_of_work_rolls_back_on_error(sqlite_data_manager):
+    """
+    Tests that a failing operation rolls back everything done in the unit of work.
+
+    Asserts:
+        The user added before the failing deletion is not stored.
+    """
+    with pytest.raises(ValueError):
+        with sqlite_data_manager.unit_of_work():
+            sqlite_data_manager.add_user(User(name="John Doe"))
+            sqlite_data_manager.delete_movie(999)
+
+    assert sqlite_data_manager.get_all_users() == []
+
+
+def test_results_usable_after_session_closed(sqlite_data_manager):
+    """
+    Tests that returned objects can be read after their session is closed without lazy loads.
+
+    Asserts:
+        Users expose their movies and movies expose their catalog poster.
+    """
+    with sqlite_data_manager.unit_of_work() as session:
+        user = User(name="John Doe")
+        session.add(CatalogMovie(imdb_id="tt0092099", title="Top Gun", title_key="top gun", poster="url"))
+        sqlite_data_manager.add_user(user)
+        sqlite_data_manager.add_movie(Movie(name="Top Gun", director="Tony Scott", user_id=user.id,
+                                            imdb_id="tt0092099"))
+
+    users = sqlite_data_manager.get_all_users()
+    movies = sqlite_data_manager.get_user_movies(user.id)
+
+    assert [movie.name for movie in users[0].movies] == ["Top Gun"]
+    assert movies[0].poster_url == "url"
+
+
+def test_read_rows(sqlite_data_manager):
+    """
+    Tests the lightweight read path returning UserRow and MovieRow tuples.
+
+    Asserts:
+        Users come with their movie counts, and movie rows are sorted, paginated and
+        carry the poster resolved from the catalog.
+    """
+    with sqlite_data_manager.unit_of_work() as session:
+        john, jane = User(name="John Doe"), User(name="Jane Doe")
+        session.add(CatalogMovie(imdb_id="tt0092099", title="Top Gun", title_key="top gun", poster="url"))
+        sqlite_data_manager.add_user(john)
+        sqlite_data_manager.add_user(jane)
+        sqlite_data_manager.add_movie(Movie(name="Top Gun", director="Tony Scott", year=1986, user_id=john.id,
+                                            imdb_id="tt0092099"))
+        sqlite_data_manager.add_movie(Movie(name="Heat", director="Michael Mann", year=1995, user_id=john.id,
+                                            poster="own"))
+
+    john_row, jane_row = sqlite_data_manager.get_user_rows()
+    assert isinstance(john_row, UserRow)
+    assert (john_row.name, john_row.movie_count, john_row.latest_added is not None) == ("John Doe", 2, True)
+    assert jane_row == UserRow(jane.id, "Jane Doe", 0, None, None)
+
+    page = sqlite_data_manager.get_movie_rows(john.id, sort="year", direction="desc", limit=1)
+    assert isinstance(page[0], MovieRow)
+    assert [(row.name, row.poster_url) for row in page] == [("Heat", "own")]
+    next_page = sqlite_data_manager.get_movie_rows(john.id, sort="year", direction="desc", cursor=page.next_cursor)
+    assert [(row.name, row.poster_url) for row in next_page] == [("Top Gun", "url")]
+
+
+def test_search_movies(sqlite_data_manager):
+    """
+    Tests searching a user's movies through the data manager.
+
+    Asserts:
+        Matching movies are returned as MovieRow tuples, queries without words return nothing,
+        and unknown users raise a ValueError.
+    """
+    with sqlite_data_manager.unit_of_work():
+        user = User(name="John Doe")
+        sqlite_data_manager.add_user(user)
+        sqlite_data_manager.add_movie(Movie(name="Top Gun", director="Tony Scott", user_id=user.id))
+        sqlite_data_manager.add_movie(Movie(name="Heat", director="Michael Mann", user_id=user.id))
+
+    results = sqlite_data_manager.search_movies(user.id, "top")
+    assert [row.name for row in results] == ["Top Gun"]
+    assert isinstance(results[0], MovieRow)
+    assert sqlite_data_manager.search_movies(user.id, "!!") == []
+
+    with pytest.raises(ValueError):
+        sqlite_data_manager.search_movies(999, "top")
@@ -2,7 +2,9 @@ import os
 import tempfile
 import pytest
 from flask import Flask
-from data.database import db, init_database, User, Movie
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+from data.database import db, init_database, init_migrations, User, Movie
 
 @pytest.fixture
 def test_app():
@@ -70,20 +72,40 @@ def test_user_movie_relationship(session):
     assert queried_user.movies[0].name == "Movie 1"
 
 
-def test_init_database_creates_file():
+def test_init_database_leaves_schema_alone(tmp_path, monkeypatch):
     """
-    Tests that `init_database` creates the database file and tables.
+    Tests that `init_database` connects to the file named by DATABASE_PATH without creating tables.
 
-    This test sets up a minimal Flask app, calls `init_database`, and checks that
-    the database file was created on the filesystem. It verifies that the initialization
-    logic correctly sets up the DB structure as expected.
+    Creating the schema is left to `flask db upgrade`, so starting the app stays cheap and never
+    races with a migration.
     """
+    db_path = tmp_path / "data" / "movies.sqlite"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
     app = Flask(__name__)
-    db_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'data', 'movies.sqlite')
 
-    if os.path.exists(db_path):
-        os.remove(db_path)
+    init_database(app)
+
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == f"sqlite:///{db_path}"
+    with app.app_context():
+        assert inspect(db.engine).get_table_names() == []
+        db.engine.dispose()
+
 
+def test_migrations_create_schema(tmp_path):
+    """
+    Tests that upgrading a new database with the migrations, as `flask db upgrade` does,
+    creates the same tables as the models.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'movies.sqlite'}"
     init_database(app)
+    init_migrations(app)
 
-    assert os.path.exists(db_path)
+    with app.app_context():
+        upgrade()
+        tables = set(inspect(db.engine).get_table_names())
+        indexes = {index["name"] for index in inspect(db.engine).get_indexes("user_movies")}
+        db.engine.dispose()
+    assert set(db.metadata.tables) <= tables
+    assert {index.name for index in Movie.__table__.indexes} <= indexes
+    assert "alembic_version" in tables
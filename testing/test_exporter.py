@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+import pytest
+from data.database import db, User, Movie, CatalogMovie
+from exporter import EXPORT_COLUMNS, export_statement, iter_export
+
+
+@pytest.fixture
+def app(app):
+    """
+    Fixture that fills the shared app's database with two users and three movies.
+
+    Returns:
+        Flask: The app with an active application context.
+    """
+    db.session.add_all([User(id=1, name="John Doe"), User(id=2, name="Jane Doe"), User(id=3, name="No Movies"),
+                        CatalogMovie(imdb_id="tt0113277", title="Heat", title_key="heat", poster="heat.jpg")])
+    db.session.add_all([
+        Movie(id=1, name="Heat", director="Michael Mann", year=1995, rating=8.3, user_id=1, imdb_id="tt0113277"),
+        Movie(id=2, name="Top Gun", director="Tony Scott", year=1986, rating=6.9, user_id=1, poster="own.jpg"),
+        Movie(id=3, name="Alien", director="Ridley Scott", year=1979, rating=8.5, user_id=2),
+    ])
+    db.session.commit()
+    return app
+
+
+def test_csv_export_of_all_users(app):
+    """
+    Tests the CSV export of all users, including users without movies, in small batches.
+
+    Asserts:
+        The header comes first and on its own, and every movie and movie-less user is one row.
+    """
+    chunks = list(iter_export(db.engine, export_statement(), "csv", batch_size=2))
+    assert chunks[0].strip() == ",".join(EXPORT_COLUMNS)
+    assert len(chunks) == 1 + 2
+
+    rows = list(csv.DictReader(io.StringIO("".join(chunks))))
+    assert [(row["user_name"], row["name"], row["poster_url"]) for row in rows] == [
+        ("John Doe", "Heat", "heat.jpg"), ("John Doe", "Top Gun", "own.jpg"),
+        ("Jane Doe", "Alien", ""), ("No Movies", "", "")]
+
+
+def test_ndjson_export_of_one_user(app):
+    """
+    Tests the NDJSON export of a single user's movies.
+    """
+    lines = "".join(iter_export(db.engine, export_statement(1), "ndjson")).splitlines()
+    records = [json.loads(line) for line in lines]
+    assert [record["name"] for record in records] == ["Heat", "Top Gun"]
+    assert records[0]["added_at"]
+
+
+def test_unknown_format(app):
+    """
+    Tests that unknown formats are rejected.
+    """
+    with pytest.raises(ValueError):
+        list(iter_export(db.engine, export_statement(), "parquet"))
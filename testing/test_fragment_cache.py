@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import patch
+from fragment_cache import FragmentCache, MemoryBackend, SQLiteBackend, create_fragment_cache
+
+
+@pytest.fixture
+def db_path():
+    """
+    Fixture that provides the path of a temporary SQLite file and removes it afterwards.
+
+    Yields:
+        str: The file path.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
+        path = tmp.name
+    yield path
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def test_get_or_render_renders_once():
+    """
+    Tests that a fragment is rendered on the first request only.
+
+    Asserts:
+        The render function runs once, and hits and misses are counted.
+    """
+    cache = FragmentCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "<ul></ul>"
+
+    assert cache.get_or_render("user:1", "v1", render) == "<ul></ul>"
+    assert cache.get_or_render("user:1", "v1", render) == "<ul></ul>"
+    assert len(renders) == 1
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_invalidate_drops_only_one_group():
+    """
+    Tests that invalidating a user leaves the fragments of other users alone.
+    """
+    cache = FragmentCache()
+    cache.get_or_render("user:1", "a", lambda: "one a")
+    cache.get_or_render("user:1", "b", lambda: "one b")
+    cache.get_or_render("user:2", "a", lambda: "two a")
+
+    cache.invalidate("user:1")
+
+    assert cache.get_or_render("user:1", "a", lambda: "new") == "new"
+    assert cache.get_or_render("user:2", "a", lambda: "new") == "two a"
+
+
+def test_memory_backend_evicts_least_recently_used():
+    """
+    Tests the size limit of the in-process LRU.
+    """
+    backend = MemoryBackend(max_size=2)
+    backend.set("g", "a", "A")
+    backend.set("g", "b", "B")
+    backend.get("g", "a")
+    backend.set("g", "c", "C")
+
+    assert backend.get("g", "b") is None
+    assert (backend.get("g", "a"), backend.get("g", "c")) == ("A", "C")
+
+
+def test_sqlite_backend_is_shared(db_path):
+    """
+    Tests that fragments and invalidations are seen by every cache on the same file,
+    as they are by several worker processes.
+    """
+    first, second = FragmentCache(SQLiteBackend(db_path)), FragmentCache(SQLiteBackend(db_path))
+
+    first.get_or_render("user:1", "v1", lambda: "grid")
+    assert second.get_or_render("user:1", "v1", lambda: "other") == "grid"
+
+    second.invalidate("user:1")
+    assert first.get_or_render("user:1", "v1", lambda: "fresh") == "fresh"
+
+
+def test_sqlite_backend_size_limit(db_path):
+    """
+    Tests that the SQLite backend removes the oldest fragments beyond its size.
+    """
+    backend = SQLiteBackend(db_path, max_size=2)
+    for key in "abc":
+        backend.set("g", key, key.upper())
+
+    assert len(backend) == 2
+    assert backend.get("g", "a") is None
+
+
+def test_sqlite_backend_closes_connections(db_path):
+    """
+    Tests that the SQLite backend closes every connection it opened once the operation is done.
+    """
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    with patch("data.sqlite_tuning.sqlite3.connect", side_effect=connect):
+        backend = SQLiteBackend(db_path)
+        backend.set("g", "a", "A")
+        backend.get("g", "a")
+        backend.delete_group("g")
+        len(backend)
+
+    assert len(opened) == 5
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_create_fragment_cache(db_path):
+    """
+    Tests the configuration strings of the fragment cache.
+    """
+    assert isinstance(create_fragment_cache("memory").backend, MemoryBackend)
+    assert isinstance(create_fragment_cache(f"sqlite:{db_path}").backend, SQLiteBackend)
+    assert create_fragment_cache("none") is None
+    with pytest.raises(ValueError):
+        create_fragment_cache("redis://localhost")
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+import pytest
+from flask import Flask, flash
+from http_cache import make_etag, not_modified, with_validators, templates_version
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture that creates a bare Flask app for request contexts.
+
+    Returns:
+        Flask: The app.
+    """
+    app = Flask(__name__)
+    app.secret_key = "test"
+    return app
+
+
+def test_make_etag_depends_on_every_part():
+    """
+    Tests that ETags are stable for equal parts and differ for any changed part.
+    """
+    assert make_etag("users", 1, "a") == make_etag("users", 1, "a")
+    assert make_etag("users", 1, "a") != make_etag("users", 1, "b")
+    assert make_etag("users", "1a") != make_etag("users", "1", "a")
+
+
+def test_templates_version_follows_content(tmp_path):
+    """
+    Tests that the templates fingerprint changes when a template changes.
+    """
+    (tmp_path / "page.html").write_text("one")
+    before = templates_version(str(tmp_path))
+    (tmp_path / "page.html").write_text("two")
+    assert templates_version(str(tmp_path)) != before
+
+
+def test_not_modified_matches_etag(app):
+    """
+    Tests that a matching If-None-Match, also a weak one, gets a 304 with validators and a different one does not.
+    """
+    last_modified = datetime(2026, 1, 2, 3, 4, 5, 678000)
+    with app.test_request_context(headers={"If-None-Match": '"abc"'}):
+        response = not_modified("abc", last_modified)
+        assert response.status_code == 304
+        assert response.headers["ETag"] == '"abc"'
+        assert response.headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+        assert "no-cache" in response.headers["Cache-Control"]
+    with app.test_request_context(headers={"If-None-Match": 'W/"abc", "def"'}):
+        assert not_modified("abc", last_modified).status_code == 304
+    with app.test_request_context(headers={"If-None-Match": '"abd", "def"'}):
+        assert not_modified("abc", last_modified) is None
+
+
+def test_not_modified_since(app):
+    """
+    Tests If-Modified-Since, which is only used without If-None-Match.
+    """
+    last_modified = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    with app.test_request_context(headers={"If-Modified-Since": "Fri, 02 Jan 2026 03:04:05 GMT"}):
+        assert not_modified("abc", last_modified).status_code == 304
+    with app.test_request_context(headers={"If-Modified-Since": "Fri, 02 Jan 2026 03:04:04 GMT"}):
+        assert not_modified("abc", last_modified) is None
+    with app.test_request_context(headers={"If-Modified-Since": "Fri, 02 Jan 2026 03:04:05 GMT",
+                                           "If-None-Match": '"other"'}):
+        assert not_modified("abc", last_modified) is None
+
+
+def test_not_modified_renders_pending_flashes(app):
+    """
+    Tests that pages are rendered while flashed messages are waiting, even if the ETag matches.
+    """
+    with app.test_request_context(headers={"If-None-Match": '"abc"'}):
+        flash("Movie added successfully.")
+        assert not_modified("abc") is None
+
+
+def test_with_validators(app):
+    """
+    Tests the headers added to a rendered response.
+    """
+    with app.test_request_context():
+        response = with_validators(app.make_response("page"), "abc", datetime(2026, 1, 2, 3, 4, 5))
+    assert response.headers["ETag"] == '"abc"'
+    assert response.headers["Last-Modified"] == "Fri, 02 Jan 2026 03:04:05 GMT"
+    assert set(response.headers["Cache-Control"].split(", ")) == {"private", "no-cache"}
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from unittest.mock import patch
+from data.database import db, User, Job
+from jobs import JobRunner, PENDING, RUNNING, DONE, FAILED
+
+
+@pytest.fixture
+def app(app):
+    """
+    Fixture that adds the user the jobs belong to to the shared app's database.
+
+    Returns:
+        Flask: The app with an active application context.
+    """
+    db.session.add(User(name="Job User"))
+    db.session.commit()
+    return app
+
+
+def failing_handler(job):
+    raise ValueError(f"Cannot handle '{job.payload}'.")
+
+
+def test_enqueue_runs_job_in_background(app):
+    """
+    Tests that an enqueued job is run by the thread pool and marked as done.
+    """
+    seen = []
+    runner = JobRunner(app, {"record": lambda job: seen.append(job.payload)})
+
+    job = runner.enqueue("record", user_id=1, payload="Inception")
+    runner.shutdown(wait=True)
+
+    db.session.expire_all()
+    assert seen == ["Inception"]
+    assert db.session.get(Job, job.id).status == DONE
+
+
+def test_failed_job_records_error(app):
+    """
+    Tests that an exception in the handler marks the job as failed with the error message.
+    """
+    runner = JobRunner(app, {"fail": failing_handler})
+
+    job = runner.enqueue("fail", user_id=1, payload="Inception")
+    runner.shutdown(wait=True)
+
+    db.session.expire_all()
+    stored = db.session.get(Job, job.id)
+    assert stored.status == FAILED
+    assert stored.error == "Cannot handle 'Inception'."
+
+
+def test_resume_picks_up_unfinished_jobs(app):
+    """
+    Tests that jobs left pending by a previous process are run again on resume.
+    """
+    db.session.add(Job(kind="record", user_id=1, payload="Left over", status=PENDING))
+    db.session.commit()
+    seen = []
+    runner = JobRunner(app, {"record": lambda job: seen.append(job.payload)})
+
+    assert runner.resume() == 1
+    runner.shutdown(wait=True)
+
+    assert seen == ["Left over"]
+
+
+def test_job_is_claimed_once(app):
+    """
+    Tests that a job scheduled by several workers is only run by the first one to claim it.
+    """
+    db.session.add(Job(kind="record", user_id=1, payload="Once", status=PENDING))
+    db.session.commit()
+    seen = []
+    runner = JobRunner(app, {"record": lambda job: seen.append(job.payload)})
+
+    runner.run(1)
+    runner.run(1)
+
+    assert seen == ["Once"]
+
+
+def test_resume_only_reruns_stale_running_jobs(app):
+    """
+    Tests that resume leaves recently claimed jobs to their worker and re-runs only stale ones.
+    """
+    long_ago = datetime.now(timezone.utc) - timedelta(hours=1)
+    db.session.add_all([Job(kind="record", user_id=1, payload="Stale", status=RUNNING, updated_at=long_ago),
+                        Job(kind="record", user_id=1, payload="Busy", status=RUNNING)])
+    db.session.commit()
+    seen = []
+    runner = JobRunner(app, {"record": lambda job: seen.append(job.payload)}, stale_after=60)
+
+    assert runner.resume() == 1
+    runner.shutdown(wait=True)
+
+    db.session.expire_all()
+    assert seen == ["Stale"]
+    assert [job.status for job in db.session.query(Job).order_by(Job.id)] == [DONE, RUNNING]
+
+
+def test_resume_once_only_resumes_on_first_call(app):
+    """
+    Tests that `resume_once` schedules unfinished jobs on its first call only.
+    """
+    db.session.add(Job(kind="record", user_id=1, payload="Left over", status=PENDING))
+    db.session.commit()
+    runner = JobRunner(app, {"record": lambda job: None})
+
+    with patch.object(runner, "submit") as mock_submit:
+        runner.resume_once()
+        runner.resume_once()
+
+    assert mock_submit.call_count == 1
+
+
+def test_resume_without_jobs_table(app):
+    """
+    Tests that resuming against a database that has not been upgraded yet finds nothing to do.
+    """
+    Job.__table__.drop(db.engine)
+    runner = JobRunner(app, {})
+
+    assert runner.resume() == 0
+
+
+def test_enqueue_unknown_kind(app):
+    """
+    Tests that jobs without a registered handler are rejected.
+    """
+    runner = JobRunner(app, {})
+    with pytest.raises(ValueError):
+        runner.enqueue("unknown", user_id=1)
@@ -0,0 +1,133 @@
+import logging
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from metrics import Registry, init_metrics, instrument_engine
+
+
+@pytest.fixture
+def registry():
+    """
+    Fixture that creates an empty metrics registry.
+
+    Returns:
+        Registry: The registry.
+    """
+    return Registry()
+
+
+@pytest.fixture
+def app(registry):
+    """
+    Fixture that creates an instrumented Flask app with an in-memory SQLite engine and
+    a route that runs the same query once per item, like a lazy relationship in a loop.
+
+    Returns:
+        Flask: The app.
+    """
+    app = Flask(__name__)
+    app.config.update(METRICS_ENABLED=True, METRICS_N_PLUS_ONE_THRESHOLD=3)
+    engine = create_engine("sqlite://")
+
+    @app.route("/items/<int:count>")
+    def items(count):
+        with engine.connect() as connection:
+            for item in range(count):
+                connection.execute(text("SELECT :item"), {"item": item})
+        return "ok"
+
+    init_metrics(app, engines=(engine,), registry=registry)
+    return app
+
+
+def test_histogram_exposition(registry):
+    """
+    Tests that histograms render cumulative buckets, sum and count with escaped labels.
+    """
+    histogram = registry.histogram("latency_seconds", "Latency.", ("path",), buckets=(0.1, 1))
+    histogram.observe(0.05, path='/a"b')
+    histogram.observe(0.5, path='/a"b')
+    registry.counter("hits_total", "Hits.").inc(2)
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{path="/a\\"b",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{path="/a\\"b",le="1"} 2' in text
+    assert 'latency_seconds_bucket{path="/a\\"b",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{path="/a\\"b"} 2' in text
+    assert "hits_total 2" in text
+
+
+def test_registry_returns_existing_metric(registry):
+    """
+    Tests that registering a name twice returns the same metric and a different type is rejected.
+    """
+    assert registry.counter("jobs_total", "Jobs.") is registry.counter("jobs_total", "Jobs.")
+    with pytest.raises(ValueError):
+        registry.histogram("jobs_total", "Jobs.")
+
+
+def test_request_and_query_metrics(app, registry):
+    """
+    Tests that requests are timed with their query counts and a Server-Timing header.
+    """
+    response = app.test_client().get("/items/2")
+    assert "db;desc=\"2 queries\"" in response.headers["Server-Timing"]
+    assert registry.enabled
+    assert registry.get("http_request_duration_seconds").count(method="GET", endpoint="items", status=200) == 1
+    assert registry.get("db_query_duration_seconds").count(operation="SELECT") == 2
+    assert 'http_request_queries_bucket{endpoint="items",le="2"} 1' in app.test_client().get("/metrics").text
+
+
+def test_n_plus_one_detection(app, registry, caplog):
+    """
+    Tests that a statement repeated up to the threshold within one request is reported.
+    """
+    client = app.test_client()
+    client.get("/items/2")
+    assert registry.get("db_n_plus_one_total").value(endpoint="items") == 0
+
+    with caplog.at_level(logging.WARNING):
+        client.get("/items/3")
+    assert registry.get("db_n_plus_one_total").value(endpoint="items") == 1
+    assert "Possible N+1 query in items: 3x SELECT ?" in caplog.text
+
+
+def test_failed_statement_is_not_timed(registry):
+    """
+    Tests that a statement failing in the database does not leave a start time behind
+    that a later statement on the same connection would be timed with.
+    """
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, registry)
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing"))
+        connection.execute(text("SELECT 1"))
+        assert not [key for key in connection.info if key.startswith("metrics")]
+    assert registry.get("db_query_duration_seconds").count(operation="SELECT") == 1
+
+
+def test_metrics_token(registry):
+    """
+    Tests that with METRICS_TOKEN set, /metrics requires it as bearer token.
+    """
+    app = Flask(__name__)
+    app.config.update(METRICS_ENABLED=True, METRICS_TOKEN="scrape-token")
+    init_metrics(app, registry=registry)
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 403
+    assert client.get("/metrics", headers={"Authorization": "Bearer scrape-token"}).status_code == 200
+
+
+def test_metrics_disabled(registry):
+    """
+    Tests that nothing is registered when METRICS_ENABLED is off.
+    """
+    app = Flask(__name__)
+    init_metrics(app, registry=registry)
+    assert app.test_client().get("/metrics").status_code == 404
+    assert registry.render() == "\n"
+    assert not registry.enabled
@@ -0,0 +1,113 @@
+from unittest.mock import patch
+from data.database import db, User, Movie
+from sqlalchemy.exc import OperationalError
+from movie_import import parse_titles, import_movies, RowError
+
+
+def fake_fetch_many(titles, concurrency=10, return_exceptions=False):
+    """
+    Stands in for `omdb_api.fetch_many`: every title is found except those starting with "missing",
+    and lookups of titles starting with "broken" fail.
+    """
+    def fake_lookup(title):
+        if title.startswith("missing"):
+            return None
+        if title.startswith("broken"):
+            return RuntimeError("connection reset") if return_exceptions else None
+        return {"imdb_id": f"tt-{title}", "title": title, "director": None, "year": 2000, "rating": 7.0,
+                "poster": "url"}
+
+    return [fake_lookup(title) for title in titles]
+
+
+def test_parse_titles_lines():
+    """
+    Tests that plain lists keep commas inside titles and skip blank lines.
+    """
+    text = "Inception\n\nCrouching Tiger, Hidden Dragon\n"
+    assert parse_titles(text) == [(1, "Inception"), (3, "Crouching Tiger, Hidden Dragon")]
+
+
+def test_parse_titles_csv():
+    """
+    Tests that CSV files are detected by their "title" header and empty cells are reported.
+    """
+    text = 'year,Title\n2010,Inception\n1999,"The Matrix"\n2000,\n'
+    assert parse_titles(text) == [(2, "Inception"), (3, "The Matrix"), (4, "")]
+
+
+def test_import_movies_in_chunks(app):
+    """
+    Tests that titles are imported chunk by chunk with per-row errors and progress reports.
+
+    Asserts:
+        Found movies are inserted, missing and empty titles are reported with their line,
+        and progress is reported once per chunk.
+    """
+    user = User(name="Importer")
+    db.session.add(user)
+    db.session.commit()
+
+    titles = [(1, "A"), (2, "missing B"), (3, ""), (4, "C"), (5, "D")]
+    progress = []
+
+    with patch("catalog.fetch_many", side_effect=fake_fetch_many) as mock_fetch:
+        result = import_movies(user.id, titles, chunk_size=2,
+                               progress=lambda done, total: progress.append((done, total)))
+
+    assert result.added == 3
+    assert db.session.get(User, user.id).movie_count == 3
+    assert [(error.line, error.reason) for error in result.errors] == [
+        (2, "Movie not found in OMDb."), (3, "Empty title.")]
+    assert progress == [(2, 5), (4, 5), (5, 5)]
+    assert mock_fetch.call_count == 3
+    movies = Movie.query.filter_by(user_id=user.id).all()
+    assert sorted(movie.name for movie in movies) == ["A", "C", "D"]
+    assert all(movie.poster is None and movie.poster_url == "url" for movie in movies)
+
+
+def test_import_reuses_catalog(app):
+    """
+    Tests that a second import of the same titles is resolved from the catalog without OMDb.
+    """
+    user = User(name="Importer")
+    db.session.add(user)
+    db.session.commit()
+
+    with patch("catalog.fetch_many", side_effect=fake_fetch_many) as mock_fetch:
+        import_movies(user.id, [(1, "A"), (2, "B")])
+        result = import_movies(user.id, [(1, "a"), (2, "B"), (3, "C")])
+
+    assert result.added == 3
+    assert mock_fetch.call_count == 2
+    assert mock_fetch.call_args[0][0] == ["C"]
+
+
+def test_import_reports_failed_lookups_per_title(app):
+    """
+    Tests that a failing lookup is reported for its own row while the rest of the chunk is imported.
+    """
+    user = User(name="Importer")
+    db.session.add(user)
+    db.session.commit()
+
+    with patch("catalog.fetch_many", side_effect=fake_fetch_many):
+        result = import_movies(user.id, [(1, "A"), (2, "broken B"), (3, "C")])
+
+    assert result.added == 2
+    assert result.errors == [RowError(2, "broken B", "OMDb lookup failed: connection reset")]
+
+
+def test_import_reports_database_errors_during_lookup(app):
+    """
+    Tests that a database error while resolving a chunk is reported as such, not as "not found".
+    """
+    user = User(name="Importer")
+    db.session.add(user)
+    db.session.commit()
+
+    with patch("movie_import.lookup_movies", side_effect=OperationalError("SELECT", {}, Exception("locked"))):
+        result = import_movies(user.id, [(1, "A"), (2, "B")])
+
+    assert result.added == 0
+    assert [error.reason for error in result.errors] == ["Database error during lookup: OperationalError."] * 2
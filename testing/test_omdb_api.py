@@ -1,7 +1,26 @@
+import json
+import threading
+import time
 import pytest
 import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch
-from omdb_api import fetch_movie_data
+from urllib.parse import parse_qs, urlparse
+import omdb_api
+from omdb_api import fetch_movie_data, fetch_many, OMDbClient
+from omdb_cache import MovieCache
+
+
+@pytest.fixture(autouse=True)
+def api_key_and_empty_cache():
+    """
+    Provides a dummy API key and an empty OMDb cache for every test, so that
+    results cached by one test cannot leak into another.
+    """
+    omdb_api.get_cache().clear()
+    with patch.object(omdb_api, "API_KEY", "test-key"):
+        yield
+    omdb_api.get_cache().clear()
 
 
 @pytest.fixture
@@ -41,7 +60,7 @@ def test_fetch_movie_data_success(mock_valid_response):
         The result of `fetch_movie_data` is not `None` and contains the expected
         movie data (title, year, rating, poster).
     """
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = mock_valid_response
 
@@ -66,7 +85,7 @@ def test_fetch_movie_data_movie_not_found(mock_invalid_response):
     Asserts:
         The error message "Movie not found" is printed and the result is `None`.
     """
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = mock_invalid_response
 
@@ -87,9 +106,344 @@ def test_fetch_movie_data_api_error():
     Asserts:
         The error message "Request error" is printed and the result is `None`.
     """
-    with patch("requests.get") as mock_get:
+    with patch("requests.Session.get") as mock_get:
         mock_get.side_effect = requests.exceptions.RequestException("API request error")
 
         result = fetch_movie_data("Inception")
 
         assert result is None
+
+
+def test_parse_movie_response_tolerates_missing_fields():
+    """
+    Tests that series year ranges and "N/A" values are parsed instead of raising.
+
+    Asserts:
+        A year range resolves to its first year and "N/A" fields to None.
+    """
+    result = omdb_api.parse_movie_response({"Response": "True", "Title": "Sherlock", "Year": "2010–2017",
+                                            "imdbRating": "N/A", "Director": "N/A", "Poster": "N/A"})
+
+    assert result["year"] == 2010
+    assert result["rating"] is None
+    assert result["director"] is None
+    assert omdb_api.parse_year("N/A") is None
+    assert omdb_api.parse_year("2021–") == 2021
+
+
+def test_fetch_movie_data_invalid_json():
+    """
+    Tests that a response body that is not valid JSON is treated like a failed request.
+
+    Asserts:
+        The result is `None` instead of an exception.
+    """
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.side_effect = ValueError("Expecting value")
+
+        assert fetch_movie_data("Inception") is None
+
+
+def test_fetch_movie_data_uses_cache(mock_valid_response):
+    """
+    Tests that a second lookup of the same title is answered from the cache.
+
+    Asserts:
+        OMDb is only requested once, even when the title differs in case and spacing,
+        and the cache reports one miss and one hit.
+    """
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = mock_valid_response
+
+        first = fetch_movie_data("Inception")
+        second = fetch_movie_data("  inception ")
+
+        assert first == second
+        assert mock_get.call_count == 1
+        assert omdb_api.cache_stats()["hits"] == 1
+        assert omdb_api.cache_stats()["misses"] == 1
+
+
+def test_fetch_movie_data_caches_not_found(mock_invalid_response):
+    """
+    Tests that a "not found" answer is cached as well.
+
+    Asserts:
+        OMDb is only requested once and the second lookup counts as a negative hit.
+    """
+    with patch("requests.Session.get") as mock_get:
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = mock_invalid_response
+
+        assert fetch_movie_data("NonExistentMovie") is None
+        assert fetch_movie_data("NonExistentMovie") is None
+        assert mock_get.call_count == 1
+        assert omdb_api.cache_stats()["negative_hits"] == 1
+
+
+def test_fetch_movie_data_does_not_cache_errors():
+    """
+    Tests that failed requests are not cached.
+
+    Asserts:
+        OMDb is requested again after a request error.
+    """
+    with patch("requests.Session.get") as mock_get:
+        mock_get.side_effect = requests.exceptions.RequestException("API request error")
+
+        fetch_movie_data("Inception")
+        fetch_movie_data("Inception")
+
+        assert mock_get.call_count == 2
+
+
+class StubOMDbHandler(BaseHTTPRequestHandler):
+    """
+    Answers OMDb requests from the list of (status, body, delay) tuples on the server,
+    repeating the last one once the list is exhausted.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.client_ports.add(self.client_address[1])
+        if server.responses:
+            status, body, delay = server.responses[min(server.request_count, len(server.responses) - 1)]
+        else:
+            status, body, delay = echo_response(self.path)
+        server.request_count += 1
+        time.sleep(delay)
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def echo_response(path):
+    """
+    Builds a stub answer that echoes the requested title back, used when no fixed responses are set.
+    Titles starting with "missing" are reported as not found and titles starting with "slow" take 1s.
+    """
+    title = parse_qs(urlparse(path).query)["t"][0]
+    delay = 1 if title.startswith("slow") else 0.2
+    if title.startswith("missing"):
+        return 200, {"Response": "False", "Error": "Movie not found!"}, delay
+    return 200, {"Response": "True", "Title": title, "Year": "2000", "imdbRating": "7.0", "Poster": "N/A"}, delay
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Starts a local HTTP server standing in for OMDb.
+
+    Returns:
+        ThreadingHTTPServer: The running server; tests set its `responses` list.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOMDbHandler)
+    server.responses = []
+    server.request_count = 0
+    server.client_ports = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    """
+    Creates an OMDbClient talking to the stub server with its own empty cache.
+    """
+    kwargs.setdefault("backoff_factor", 0)
+    kwargs.setdefault("backoff_jitter", 0)
+    return OMDbClient(api_key="test-key", base_url=f"http://127.0.0.1:{server.server_port}/",
+                      movie_cache=MovieCache(), **kwargs)
+
+
+def test_client_reuses_connection(stub_server, mock_valid_response, mock_invalid_response):
+    """
+    Tests that consecutive lookups share one pooled keep-alive connection.
+
+    Asserts:
+        Both requests reach the server from the same client port.
+    """
+    stub_server.responses = [(200, mock_valid_response, 0), (200, mock_invalid_response, 0)]
+    client = make_client(stub_server)
+
+    assert client.fetch_movie("Inception")["title"] == "Inception"
+    assert client.fetch_movie("NonExistentMovie") is None
+    assert stub_server.request_count == 2
+    assert len(stub_server.client_ports) == 1
+    client.close()
+
+
+def test_client_retries_server_errors(stub_server, mock_valid_response):
+    """
+    Tests that 429 and 5xx responses are retried.
+
+    Asserts:
+        The lookup succeeds after a 503 and a 429 response.
+    """
+    stub_server.responses = [(503, {}, 0), (429, {}, 0), (200, mock_valid_response, 0)]
+    client = make_client(stub_server, retries=3)
+
+    assert client.fetch_movie("Inception")["title"] == "Inception"
+    assert stub_server.request_count == 3
+    client.close()
+
+
+def test_client_gives_up_after_retries(stub_server):
+    """
+    Tests that the client returns None once all retries are used up.
+
+    Asserts:
+        The server is asked `retries + 1` times and the result is not cached.
+    """
+    stub_server.responses = [(500, {}, 0)]
+    client = make_client(stub_server, retries=2)
+
+    assert client.fetch_movie("Inception") is None
+    assert stub_server.request_count == 3
+    assert client.cache.stats()["size"] == 0
+    client.close()
+
+
+def test_client_records_timing(stub_server, mock_valid_response, monkeypatch):
+    """
+    Tests that OMDb requests are timed by response status and cache lookups are counted.
+
+    Asserts:
+        One request is observed with outcome "200", and one miss and one hit are counted.
+    """
+    monkeypatch.setattr(omdb_api.registry, "enabled", True)
+    stub_server.responses = [(200, mock_valid_response, 0)]
+    client = make_client(stub_server)
+    requests_before = omdb_api.OMDB_SECONDS.count(outcome="200")
+    hits_before = omdb_api.OMDB_CACHE_LOOKUPS.value(result="hit")
+
+    client.fetch_movie("Inception")
+    client.fetch_movie("Inception")
+    assert omdb_api.OMDB_SECONDS.count(outcome="200") == requests_before + 1
+    assert omdb_api.OMDB_CACHE_LOOKUPS.value(result="hit") == hits_before + 1
+    client.close()
+
+
+def test_client_skips_metrics_when_disabled(stub_server, mock_valid_response, monkeypatch):
+    """
+    Tests that lookups record nothing while metrics are not enabled.
+    """
+    monkeypatch.setattr(omdb_api.registry, "enabled", False)
+    stub_server.responses = [(200, mock_valid_response, 0)]
+    client = make_client(stub_server)
+    requests_before = omdb_api.OMDB_SECONDS.count(outcome="200")
+    lookups_before = omdb_api.OMDB_CACHE_LOOKUPS.value(result="miss")
+
+    client.fetch_movie("Inception")
+    assert omdb_api.OMDB_SECONDS.count(outcome="200") == requests_before
+    assert omdb_api.OMDB_CACHE_LOOKUPS.value(result="miss") == lookups_before
+    client.close()
+
+
+def test_client_read_timeout(stub_server, mock_valid_response):
+    """
+    Tests that a slow OMDb cannot block the caller longer than the read timeout.
+
+    Asserts:
+        The lookup returns None well before the stub server would have answered.
+    """
+    stub_server.responses = [(200, mock_valid_response, 2)]
+    client = make_client(stub_server, read_timeout=0.2, retries=0)
+
+    started = time.monotonic()
+    assert client.fetch_movie("Inception") is None
+    assert time.monotonic() - started < 1.5
+    client.close()
+
+
+def test_fetch_many_runs_concurrently_and_keeps_order(stub_server):
+    """
+    Tests that `fetch_many` resolves titles concurrently and returns them in input order.
+
+    Asserts:
+        Ten lookups of 0.2s each finish in well under their serial time, results line up
+        with the input, and duplicate titles are only requested once.
+    """
+    client = make_client(stub_server, pool_size=10)
+    titles = [f"Movie {i}" for i in range(10)] + ["missing one", "movie 3"]
+
+    started = time.monotonic()
+    results = fetch_many(titles, concurrency=10, client=client)
+
+    assert time.monotonic() - started < 1.5
+    assert [result["title"] for result in results[:10]] == titles[:10]
+    assert results[10] is None
+    assert results[11]["title"] == "Movie 3"
+    assert stub_server.request_count == 11
+    client.close()
+
+
+def test_fetch_many_respects_concurrency_limit(stub_server):
+    """
+    Tests that no more than `concurrency` lookups are in flight at once.
+
+    Asserts:
+        Four lookups of 0.2s with a limit of two take at least two rounds.
+    """
+    client = make_client(stub_server)
+
+    started = time.monotonic()
+    results = fetch_many(["A", "B", "C", "D"], concurrency=2, client=client)
+
+    assert time.monotonic() - started >= 0.4
+    assert [result["title"] for result in results] == ["A", "B", "C", "D"]
+    client.close()
+
+
+def test_fetch_many_per_request_timeout(stub_server):
+    """
+    Tests that a single slow lookup is given up after `timeout` without failing the others.
+
+    Asserts:
+        The slow title resolves to None while the fast one succeeds.
+    """
+    client = make_client(stub_server, retries=0)
+
+    results = fetch_many(["slow title", "fast title"], concurrency=2, timeout=0.5, client=client)
+
+    assert results[0] is None
+    assert results[1]["title"] == "fast title"
+    client.close()
+
+
+def test_fetch_many_isolates_failed_lookups(stub_server, caplog):
+    """
+    Tests that a lookup raising an exception only fails its own title.
+
+    Asserts:
+        The failing title resolves to None, or to its exception with `return_exceptions`,
+        while the other titles are still returned, and the failure is logged.
+    """
+    client = make_client(stub_server)
+    fetch_movie = client.fetch_movie
+
+    def failing_fetch(title):
+        if title == "broken":
+            raise RuntimeError("boom")
+        return fetch_movie(title)
+
+    with patch.object(client, "fetch_movie", side_effect=failing_fetch):
+        results = fetch_many(["A", "broken", "B"], client=client)
+        with_errors = fetch_many(["A", "broken"], client=client, return_exceptions=True)
+
+    assert results[0]["title"] == "A" and results[1] is None and results[2]["title"] == "B"
+    assert with_errors[0]["title"] == "A"
+    assert isinstance(with_errors[1], RuntimeError)
+    assert "Request error: lookup of 'broken' failed: boom" in caplog.text
+    client.close()
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import tempfile
+import pytest
+from unittest.mock import patch
+from omdb_cache import MovieCache, MISS, normalize_title
+
+
+class FakeClock:
+    """
+    A manually advanced clock used to test expiry without sleeping.
+    """
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def db_path():
+    """
+    Provides the path of a temporary SQLite file for the persistent cache tier.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
+        path = tmp.name
+    yield path
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def test_normalize_title():
+    """
+    Tests that titles differing only in case and whitespace share one key.
+    """
+    assert normalize_title("  The   Matrix ") == normalize_title("the matrix")
+
+
+def test_entries_expire_after_ttl(clock):
+    """
+    Tests that found movies expire after `ttl` and "not found" answers after `negative_ttl`.
+    """
+    cache = MovieCache(ttl=100, negative_ttl=10, clock=clock)
+    cache.set("Inception", {"title": "Inception"})
+    cache.set("Unknown", None)
+
+    clock.now += 11
+    assert cache.get("Inception") == {"title": "Inception"}
+    assert cache.get("Unknown") is MISS
+
+    clock.now += 100
+    assert cache.get("Inception") is MISS
+
+
+def test_lru_eviction(clock):
+    """
+    Tests that the least recently used entry is evicted once `max_size` is exceeded.
+    """
+    cache = MovieCache(max_size=2, clock=clock)
+    cache.set("A", {"title": "A"})
+    cache.set("B", {"title": "B"})
+    cache.get("A")
+    cache.set("C", {"title": "C"})
+
+    assert cache.get("B") is MISS
+    assert cache.get("A") == {"title": "A"}
+    assert cache.get("C") == {"title": "C"}
+
+
+def test_sqlite_tier_is_shared(clock, db_path):
+    """
+    Tests that entries written by one cache instance are found by another using the same file,
+    as happens after a restart or in a different worker process.
+    """
+    writer = MovieCache(db_path=db_path, clock=clock)
+    writer.set("Inception", {"title": "Inception", "year": 2010})
+    writer.set("Unknown", None)
+
+    reader = MovieCache(db_path=db_path, clock=clock)
+    assert reader.get("inception") == {"title": "Inception", "year": 2010}
+    assert reader.get("Unknown") is None
+    assert reader.stats()["db_hits"] == 2
+
+
+def test_stats_and_clear(clock, db_path):
+    """
+    Tests the hit and miss counters and that `clear` empties both tiers.
+    """
+    cache = MovieCache(db_path=db_path, clock=clock)
+    cache.get("Inception")
+    cache.set("Inception", {"title": "Inception"})
+    cache.get("Inception")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["size"] == 1
+
+    cache.clear()
+    assert cache.get("Inception") is MISS
+    assert MovieCache(db_path=db_path, clock=clock).get("Inception") is MISS
+
+
+def test_sqlite_connections_are_closed(clock, db_path):
+    """
+    Tests that every connection to the SQLite tier is closed once its operation is done.
+    """
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    with patch("data.sqlite_tuning.sqlite3.connect", side_effect=connect):
+        cache = MovieCache(db_path=db_path, clock=clock)
+        cache.set("Inception", {"title": "Inception"})
+        MovieCache(db_path=db_path, clock=clock).get("Inception")
+        cache.clear()
+
+    assert opened
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
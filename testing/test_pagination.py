@@ -0,0 +1,134 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import select, text
+from data.database import db, User, Movie, CatalogMovie
+from data.pagination import encode_cursor, decode_cursor, paginate_movies
+from data_manager import SQLiteDataManager
+
+
+@pytest.fixture
+def data_manager():
+    """
+    Creates an SQLiteDataManager on a temporary database with one user and eleven movies,
+    two of which have no year, to exercise NULL handling.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
+        db_path = tmp.name
+
+    manager = SQLiteDataManager(db_path)
+    db.metadata.create_all(manager.engine)
+    session = manager.Session()
+    session.add(User(id=1, name="Collector"))
+    years = [1999, 2010, None, 1999, 2005, 2010, None, 1980, 2020, 1999, 2005]
+    session.add_all([Movie(name=f"Movie {chr(75 - i)}", director="Unknown", year=year,
+                           rating=float(i % 4), user_id=1) for i, year in enumerate(years)])
+    session.commit()
+    session.close()
+
+    yield manager
+
+    manager.engine.dispose()
+    os.remove(db_path)
+
+
+def expected_order(manager, sort, direction):
+    """
+    Returns the movie IDs in the order SQLite sorts them, with NULLs first ascending and last descending.
+    """
+    movies = manager.get_user_movies(1, sort=sort, direction=direction)
+    return [movie.id for movie in movies]
+
+
+def walk_pages(manager, sort, direction, limit):
+    """
+    Collects the movie IDs of all pages by following the cursors.
+    """
+    ids, cursor = [], None
+    while True:
+        page = manager.get_user_movies(1, sort=sort, direction=direction, cursor=cursor, limit=limit)
+        assert len(page) <= limit
+        ids.extend(movie.id for movie in page)
+        cursor = page.next_cursor
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("sort", ["name", "year", "rating"])
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_pages_cover_all_movies_in_order(data_manager, sort, direction):
+    """
+    Tests that following the cursors yields every movie exactly once in sort order,
+    including ties and NULL values.
+    """
+    full = expected_order(data_manager, sort, direction)
+    assert len(full) == 11
+    assert walk_pages(data_manager, sort, direction, limit=3) == full
+
+
+def test_sort_order_with_nulls(data_manager):
+    """
+    Tests that movies without a year come first ascending and last descending, ties broken by ID.
+    """
+    ascending = data_manager.get_user_movies(1, sort="year")
+    assert [movie.year for movie in ascending][:4] == [None, None, 1980, 1999]
+    descending = data_manager.get_user_movies(1, sort="year", direction="desc")
+    assert [movie.year for movie in descending][-2:] == [None, None]
+
+
+def test_last_page_has_no_cursor(data_manager):
+    """
+    Tests that a page holding the remaining movies has no next cursor.
+    """
+    assert data_manager.get_user_movies(1, limit=11).next_cursor is None
+    assert data_manager.get_user_movies(1, limit=10).next_cursor is not None
+
+
+def test_cursor_round_trip():
+    """
+    Tests that cursors decode to the encoded values and malformed cursors are rejected.
+    """
+    assert decode_cursor(encode_cursor("Movie A", 5)) == ("Movie A", 5)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_invalid_sort_key(data_manager):
+    """
+    Tests that unknown sort keys are rejected.
+    """
+    with pytest.raises(ValueError):
+        data_manager.get_user_movies(1, sort="poster")
+
+
+def test_sort_follows_catalog_values(data_manager):
+    """
+    Tests that movies linked to the catalog are sorted by the catalog's values, including after the
+    catalog entry is refreshed, unless the user overrides them.
+    """
+    session = data_manager.Session()
+    session.add(CatalogMovie(imdb_id="tt0113277", title="Heat", title_key="heat", year=1995, rating=8.3))
+    session.add_all([Movie(user_id=1, imdb_id="tt0113277"), Movie(user_id=1, imdb_id="tt0113277", rating=1.5)])
+    session.commit()
+    session.get(CatalogMovie, "tt0113277").rating = 10.0
+    session.commit()
+    session.close()
+
+    by_rating = data_manager.get_user_movies(1, sort="rating", direction="desc")
+    assert [movie.rating for movie in by_rating][:2] == [10.0, 3.0]
+    assert 1.5 in [movie.rating for movie in by_rating]
+    assert "Heat" in [movie.name for movie in data_manager.get_user_movies(1, sort="name")]
+
+
+@pytest.mark.parametrize("sort", ["name", "year", "rating"])
+def test_page_query_uses_sort_index(data_manager, sort):
+    """
+    Tests that a sorted page is read from the (user_id, sort column) index instead of sorting the collection.
+    """
+    statement = paginate_movies(select(Movie.id, Movie.name).where(Movie.user_id == 1), sort=sort, direction="desc")
+    sql = str(statement.compile(data_manager.engine, compile_kwargs={"literal_binds": True}))
+    with data_manager.engine.connect() as connection:
+        plan = " ".join(row[-1] for row in connection.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+    assert f"ix_user_movies_user_id_sort_{sort}" in plan
+    assert "TEMP B-TREE" not in plan
@@ -0,0 +1,122 @@
+import io
+import os
+import sqlite3
+import pytest
+from unittest.mock import MagicMock, patch
+import requests
+from posters import PosterStore, snap_width, url_version, make_thumbnail
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def jpeg(width, height, color="red"):
+    """
+    Creates a JPEG image of the given size.
+
+    Returns:
+        bytes: The encoded image.
+    """
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(output, "JPEG")
+    return output.getvalue()
+
+
+def fake_session(images):
+    """
+    Creates a requests session stub that answers poster URLs from a dictionary.
+
+    Args:
+        images (dict): Maps URLs to image bytes; other URLs fail with 404.
+
+    Returns:
+        MagicMock: The session stub, recording its calls.
+    """
+    def get(url, timeout):
+        response = MagicMock()
+        if url not in images:
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError("404")
+        response.content = images.get(url)
+        response.headers = {"Content-Type": "image/jpeg"}
+        return response
+
+    session = MagicMock()
+    session.get.side_effect = get
+    return session
+
+
+def test_snap_width_and_version():
+    """
+    Tests rounding of requested widths and the poster URL fingerprint.
+    """
+    assert [snap_width(width) for width in (None, 10, 150, 151, 5000)] == [300, 150, 150, 300, 600]
+    assert url_version("https://example.com/a.jpg") != url_version("https://example.com/b.jpg")
+    assert len(url_version("https://example.com/a.jpg")) == 8
+
+
+def test_make_thumbnail_scales_down_only():
+    """
+    Tests that large images are scaled to the width and small ones keep their size.
+    """
+    data, extension = make_thumbnail(jpeg(1000, 1500), 300)
+    assert extension == "jpg"
+    assert Image.open(io.BytesIO(data)).size == (300, 450)
+    assert Image.open(io.BytesIO(make_thumbnail(jpeg(100, 150), 300)[0])).size == (100, 150)
+
+
+def test_store_downloads_once_and_deduplicates(tmp_path):
+    """
+    Tests that a poster is downloaded once per width and identical images share one file.
+    """
+    image = jpeg(1000, 1500)
+    session = fake_session({"https://a/1.jpg": image, "https://b/1.jpg": image})
+    store = PosterStore(str(tmp_path), session=session)
+
+    path, content_type = store.get("https://a/1.jpg", 300)
+    assert content_type == "image/jpeg" and os.path.exists(path)
+    assert store.get("https://a/1.jpg", 300)[0] == path
+    assert store.get("https://b/1.jpg", 300)[0] == path
+    assert session.get.call_count == 2
+    assert store.stats()["files"] == 1
+
+    assert store.get("https://a/missing.jpg", 300) is None
+
+
+def test_store_closes_index_connections(tmp_path):
+    """
+    Tests that every connection to the poster index is closed once its operation is done.
+    """
+    opened = []
+    real_connect = sqlite3.connect
+
+    def connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+
+    with patch("data.sqlite_tuning.sqlite3.connect", side_effect=connect):
+        store = PosterStore(str(tmp_path), session=fake_session({"https://a/1.jpg": jpeg(400, 600)}))
+        store.get("https://a/1.jpg", 300)
+        store.stats()
+
+    assert opened
+    for connection in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    """
+    Tests that the size cap removes the least recently served thumbnails first.
+    """
+    images = {f"https://a/{color}.jpg": jpeg(600, 900, color) for color in ("red", "green", "blue")}
+    store = PosterStore(str(tmp_path), session=fake_session(images))
+    sizes = [len(make_thumbnail(image, 150)[0]) for image in images.values()]
+    store.max_bytes = sizes[0] + sizes[1] + sizes[2] - 1
+
+    red = store.get("https://a/red.jpg", 150)[0]
+    green = store.get("https://a/green.jpg", 150)[0]
+    store.get("https://a/red.jpg", 150)
+    store.get("https://a/blue.jpg", 150)
+
+    assert os.path.exists(red)
+    assert not os.path.exists(green)
+    assert store.stats()["files"] == 2
@@ -0,0 +1,153 @@
+import json
+import os
+import pstats
+import time
+import pytest
+from flask import Flask, render_template_string
+from sqlalchemy import create_engine, text
+from profiling import init_profiling, record_profile_error, prune_profiles
+
+TOKEN = "secret-token"
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Fixture that creates a Flask app with profiling enabled, an in-memory SQLite engine and
+    routes that run queries, render a template, idle for a while and fail.
+
+    Returns:
+        Flask: The app.
+    """
+    app = Flask(__name__)
+    app.config.update(PROFILE_TOKEN=TOKEN, PROFILE_DIR=str(tmp_path / "profiles"), PROFILE_RETENTION=3,
+                      PROFILE_SAMPLE_INTERVAL_MS=1)
+    engine = create_engine("sqlite://")
+
+    @app.route("/items/<int:count>")
+    def items(count):
+        with engine.connect() as connection:
+            values = [connection.execute(text("SELECT :item"), {"item": item}).scalar() for item in range(count)]
+        return render_template_string("{% for value in values %}{{ value }} {% endfor %}", values=values)
+
+    @app.route("/slow")
+    def slow():
+        time.sleep(0.05)
+        return "done"
+
+    @app.route("/fail")
+    def fail():
+        raise RuntimeError("boom")
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        record_profile_error(error)
+        return "error", 500
+
+    init_profiling(app, engines=(engine,))
+    return app
+
+
+def test_profiles_request_with_token(app):
+    """
+    Tests that a request with the token is profiled with its SQL and template rendering and that
+    requests without it, or with a wrong token, are not.
+    """
+    client = app.test_client()
+    assert "X-Profile-Id" not in client.get("/items/2").headers
+    assert "X-Profile-Id" not in client.get("/items/2", headers={"X-Profile": "wrong"}).headers
+
+    response = client.get("/items/3", headers={"X-Profile": TOKEN})
+    profile_id = response.headers["X-Profile-Id"]
+    assert response.headers["X-Profile-Url"] == f"/admin/profiles/{profile_id}/download"
+
+    directory = app.config["PROFILE_DIR"]
+    with open(os.path.join(directory, f"{profile_id}.json")) as file:
+        metadata = json.load(file)
+    assert metadata["endpoint"] == "items"
+    assert metadata["status"] == 200
+    assert metadata["sql"]["count"] == 3
+    assert metadata["sql"]["statements"][0]["statement"] == "SELECT ?"
+    assert len(metadata["templates"]) == 1
+
+    stats = pstats.Stats(os.path.join(directory, f"{profile_id}.pstats"))
+    assert any(function[2] == "items" for function in stats.stats)
+
+
+def test_sampling_profile(app):
+    """
+    Tests that the sample mode writes collapsed stacks that include the view.
+    """
+    client = app.test_client()
+    response = client.get("/slow", headers={"X-Profile": TOKEN, "X-Profile-Mode": "sample"})
+    profile_id = response.headers["X-Profile-Id"]
+
+    with open(os.path.join(app.config["PROFILE_DIR"], f"{profile_id}.collapsed")) as file:
+        lines = file.read().splitlines()
+    assert lines and all(line.rpartition(" ")[2].isdigit() for line in lines)
+    assert any("slow (test_profiling.py" in line for line in lines)
+
+    summary = client.get(f"/admin/profiles/{profile_id}/summary", headers={"X-Profile": TOKEN})
+    assert "sleep" in summary.text or "slow" in summary.text
+
+
+def test_token_in_query_string_is_ignored(app):
+    """
+    Tests that the token is only accepted as a header, not in the query string.
+    """
+    client = app.test_client()
+    assert "X-Profile-Id" not in client.get(f"/items/1?_profile={TOKEN}").headers
+    assert client.get(f"/admin/profiles?token={TOKEN}").status_code == 403
+
+
+def test_failed_request_keeps_error(app):
+    """
+    Tests that a request failing with a 500 is profiled with its exception.
+    """
+    response = app.test_client().get("/fail", headers={"X-Profile": TOKEN})
+    assert response.status_code == 500
+    metadata = app.test_client().get(f"/admin/profiles/{response.headers['X-Profile-Id']}",
+                                     headers={"X-Profile": TOKEN}).json
+    assert metadata["status"] == 500
+    assert metadata["error"] == "RuntimeError: boom"
+
+
+def test_admin_routes_and_retention(app):
+    """
+    Tests that profiles are listed and downloaded with the token only and that old ones are pruned.
+    """
+    client = app.test_client()
+    ids = [client.get("/items/1", headers={"X-Profile": TOKEN}).headers["X-Profile-Id"] for _ in range(5)]
+
+    assert client.get("/admin/profiles").status_code == 403
+    listed = client.get("/admin/profiles", headers={"X-Profile": TOKEN}).json
+    assert sorted(profile["id"] for profile in listed) == sorted(ids[-3:])
+
+    headers = {"X-Profile": TOKEN}
+    download = client.get(f"/admin/profiles/{ids[-1]}/download", headers=headers)
+    assert download.status_code == 200
+    assert "attachment" in download.headers["Content-Disposition"]
+    assert client.get(f"/admin/profiles/{ids[0]}/download", headers=headers).status_code == 404
+    assert client.get("/admin/profiles/..%2Fsecret/download", headers=headers).status_code == 404
+    assert "cumulative" in client.get(f"/admin/profiles/{ids[-1]}/summary", headers=headers).text
+
+
+def test_prune_profiles(tmp_path):
+    """
+    Tests that pruning deletes the oldest profiles with their data files.
+    """
+    for index, profile_id in enumerate(["20240101T000000-00000001", "20240101T000001-00000002"]):
+        (tmp_path / f"{profile_id}.json").write_text("{}")
+        (tmp_path / f"{profile_id}.pstats").write_text("")
+        os.utime(tmp_path / f"{profile_id}.json", (index, index))
+    assert prune_profiles(str(tmp_path), 1) == 1
+    assert sorted(os.listdir(tmp_path)) == ["20240101T000001-00000002.json", "20240101T000001-00000002.pstats"]
+
+
+def test_profiling_disabled():
+    """
+    Tests that nothing is registered without a PROFILE_TOKEN.
+    """
+    app = Flask(__name__)
+    init_profiling(app)
+    assert app.test_client().get("/admin/profiles", headers={"X-Profile": ""}).status_code == 404
@@ -0,0 +1,71 @@
+from data.database import db, User, Movie
+from data.search import build_match_query, search_statement
+
+
+def search(user_id, query):
+    """
+    Runs a search and returns the names of the matching movies in ranked order.
+    """
+    statement = search_statement(user_id, query)
+    return [row.name for row in db.session.execute(statement)] if statement is not None else []
+
+
+def test_build_match_query():
+    """
+    Tests that user input becomes a prefix query restricted to one user.
+
+    Asserts:
+        Words are quoted prefix terms, FTS5 syntax is dropped and empty input gives no query.
+    """
+    assert build_match_query(7, 'star "wa') == 'user_id : 7 AND {name director} : ("star"* "wa"*)'
+    assert build_match_query(7, "  -*()  ") is None
+    assert build_match_query(7, None) is None
+
+
+def test_search_ranks_prefix_matches_of_one_user(app):
+    """
+    Tests prefix matching, ranking and that other users' movies are not returned.
+
+    Asserts:
+        A name match ranks above a director match, and all words must match.
+    """
+    user, other = User(name="John Doe"), User(name="Jane Doe")
+    db.session.add_all([user, other])
+    db.session.flush()
+    db.session.add_all([
+        Movie(name="Lost Highway", director="David Lynch", user_id=user.id),
+        Movie(name="Blue Velvet", director="Lost Lynch", user_id=user.id),
+        Movie(name="Heat", director="Michael Mann", user_id=user.id),
+        Movie(name="Lost in Translation", director="Sofia Coppola", user_id=other.id),
+    ])
+    db.session.commit()
+
+    assert search(user.id, "los") == ["Lost Highway", "Blue Velvet"]
+    assert search(user.id, "lost lyn") == ["Lost Highway", "Blue Velvet"]
+    assert search(user.id, "lost heat") == []
+    assert search(other.id, "lost") == ["Lost in Translation"]
+
+
+def test_search_index_follows_changes(app):
+    """
+    Tests that the triggers keep the index in sync with updates and deletions.
+
+    Asserts:
+        Renamed movies are found by their new name only, deleted movies not at all.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.flush()
+    heat = Movie(name="Heat", director="Michael Mann", user_id=user.id)
+    collateral = Movie(name="Collateral", director="Michael Mann", user_id=user.id)
+    db.session.add_all([heat, collateral])
+    db.session.commit()
+
+    heat.name = "Thief"
+    db.session.commit()
+    assert search(user.id, "heat") == []
+    assert search(user.id, "thief") == ["Thief"]
+
+    db.session.delete(collateral)
+    db.session.commit()
+    assert search(user.id, "michael") == ["Thief"]
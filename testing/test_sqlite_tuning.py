@@ -0,0 +1,66 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, text
+from data.sqlite_tuning import apply_sqlite_profile, run_maintenance, DEFAULT_PROFILE
+
+
+@pytest.fixture
+def db_path():
+    """
+    Provides the path of a temporary SQLite file and removes it together with its WAL files.
+    """
+    with tempfile.NamedTemporaryFile(suffix='.sqlite', delete=False) as tmp:
+        path = tmp.name
+    yield path
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_default_profile_is_applied(db_path):
+    """
+    Tests that every connection of a tuned engine uses the PRAGMAs of the default profile.
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    apply_sqlite_profile(engine)
+
+    assert pragma(engine, "journal_mode") == "wal"
+    assert pragma(engine, "busy_timeout") == DEFAULT_PROFILE["busy_timeout"]
+    assert pragma(engine, "synchronous") == 1
+    assert pragma(engine, "cache_size") == DEFAULT_PROFILE["cache_size"]
+    assert pragma(engine, "temp_store") == 2
+    engine.dispose()
+
+
+def test_empty_profile_keeps_sqlite_defaults(db_path):
+    """
+    Tests that an empty profile leaves the connection untouched.
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    apply_sqlite_profile(engine, {})
+
+    assert pragma(engine, "journal_mode") == "delete"
+    engine.dispose()
+
+
+def test_run_maintenance_checkpoints_wal(db_path):
+    """
+    Tests that maintenance checkpoints all pages written to the WAL.
+    """
+    engine = create_engine(f"sqlite:///{db_path}")
+    apply_sqlite_profile(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE numbers (n INTEGER)"))
+        connection.execute(text("INSERT INTO numbers VALUES (1), (2), (3)"))
+
+    busy, log_pages, checkpointed = run_maintenance(engine)
+
+    assert busy == 0
+    assert log_pages == checkpointed
+    engine.dispose()
@@ -0,0 +1,79 @@
+import pytest
+from data.database import db, User, Movie
+from data.user_stats import refresh_user_stats, rebuild_user_stats
+
+
+def test_refresh_user_stats_follows_changes(app):
+    """
+    Tests that the aggregates follow adding, updating and deleting movies.
+
+    Asserts:
+        Count, average rating and latest addition are correct after each change,
+        and other users are not touched.
+    """
+    user, other = User(name="John Doe"), User(name="Jane Doe")
+    db.session.add_all([user, other])
+    db.session.flush()
+
+    top_gun = Movie(name="Top Gun", director="Tony Scott", rating=6.9, user_id=user.id)
+    heat = Movie(name="Heat", director="Michael Mann", rating=8.3, user_id=user.id)
+    db.session.add_all([top_gun, heat])
+    refresh_user_stats(db.session, user.id)
+    db.session.commit()
+
+    assert user.movie_count == 2
+    assert user.avg_rating == pytest.approx(7.6)
+    assert user.latest_added == max(top_gun.added_at, heat.added_at).replace(tzinfo=None)
+    assert (other.movie_count, other.avg_rating, other.latest_added) == (0, None, None)
+
+    heat.rating = 9.1
+    refresh_user_stats(db.session, user.id)
+    db.session.commit()
+    assert user.avg_rating == pytest.approx(8.0)
+
+    db.session.delete(top_gun)
+    db.session.delete(heat)
+    refresh_user_stats(db.session, user.id)
+    db.session.commit()
+    assert (user.movie_count, user.avg_rating, user.latest_added) == (0, None, None)
+
+
+def test_rebuild_user_stats(app):
+    """
+    Tests that rebuilding recomputes stale aggregates of all users.
+
+    Asserts:
+        Every user is updated and gets the count of the movies inserted behind its back.
+    """
+    user, other = User(name="John Doe", movie_count=5), User(name="Jane Doe", movie_count=5)
+    db.session.add_all([user, other])
+    db.session.flush()
+    db.session.add(Movie(name="Heat", director="Michael Mann", rating=8.3, user_id=user.id))
+    db.session.flush()
+
+    assert rebuild_user_stats(db.session) == 2
+    db.session.commit()
+
+    assert (user.movie_count, user.avg_rating) == (1, 8.3)
+    assert (other.movie_count, other.avg_rating) == (0, None)
+
+
+def test_refresh_user_stats_forgets_rolled_back_changes(app):
+    """
+    Tests that a user marked in a rolled back transaction is not refreshed by the next commit.
+
+    Asserts:
+        The version stamp stays the same.
+    """
+    user = User(name="John Doe")
+    db.session.add(user)
+    db.session.commit()
+    stamp = user.updated_at
+
+    db.session.add(Movie(name="Heat", director="Michael Mann", rating=8.3, user_id=user.id))
+    refresh_user_stats(db.session, user.id)
+    db.session.rollback()
+    db.session.commit()
+
+    db.session.refresh(user)
+    assert (user.movie_count, user.updated_at) == (0, stamp)
@@ -0,0 +1,652 @@
+import json
+from markupsafe import Markup
+from flask import Blueprint, Response, current_app, render_template, send_file, request, redirect, url_for, flash, \
+    jsonify, abort, make_response
+from sqlalchemy import select, func
+from sqlalchemy.exc import SQLAlchemyError
+from data.database import User, db, Movie, Job, CatalogMovie
+from data.user_stats import refresh_user_stats
+from data.rows import UserRow, MovieRow, user_rows_statement, movie_rows_statement
+from data.search import search_statement, DEFAULT_SEARCH_LIMIT, MAX_SEARCH_LIMIT
+from data.pagination import Page, paginate_movies, build_page, SORT_COLUMNS, DIRECTIONS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from catalog import lookup_movie, user_movie_fields
+from movie_import import parse_titles, import_movies, ImportResult
+from jobs import PENDING, RUNNING, DONE, FAILED
+from http_cache import make_etag, not_modified, with_validators
+from fragment_cache import user_group, invalidate_user_fragments
+from exporter import EXPORT_FORMATS, export_statement, iter_export
+from assets import BUNDLES
+from posters import snap_width, url_version
+from profiling import record_profile_error
+
+ASSET_MAX_AGE = 365 * 24 * 3600
+POSTER_MAX_AGE = 365 * 24 * 3600
+
+views = Blueprint("views", __name__)
+
+
+@views.app_template_global()
+def asset_url(name):
+    """
+    Returns the URL of a built asset bundle for templates, e.g. `asset_url('tailwind.css')`.
+
+    Bundles are served from their fingerprinted file in static/dist, which `flask build-assets` writes.
+
+    Args:
+        name (str): The bundle name.
+
+    Returns:
+        str: The URL of the asset.
+
+    Raises:
+        RuntimeError: If the bundle has not been built.
+    """
+    path = current_app.config['ASSET_MANIFEST'].get(name)
+    if path:
+        return url_for("static", filename=path)
+    if name in BUNDLES:
+        raise RuntimeError(f"Asset bundle '{name}' has not been built; run `flask build-assets`.")
+    return url_for("static", filename=name)
+
+
+@views.after_app_request
+def cache_fingerprinted_assets(response):
+    """
+    Lets browsers and proxies keep fingerprinted assets for a year without revalidating;
+    a new build has a new file name.
+
+    Args:
+        response (Response): The outgoing response.
+
+    Returns:
+        Response: The same response.
+    """
+    if request.endpoint == "static" and request.view_args.get("filename", "").startswith("dist/"):
+        response.cache_control.public = True
+        response.cache_control.max_age = ASSET_MAX_AGE
+        response.cache_control.immutable = True
+        response.cache_control.no_cache = None
+    return response
+
+
+@views.app_template_global()
+def poster_src(movie, width=None):
+    """
+    Returns the local URL of a movie's poster thumbnail for templates.
+
+    The URL contains a fingerprint of the remote poster URL, so it can be cached by browsers
+    for a year and still changes when the movie gets another poster.
+
+    Args:
+        movie (MovieRow): The movie, with its resolved `poster_url`.
+        width (int, optional): The thumbnail width; omitted for the default width.
+
+    Returns:
+        str or None: The local poster URL, or None if the movie has no poster.
+    """
+    if not movie.poster_url or not movie.poster_url.startswith(("http://", "https://")):
+        return None
+    return url_for("views.poster", movie_id=movie.id, version=url_version(movie.poster_url), w=width)
+
+
+def resolve_movie_job(job):
+    """
+    Background job that looks up a movie in OMDb and fills in its placeholder row.
+
+    If the movie is not found, or the lookup fails in any other way, the placeholder is removed
+    and the job fails with the error message.
+
+    Args:
+        job (Job): The job with the movie title as payload and the placeholder movie ID.
+    """
+    movie = db.session.get(Movie, job.movie_id)
+    if movie is None:
+        raise ValueError(f"Placeholder movie {job.movie_id} no longer exists.")
+
+    try:
+        movie_data = lookup_movie(job.payload)
+        if not movie_data:
+            raise ValueError(f"Movie '{job.payload}' not found in OMDb.")
+
+        for field, value in user_movie_fields(movie.user_id, movie_data).items():
+            setattr(movie, field, value)
+        refresh_user_stats(db.session, movie.user_id)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        remove_placeholder(job.movie_id)
+        raise
+    invalidate_user_fragments(movie.user_id)
+
+
+def import_movies_job(job):
+    """
+    Background job that imports a list of titles into a user's collection.
+
+    The number of processed titles is stored on the job after every chunk, so the import page
+    can show the progress, and the ImportResult as JSON once all titles are processed.
+
+    Args:
+        job (Job): The job with the JSON list of (line number, title) pairs as payload.
+    """
+    titles = [(line, title) for line, title in json.loads(job.payload)]
+
+    def report(processed, total):
+        job.progress = processed
+        job.total = total
+        db.session.commit()
+
+    result = import_movies(job.user_id, titles, progress=report)
+    job.result = result.to_json()
+    invalidate_user_fragments(job.user_id)
+
+
+def remove_placeholder(movie_id):
+    """
+    Deletes the placeholder movie of a failed job, so it does not stay in the collection.
+    Errors are logged rather than raised, so they do not hide the failure of the job.
+
+    Args:
+        movie_id (int): The ID of the placeholder movie.
+    """
+    try:
+        movie = db.session.get(Movie, movie_id)
+        if movie is not None:
+            db.session.delete(movie)
+            refresh_user_stats(db.session, movie.user_id)
+            db.session.commit()
+            invalidate_user_fragments(movie.user_id)
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error removing placeholder movie {movie_id}: {e}")
+
+
+@views.route('/')
+def home():
+    """
+    Route to render the homepage of the application.
+
+    This is the landing page users will see when they visit the root URL.
+
+    Returns:
+        str: Rendered HTML template of the home page (home.html).
+    """
+    return render_template('home.html')
+
+@views.route("/users")
+def list_users():
+    """
+    Route to list all users in the database.
+
+    It queries the database for the ID, name and movie count of all users and displays them on the users page.
+    If an error occurs during database interaction, an error message is shown.
+
+    The page is versioned by the number of users and their latest `updated_at`, so a browser
+    revalidating an unchanged page gets a 304 without the users being loaded or the template rendered.
+
+    Returns:
+        str: Rendered HTML template displaying all users (users.html).
+    """
+    try:
+        count, last_modified = db.session.execute(select(func.count(User.id), func.max(User.updated_at))).one()
+        etag = make_etag("users", current_app.config['TEMPLATES_VERSION'], count, last_modified)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+
+        users = [UserRow._make(row) for row in db.session.execute(user_rows_statement())]
+        return with_validators(make_response(render_template('users.html', users=users)), etag, last_modified)
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {e}")
+        flash("An error occurred while loading users.", "danger")
+        return redirect(url_for("views.home"))
+
+@views.route("/users/<int:user_id>")
+def user_movies(user_id):
+    """
+    Route to display the movies of a specific user.
+
+    This route takes a user ID, retrieves the corresponding user from the database,
+    and renders one page of the user's movie collection. If an error occurs, it redirects back to the user list.
+
+    The query parameters `sort` (name, year or rating), `dir` (asc or desc) and `size` select the order
+    and page size; `cursor` is the keyset cursor of the page to show, as linked from the previous page.
+
+    The page carries an ETag derived from the user's `updated_at`, its pending lookups and the query
+    parameters. A matching If-None-Match is answered with a 304 before the movies are loaded.
+    Otherwise the movie grid is taken from the fragment cache under the same key, so it is only
+    queried and rendered again after the user's movies changed.
+
+    Args:
+        user_id (int): The ID of the user whose movies are to be displayed.
+
+    Returns:
+        str: Rendered HTML template displaying the user's movies (user_movies.html).
+    """
+    sort = request.args.get("sort", "name")
+    sort = sort if sort in SORT_COLUMNS else "name"
+    direction = request.args.get("dir", "asc")
+    direction = direction if direction in DIRECTIONS else "asc"
+    size = min(max(request.args.get("size", DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    cursor = request.args.get("cursor")
+
+    try:
+        last_modified = db.session.scalar(select(User.updated_at).where(User.id == user_id))
+        if last_modified is None:
+            abort(404)
+        pending_jobs = dict(db.session.execute(
+            select(Job.movie_id, Job.id).where(Job.user_id == user_id, Job.status.in_((PENDING, RUNNING)))).all())
+        etag = make_etag("user_movies", current_app.config['TEMPLATES_VERSION'], user_id, last_modified,
+                         sorted(pending_jobs.items()), sort, direction, size, cursor)
+        cached = not_modified(etag, last_modified)
+        if cached:
+            return cached
+
+        user = db.session.get(User, user_id)
+
+        def render_grid():
+            try:
+                statement = paginate_movies(movie_rows_statement(user.id),
+                                            sort=sort, direction=direction, cursor=cursor, limit=size)
+            except ValueError:
+                abort(400)
+            movies = build_page([MovieRow._make(row) for row in db.session.execute(statement)],
+                                sort=sort, limit=size)
+            return render_template("_movie_grid.html", user=user, movies=movies, pending_jobs=pending_jobs,
+                                   sort=sort, direction=direction, size=size, cursor=cursor)
+
+        fragment_cache = current_app.extensions['fragment_cache']
+        if fragment_cache is not None:
+            grid = fragment_cache.get_or_render(user_group(user.id), etag, render_grid)
+        else:
+            grid = render_grid()
+        page = render_template("user_movies.html", user=user, grid=Markup(grid), pending_jobs=pending_jobs)
+        return with_validators(make_response(page), etag, last_modified)
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {e}")
+        flash("An error occurred while loading user's movies.", "danger")
+        return redirect(url_for("views.list_users"))
+
+
+@views.route("/users/<int:user_id>/search")
+def search_movies(user_id):
+    """
+    Route to search the names and directors of a user's movies.
+
+    The query parameter `q` is the search text; every word also matches longer words it is a prefix of.
+    The best matches, ranked by relevance, are shown on the movie page; `size` limits their number.
+
+    Args:
+        user_id (int): The ID of the user whose movies are searched.
+
+    Returns:
+        str: Rendered HTML template displaying the matching movies (user_movies.html).
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return redirect(url_for("views.user_movies", user_id=user_id))
+    size = min(max(request.args.get("size", DEFAULT_SEARCH_LIMIT, type=int), 1), MAX_SEARCH_LIMIT)
+
+    try:
+        user = User.query.get_or_404(user_id)
+        statement = search_statement(user.id, query, limit=size)
+        rows = db.session.execute(statement) if statement is not None else []
+        movies = Page([MovieRow._make(row) for row in rows])
+        grid = render_template("_movie_grid.html", user=user, movies=movies, pending_jobs={}, query=query,
+                               sort="name", direction="asc", size=DEFAULT_PAGE_SIZE, cursor=None)
+        return render_template("user_movies.html", user=user, grid=Markup(grid), pending_jobs={}, query=query)
+    except SQLAlchemyError as e:
+        current_app.logger.error(f"Database error: {e}")
+        flash("An error occurred while searching movies.", "danger")
+        return redirect(url_for("views.user_movies", user_id=user_id))
+
+
+@views.route('/add_user', methods=['GET', 'POST'])
+def add_user():
+    """
+    Route to add a new user.
+
+    If the request method is POST, the function attempts to add a new user to the database with the given name.
+    It redirects to the user list page after successful addition, or shows an error message if something goes wrong.
+
+    Returns:
+        str: Rendered HTML template to add a user (add_user.html).
+    """
+    if request.method == 'POST':
+        user_name = request.form['name']
+        try:
+            new_user = User(name=user_name)
+            db.session.add(new_user)
+            db.session.commit()
+            flash("User added successfully.", "success")
+            return redirect(url_for('views.list_users'))
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error adding user: {e}")
+            flash("Failed to add user.", "danger")
+
+    return render_template('add_user.html')
+
+
+@views.route("/add_movie/<int:user_id>", methods=["GET", "POST"])
+def add_movie(user_id):
+    """
+    Route to add a new movie to a user's collection.
+
+    If the request method is POST, it attempts to find the movie title in the shared catalog
+    and otherwise searches for it using the OMDb API.
+    If a valid movie is found, it is added to the user's movie collection.
+    Returns an error message if the movie cannot be found or if an API error occurs.
+
+    With ASYNC_ADD_MOVIE enabled, a placeholder movie is stored instead and the OMDb lookup
+    runs as a background job, so the request returns without waiting for OMDb.
+
+    Args:
+        user_id (int): The ID of the user who the movie will be added to.
+
+    Returns:
+        str: Rendered HTML template to add a movie (add_movie.html).
+    """
+    user = User.query.get_or_404(user_id)
+    error = None
+
+    if request.method == "POST":
+        title = request.form.get("title")
+
+        if not title:
+            error = "Please enter a movie title."
+        elif current_app.config['ASYNC_ADD_MOVIE']:
+            try:
+                placeholder = Movie(name=title, user_id=user.id)
+                db.session.add(placeholder)
+                refresh_user_stats(db.session, user.id)
+                db.session.commit()
+                invalidate_user_fragments(user.id)
+                current_app.extensions['job_runner'].enqueue("add_movie", user.id, payload=title,
+                                                             movie_id=placeholder.id)
+                flash("Movie is being looked up.", "success")
+                return redirect(url_for('views.user_movies', user_id=user.id))
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error queueing movie: {e}")
+                error = "An error occurred while adding the movie."
+        else:
+            try:
+                movie_data = lookup_movie(title)
+                if movie_data:
+                    new_movie = Movie(**user_movie_fields(user.id, movie_data))
+                    db.session.add(new_movie)
+                    refresh_user_stats(db.session, user.id)
+                    db.session.commit()
+                    invalidate_user_fragments(user.id)
+                    flash("Movie added successfully.", "success")
+                    return redirect(url_for('views.user_movies', user_id=user.id))
+                else:
+                    error = f"Movie '{title}' not found in OMDb."
+            except Exception as e:
+                db.session.rollback()
+                current_app.logger.error(f"OMDb API error: {e}")
+                error = "An error occurred while searching for the movie."
+
+    return render_template("add_movie.html", user=user, error=error)
+
+
+
+@views.route("/jobs/<int:job_id>")
+def job_status(job_id):
+    """
+    Route to poll the status of a background job.
+
+    Args:
+        job_id (int): The ID of the job.
+
+    Returns:
+        Response: JSON with the job's ID, status, error message and movie ID.
+    """
+    job = Job.query.get_or_404(job_id)
+    return jsonify(id=job.id, status=job.status, error=job.error, movie_id=job.movie_id,
+                   progress=job.progress, total=job.total)
+
+
+@views.route("/posters/<int:movie_id>/<version>")
+def poster(movie_id, version):
+    """
+    Route to serve a movie's poster as a locally stored thumbnail.
+
+    The poster is downloaded and scaled down on the first request and served from disk afterwards.
+    The query parameter `w` selects the width, rounded up to one of the stored widths. Responses
+    may be cached for a year because the URL changes with the poster; requests for an outdated
+    version are redirected to the current one.
+
+    Args:
+        movie_id (int): The ID of the movie.
+        version (str): The fingerprint of the remote poster URL, as returned by `poster_src`.
+
+    Returns:
+        Response: The thumbnail, a redirect to the current version, or 404 if there is no poster.
+    """
+    url = db.session.scalar(select(func.coalesce(Movie.poster, CatalogMovie.poster))
+                            .outerjoin(CatalogMovie, CatalogMovie.imdb_id == Movie.imdb_id)
+                            .where(Movie.id == movie_id))
+    if not url or not url.startswith(("http://", "https://")):
+        abort(404)
+    width = snap_width(request.args.get("w", type=int))
+    if version != url_version(url):
+        return redirect(url_for("views.poster", movie_id=movie_id, version=url_version(url), w=width))
+
+    stored = current_app.extensions['poster_store'].get(url, width)
+    if stored is None:
+        abort(404)
+    path, content_type = stored
+    response = send_file(path, mimetype=content_type, max_age=POSTER_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def export_response(statement, fmt, filename):
+    """
+    Streams an export as a file download.
+
+    Args:
+        statement (Select): A statement from `exporter.export_statement`.
+        fmt (str): "csv" or "ndjson".
+        filename (str): The file name offered to the browser, without extension.
+
+    Returns:
+        Response: A streamed response with a Content-Disposition attachment header.
+    """
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+    return Response(iter_export(db.engine, statement, fmt), mimetype=EXPORT_FORMATS[fmt],
+                    headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'})
+
+
+@views.route("/users/<int:user_id>/export.<fmt>")
+def export_user_movies(user_id, fmt):
+    """
+    Route to download a user's movies as CSV or NDJSON.
+
+    The file is streamed in batches while it is read from the database, so large
+    collections start downloading at once and are never held in memory.
+
+    Args:
+        user_id (int): The ID of the user whose movies are exported.
+        fmt (str): "csv" or "ndjson".
+
+    Returns:
+        Response: The streamed export.
+    """
+    user = User.query.get_or_404(user_id)
+    return export_response(export_statement(user.id), fmt, f"movies-user-{user.id}")
+
+
+@views.route("/export.<fmt>")
+def export_all(fmt):
+    """
+    Route to download all users and their movies as CSV or NDJSON, e.g. for backups and analytics.
+
+    Args:
+        fmt (str): "csv" or "ndjson".
+
+    Returns:
+        Response: The streamed export.
+    """
+    return export_response(export_statement(), fmt, "movies")
+
+
+@views.route("/users/<int:user_id>/import_movies", methods=["GET", "POST"])
+def import_user_movies(user_id):
+    """
+    Route to import a list of movies into a user's collection.
+
+    If the request method is POST, the uploaded file (or the pasted text) is read as CSV with a
+    "title" column or as one title per line. The titles are imported by a background job, which
+    resolves them with the OMDb API and inserts the found movies in batches, and the request
+    redirects to this page with the job ID in `?job=`. While the job runs the page polls its
+    progress; once it is finished the page shows how many movies were added and which rows failed.
+
+    Args:
+        user_id (int): The ID of the user who the movies will be imported for.
+
+    Returns:
+        str: Rendered HTML template to import movies (import_movies.html).
+    """
+    user = User.query.get_or_404(user_id)
+    error = None
+    result = None
+    job = None
+
+    job_id = request.args.get("job", type=int)
+    if job_id is not None:
+        job = db.session.get(Job, job_id)
+        if job is None or job.user_id != user.id or job.kind != "import_movies":
+            abort(404)
+        if job.status == DONE:
+            result = ImportResult.from_json(job.result)
+        elif job.status == FAILED:
+            error = f"The import failed: {job.error}"
+
+    if request.method == "POST":
+        upload = request.files.get("file")
+        if upload and upload.filename:
+            text = upload.read().decode("utf-8-sig", errors="replace")
+            fmt = "csv" if upload.filename.lower().endswith(".csv") else None
+        else:
+            text = request.form.get("titles", "")
+            fmt = None
+
+        titles = parse_titles(text, fmt)
+        if not titles:
+            error = "Please upload a file or enter at least one movie title."
+        else:
+            try:
+                job = current_app.extensions['job_runner'].enqueue("import_movies", user.id,
+                                                                   payload=json.dumps(titles))
+                return redirect(url_for('views.import_user_movies', user_id=user.id, job=job.id))
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                current_app.logger.error(f"Error queueing import: {e}")
+                error = "An error occurred while importing the movies."
+
+    return render_template("import_movies.html", user=user, error=error, result=result, job=job)
+
+
+@views.route("/users/<int:user_id>/update_movie/<int:movie_id>", methods=["GET", "POST"])
+def update_movie(user_id, movie_id):
+    """
+    Route to update a movie's details for a specific user.
+
+    This route takes the movie ID and allows the user to edit the movie's title, director, year, and rating.
+    The changes are committed to the database upon form submission. If an error occurs, an error message is shown.
+
+    Args:
+        user_id (int): The ID of the user who owns the movie.
+        movie_id (int): The ID of the movie to be updated.
+
+    Returns:
+        str: Rendered HTML template to update the movie (update_movie.html).
+    """
+    movie = Movie.query.get_or_404(movie_id)
+
+    if request.method == "POST":
+        try:
+            movie.name = request.form["name"]
+            movie.director = request.form["director"] or None
+            movie.year = int(request.form["year"])
+            movie.rating = float(request.form["rating"])
+            refresh_user_stats(db.session, movie.user_id)
+            db.session.commit()
+            invalidate_user_fragments(movie.user_id)
+            flash("Movie updated successfully.", "success")
+            return redirect(url_for("views.user_movies", user_id=user_id))
+        except (ValueError, SQLAlchemyError) as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error updating movie: {e}")
+            flash("Failed to update movie.", "danger")
+
+    return render_template("update_movie.html", movie=movie, user_id=user_id)
+
+@views.route("/users/<int:user_id>/delete_movie/<int:movie_id>", methods=["POST"])
+def delete_movie(user_id, movie_id):
+    """
+    Route to delete a movie from a user's collection.
+
+    This route deletes the specified movie from the user's collection in the database.
+    If the deletion is successful, a success message is displayed; otherwise, an error message is shown.
+
+    Args:
+        user_id (int): The ID of the user who owns the movie.
+        movie_id (int): The ID of the movie to be deleted.
+
+    Returns:
+        Response: Redirects to the user's movie collection page after deletion.
+    """
+    movie = Movie.query.get_or_404(movie_id)
+    try:
+        db.session.delete(movie)
+        refresh_user_stats(db.session, movie.user_id)
+        db.session.commit()
+        invalidate_user_fragments(movie.user_id)
+        flash("Movie deleted successfully.", "success")
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error deleting movie: {e}")
+        flash("Failed to delete movie.", "danger")
+
+    return redirect(url_for("views.user_movies", user_id=user_id))
+
+
+
+@views.app_errorhandler(404)
+def not_found_error(error):
+    """
+    Error handler for 404 Not Found errors.
+
+    This handler is triggered when a requested page cannot be found. It renders a custom 404 error page.
+
+    Args:
+        error (Exception): The error that triggered this handler.
+
+    Returns:
+        tuple: The rendered 404 error page with a status code of 404.
+    """
+    return render_template('404.html'), 404
+
+@views.app_errorhandler(500)
+def internal_error(error):
+    """
+    Error handler for 500 Internal Server errors.
+
+    This handler is triggered when an unexpected server error occurs. It rolls back any active database session and renders a custom 500 error page.
+    If the request is being profiled, the error is recorded with its profile.
+
+    Args:
+        error (Exception): The error that triggered this handler.
+
+    Returns:
+        tuple: The rendered 500 error page with a status code of 500.
+    """
+    record_profile_error(error)
+    db.session.rollback()
+    return render_template('500.html'), 500